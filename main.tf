@@ -168,6 +168,8 @@ module "aft_feature_options" {
   enable_cloudtrail_lambda_function_name    = local.enable_cloudtrail_lambda_function_name
   lambda_runtime_python_version             = local.lambda_runtime_python_version
   aft_enable_vpc                            = module.aft_account_request_framework.vpc_deployment
+  request_metadata_table_name               = module.aft_account_request_framework.request_metadata_table_name
+  support_enrollment_table_name             = module.aft_account_request_framework.support_enrollment_table_name
 }
 
 module "aft_iam_roles" {
@@ -190,6 +192,8 @@ module "aft_lambda_layer" {
   lambda_layer_codebuild_delay                      = local.lambda_layer_codebuild_delay
   lambda_layer_python_version                       = local.lambda_layer_python_version
   lambda_runtime_python_version                     = local.lambda_runtime_python_version
+  aft_framework_repo_url                            = var.aft_framework_repo_url
+  aft_framework_repo_git_ref                        = local.aft_framework_repo_git_ref
   aft_tf_aws_customizations_module_git_ref_ssm_path = local.ssm_paths.aft_tf_aws_customizations_module_git_ref_ssm_path
   aft_tf_aws_customizations_module_url_ssm_path     = local.ssm_paths.aft_tf_aws_customizations_module_url_ssm_path
   aws_region                                        = var.ct_home_region
@@ -213,6 +217,7 @@ module "aft_ssm_parameters" {
   aft_request_table_name                                      = module.aft_account_request_framework.request_table_name
   aft_request_audit_table_name                                = module.aft_account_request_framework.request_audit_table_name
   aft_request_metadata_table_name                             = module.aft_account_request_framework.request_metadata_table_name
+  aft_support_enrollment_table_name                           = module.aft_account_request_framework.support_enrollment_table_name
   aft_controltower_events_table_name                          = module.aft_account_request_framework.controltower_events_table_name
   account_factory_product_name                                = module.aft_account_request_framework.account_factory_product_name
   aft_invoke_aft_account_provisioning_framework_function_name = module.aft_account_request_framework.invoke_aft_account_provisioning_framework_lambda_function_name
@@ -40,3 +40,16 @@ fields @timestamp, log_message.account_id as target_account_id, log_message.cust
 | filter log_message.account_id == "INSERT-ACCOUNT-ID-HERE" and @message like /customization_request_id/
 EOF
 }
+
+resource "aws_cloudwatch_log_metric_filter" "iam_role_propagation_latency" {
+  name           = "aft-iam-role-propagation-latency"
+  log_group_name = aws_cloudwatch_log_group.create_role.name
+  pattern        = "{ $.log_message.metric_name = \"IamRolePropagationLatency\" }"
+
+  metric_transformation {
+    name      = "IamRolePropagationLatency"
+    namespace = "AFT"
+    value     = "$.log_message.latency_seconds"
+    unit      = "Seconds"
+  }
+}
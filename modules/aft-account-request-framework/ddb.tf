@@ -50,6 +50,28 @@ resource "aws_dynamodb_table" "aft_request_metadata" {
   }
 }
 
+# Ledger of the Enterprise Support enrollment case raised for each account
+resource "aws_dynamodb_table" "aft_support_enrollment" {
+  name           = "aft-support-enrollment"
+  read_capacity  = 1
+  write_capacity = 1
+  hash_key       = "id"
+
+  attribute {
+    name = "id"
+    type = "S"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  server_side_encryption {
+    enabled     = true
+    kms_key_arn = aws_kms_key.aft.arn
+  }
+}
+
 # Table that stores the configuration details for the account vending machine
 resource "aws_dynamodb_table" "aft_request" {
   name             = "aft-request"
@@ -53,6 +53,9 @@ output "request_audit_table_name" {
 output "request_metadata_table_name" {
   value = aws_dynamodb_table.aft_request_metadata.name
 }
+output "support_enrollment_table_name" {
+  value = aws_dynamodb_table.aft_support_enrollment.name
+}
 output "controltower_events_table_name" {
   value = aws_dynamodb_table.aft_controltower_events.name
 }
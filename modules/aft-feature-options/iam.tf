@@ -46,7 +46,7 @@ resource "aws_iam_role_policy" "aft_delete_default_vpc_lambda" {
     aws_kms_key_aft_arn                         = var.aft_kms_key_arn
     aws_sns_topic_aft_notifications_arn         = var.aft_sns_topic_arn
     aws_sns_topic_aft_failure_notifications_arn = var.aft_failure_sns_topic_arn
-
+    request_metadata_table_name                 = var.request_metadata_table_name
   })
 
 }
@@ -80,6 +80,7 @@ resource "aws_iam_role_policy" "aft_enroll_support" {
     aws_kms_key_aft_arn                         = var.aft_kms_key_arn
     aws_sns_topic_aft_notifications_arn         = var.aft_sns_topic_arn
     aws_sns_topic_aft_failure_notifications_arn = var.aft_failure_sns_topic_arn
+    support_enrollment_table_name               = var.support_enrollment_table_name
   })
 
 }
@@ -107,12 +108,13 @@ resource "aws_iam_role_policy" "aft_enable_cloudtrail" {
   role     = aws_iam_role.aft_enable_cloudtrail.id
 
   policy = templatefile("${path.module}/iam/role-policies/aft_enable_cloudtrail.tpl", {
-    data_aws_caller_identity_current_account_id = data.aws_caller_identity.current.account_id
-    data_aws_partition_current_partition        = data.aws_partition.current.partition
-    data_aws_region_current_name                = data.aws_region.current.name
-    aws_kms_key_aft_arn                         = var.aft_kms_key_arn
-    aws_sns_topic_aft_notifications_arn         = var.aft_sns_topic_arn
-    aws_sns_topic_aft_failure_notifications_arn = var.aft_failure_sns_topic_arn
+    data_aws_caller_identity_current_account_id           = data.aws_caller_identity.current.account_id
+    data_aws_partition_current_partition                  = data.aws_partition.current.partition
+    data_aws_region_current_name                          = data.aws_region.current.name
+    aws_kms_key_aft_arn                                   = var.aft_kms_key_arn
+    aws_sns_topic_aft_notifications_arn                   = var.aft_sns_topic_arn
+    aws_sns_topic_aft_failure_notifications_arn           = var.aft_failure_sns_topic_arn
+    aws_ssm_parameter_aft_cloudtrail_converged_marker_arn = aws_ssm_parameter.aft_cloudtrail_converged_marker.arn
   })
 
 }
@@ -53,6 +53,16 @@
         "Action" : "sts:GetCallerIdentity",
         "Resource" : "*"
       },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+            "dynamodb:GetItem",
+            "dynamodb:UpdateItem"
+        ],
+        "Resource" : [
+            "arn:${data_aws_partition_current_partition}:dynamodb:${data_aws_region_current_name}:${data_aws_caller_identity_current_account_id}:table/${request_metadata_table_name}"
+        ]
+      },
       {
         "Effect" : "Allow",
         "Action" : [
@@ -8,6 +8,13 @@
                     "arn:${data_aws_partition_current_partition}:ssm:${data_aws_region_current_name}:${data_aws_caller_identity_current_account_id}:parameter/aft/*"
             ]
           },
+          {
+            "Effect" : "Allow",
+            "Action" : "ssm:PutParameter",
+            "Resource" : [
+                    "${aws_ssm_parameter_aft_cloudtrail_converged_marker_arn}"
+            ]
+          },
          {
            "Effect" : "Allow",
            "Action" : [
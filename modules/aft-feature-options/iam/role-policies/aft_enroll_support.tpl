@@ -33,6 +33,18 @@
         "Action" : "sts:GetCallerIdentity",
         "Resource" : "*"
       },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+            "dynamodb:BatchGetItem",
+            "dynamodb:BatchWriteItem",
+            "dynamodb:GetItem",
+            "dynamodb:PutItem"
+        ],
+        "Resource" : [
+            "arn:${data_aws_partition_current_partition}:dynamodb:${data_aws_region_current_name}:${data_aws_caller_identity_current_account_id}:table/${support_enrollment_table_name}"
+        ]
+      },
       {
         "Effect" : "Allow",
         "Action" : [
@@ -0,0 +1,16 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+
+# Written by the aft_enable_cloudtrail Lambda once the org trail matches its
+# desired state, so later accounts can skip the CloudTrail step
+resource "aws_ssm_parameter" "aft_cloudtrail_converged_marker" {
+  provider = aws.aft_management
+  name     = "/aft/resources/cloudtrail/converged-marker"
+  type     = "String"
+  value    = "{}"
+
+  lifecycle {
+    ignore_changes = [value]
+  }
+}
@@ -82,3 +82,11 @@ variable "aft_enable_vpc" {
   type = bool
 
 }
+
+variable "request_metadata_table_name" {
+  type = string
+}
+
+variable "support_enrollment_table_name" {
+  type = string
+}
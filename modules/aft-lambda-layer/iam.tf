@@ -31,6 +31,7 @@ resource "aws_iam_role_policy" "codebuild_trigger_policy" {
     "account_id"                           = local.account_id
     "codebuild_project_name"               = aws_codebuild_project.codebuild.name
     "codebuild_trigger_function_name"      = local.codebuild_trigger_function_name
+    "s3_bucket_name"                       = var.s3_bucket_name
   })
 }
 
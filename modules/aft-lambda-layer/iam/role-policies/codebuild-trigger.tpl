@@ -4,11 +4,31 @@
     {
       "Action": [
           "codebuild:BatchGetBuilds",
+          "codebuild:ListBuildsForProject",
           "codebuild:StartBuild"
       ],
       "Effect": "Allow",
       "Resource": "arn:${data_aws_partition_current_partition}:codebuild:${aws_region}:${account_id}:project/${codebuild_project_name}"
     },
+    {
+      "Action": [
+          "s3:GetObject"
+      ],
+      "Effect": "Allow",
+      "Resource": "arn:${data_aws_partition_current_partition}:s3:::${s3_bucket_name}/layer.zip"
+    },
+    {
+      "Action": [
+          "s3:ListBucket"
+      ],
+      "Effect": "Allow",
+      "Resource": "arn:${data_aws_partition_current_partition}:s3:::${s3_bucket_name}",
+      "Condition": {
+        "StringEquals": {
+          "s3:prefix": "layer.zip"
+        }
+      }
+    },
     {
       "Action": [
           "logs:CreateLogGroup"
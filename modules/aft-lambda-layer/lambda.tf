@@ -33,7 +33,9 @@ data "aws_lambda_invocation" "trigger_codebuild_job" {
 
   input = <<JSON
 {
-  "codebuild_project_name": "${aws_codebuild_project.codebuild.name}"
+  "codebuild_project_name": "${aws_codebuild_project.codebuild.name}",
+  "bucket_name": "${var.s3_bucket_name}",
+  "layer_content_hash": "${local.layer_content_hash}"
 }
 JSON
 }
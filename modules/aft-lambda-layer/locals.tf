@@ -5,4 +5,18 @@ locals {
   common_name                     = "python-layer-builder-${var.lambda_layer_name}-${random_string.resource_suffix.result}"
   account_id                      = data.aws_caller_identity.session.account_id
   codebuild_trigger_function_name = "aft-lambda-layer-codebuild-trigger"
+
+  # The build clones aft_framework_repo_url at aft_framework_repo_git_ref and
+  # installs aft_common from that tree, so the hash is taken over those inputs
+  # and the layer Python version. The buildspec stamps the same hash, computed
+  # from the values it actually cloned, on layer.zip; the CodeBuild trigger
+  # skips the build when they match. Only release tags pin the cloned tree:
+  # for any other ref, such as a branch, the hash is left empty and the layer
+  # is always rebuilt
+  layer_source_pinned = can(regex("^v?[0-9]+\\.[0-9]+\\.[0-9]+$", var.aft_framework_repo_git_ref))
+  layer_content_hash = local.layer_source_pinned ? sha256(join("\n", [
+    var.aft_framework_repo_url,
+    var.aft_framework_repo_git_ref,
+    var.lambda_layer_python_version,
+  ])) : ""
 }
@@ -9,6 +9,14 @@ variable "lambda_layer_name" {
   }
 }
 
+variable "aft_framework_repo_url" {
+  type = string
+}
+
+variable "aft_framework_repo_git_ref" {
+  type = string
+}
+
 variable "aft_tf_aws_customizations_module_url_ssm_path" {
   type = string
 }
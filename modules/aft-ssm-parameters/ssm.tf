@@ -25,6 +25,12 @@ resource "aws_ssm_parameter" "aft_request_metadata_table_name" {
   value = var.aft_request_metadata_table_name
 }
 
+resource "aws_ssm_parameter" "aft_support_enrollment_table_name" {
+  name  = "/aft/resources/ddb/aft-support-enrollment-table-name"
+  type  = "String"
+  value = var.aft_support_enrollment_table_name
+}
+
 resource "aws_ssm_parameter" "aft_controltower_events_table_name" {
   name  = "/aft/resources/ddb/aft-controltower-events-table-name"
   type  = "String"
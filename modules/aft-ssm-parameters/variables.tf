@@ -17,6 +17,10 @@ variable "aft_request_metadata_table_name" {
   type = string
 }
 
+variable "aft_support_enrollment_table_name" {
+  type = string
+}
+
 variable "aft_controltower_events_table_name" {
   type = string
 }
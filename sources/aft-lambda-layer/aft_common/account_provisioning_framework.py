@@ -3,9 +3,11 @@
 #
 import json
 import logging
+import random
 import time
-from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, TypedDict
+from urllib.parse import unquote
 
 import aft_common.aft_utils as utils
 import aft_common.constants
@@ -34,6 +36,47 @@ logger = logging.getLogger("aft")
 
 AFT_EXEC_ROLE = "AWSAFTExecution"
 
+# Readiness probing for newly created / updated AFT roles
+# One deadline shared by all AFT role probes. Added to the 1 minute attach
+# wait of the concurrent deployments, it stays within the 300 second
+# create_role Lambda timeout
+IAM_READINESS_TIMEOUT_SECONDS = 180
+IAM_READINESS_BASE_DELAY_SECONDS = 1.0
+IAM_READINESS_MAX_DELAY_SECONDS = 16.0
+# Consecutive successful probes required before a role is considered ready.
+# A single success can come from an IAM endpoint that has already converged
+# while others have not
+IAM_READINESS_CONFIRMATIONS = 3
+IAM_PROPAGATION_METRIC_NAME = "IamRolePropagationLatency"
+
+ROLE_CHANGE_CREATE = "create_role"
+ROLE_CHANGE_UPDATE_TRUST_POLICY = "update_trust_policy"
+ROLE_CHANGE_ATTACH_POLICY = "attach_policy"
+
+
+class RoleState(TypedDict):
+    trust_policy: Dict[str, Any]
+    attached_policy_arns: List[str]
+
+
+def _normalize_policy_document(document: Any) -> Any:
+    """
+    IAM may return single-element lists as scalars and reorder list entries,
+    so both sides of a policy comparison are reduced to the same shape
+    """
+    if isinstance(document, dict):
+        return {
+            key: _normalize_policy_document(value) for key, value in document.items()
+        }
+    if isinstance(document, list):
+        if len(document) == 1:
+            return _normalize_policy_document(document[0])
+        return sorted(
+            (_normalize_policy_document(item) for item in document),
+            key=lambda item: json.dumps(item, sort_keys=True),
+        )
+    return document
+
 
 class ProvisionRoles:
     SERVICE_ROLE_NAME = "AWSAFTService"
@@ -70,9 +113,7 @@ class ProvisionRoles:
             }
         )
 
-    def _deploy_role_in_target_account(
-        self, role_name: str, trust_policy: str, policy_arn: str
-    ) -> None:
+    def _get_target_account_session(self) -> Session:
         """
         Since we're creating the AFT roles in the account, we must assume
         AWSControlTowerExecution as the target role. Since this role only
@@ -84,40 +125,78 @@ class ProvisionRoles:
         )
         ct_mgmt_acc_id = ct_mgmt_session.client("sts").get_caller_identity()["Account"]
         if self.target_account_id == ct_mgmt_acc_id:
-            target_account_session = ct_mgmt_session
-        else:
-            target_account_session = self.auth.get_target_account_session(
-                account_id=self.target_account_id,
-                hub_session=ct_mgmt_session,
-                role_name=AuthClient.CONTROL_TOWER_EXECUTION_ROLE_NAME,
-            )
-        self._put_role(
-            target_account_session=target_account_session,
-            role_name=role_name,
-            trust_policy=trust_policy,
+            return ct_mgmt_session
+        return self.auth.get_target_account_session(
+            account_id=self.target_account_id,
+            hub_session=ct_mgmt_session,
+            role_name=AuthClient.CONTROL_TOWER_EXECUTION_ROLE_NAME,
         )
-        self._put_policy_on_role(
-            target_account_session=target_account_session,
-            role_name=role_name,
-            policy_arn=policy_arn,
+
+    @staticmethod
+    def _get_attached_policy_arns(client: IAMClient, role_name: str) -> List[str]:
+        paginator = client.get_paginator("list_attached_role_policies")
+        return [
+            policy["PolicyArn"]
+            for page in paginator.paginate(RoleName=role_name)
+            for policy in page["AttachedPolicies"]
+        ]
+
+    @staticmethod
+    def _get_role_state(client: IAMClient, role_name: str) -> Optional[RoleState]:
+        """
+        Returns the trust policy and attached managed policy ARNs of role_name,
+        or None if the role does not exist
+        """
+        try:
+            role = client.get_role(RoleName=role_name)["Role"]
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "NoSuchEntity":
+                return None
+            raise
+        trust_policy = role.get("AssumeRolePolicyDocument", {})
+        # botocore decodes policy documents, but fall back for raw strings
+        if isinstance(trust_policy, str):
+            trust_policy = json.loads(unquote(trust_policy))
+        return RoleState(
+            trust_policy=trust_policy,
+            attached_policy_arns=ProvisionRoles._get_attached_policy_arns(
+                client=client, role_name=role_name
+            ),
         )
 
-    def _put_role(
-        self,
-        target_account_session: Session,
+    @staticmethod
+    def get_role_changes(
+        client: IAMClient, role_name: str, trust_policy: str, policy_arn: str
+    ) -> List[str]:
+        """
+        Diffs role_name against the desired trust policy and managed policy,
+        returning the ROLE_CHANGE_* actions needed to converge it
+        """
+        state = ProvisionRoles._get_role_state(client=client, role_name=role_name)
+        if state is None:
+            return [ROLE_CHANGE_CREATE, ROLE_CHANGE_ATTACH_POLICY]
+
+        changes = []
+        if _normalize_policy_document(
+            state["trust_policy"]
+        ) != _normalize_policy_document(json.loads(trust_policy)):
+            changes.append(ROLE_CHANGE_UPDATE_TRUST_POLICY)
+        if policy_arn not in state["attached_policy_arns"]:
+            changes.append(ROLE_CHANGE_ATTACH_POLICY)
+        return changes
+
+    @staticmethod
+    def apply_role_changes(
+        client: IAMClient,
         role_name: str,
         trust_policy: str,
+        policy_arn: str,
+        changes: List[str],
         max_attempts: int = 20,
         delay: int = 5,
+        timeout_in_mins: int = 1,
     ) -> None:
-        client: IAMClient = target_account_session.client("iam")
-        if self.role_exists(
-            role_name=role_name, target_account_session=target_account_session
-        ):
-            client.update_assume_role_policy(
-                RoleName=role_name, PolicyDocument=trust_policy
-            )
-        else:
+        if ROLE_CHANGE_CREATE in changes:
             client.create_role(
                 RoleName=role_name,
                 AssumeRolePolicyDocument=trust_policy,
@@ -130,6 +209,56 @@ class ProvisionRoles:
                 RoleName=role_name,
                 WaiterConfig={"Delay": delay, "MaxAttempts": max_attempts},
             )
+        if ROLE_CHANGE_UPDATE_TRUST_POLICY in changes:
+            client.update_assume_role_policy(
+                RoleName=role_name, PolicyDocument=trust_policy
+            )
+
+        if ROLE_CHANGE_ATTACH_POLICY not in changes:
+            logger.info(f"{policy_arn} is attached to {role_name}")
+            return None
+
+        client.attach_role_policy(RoleName=role_name, PolicyArn=policy_arn)
+        try:
+            utils.wait_with_backoff(
+                lambda: policy_arn
+                in ProvisionRoles._get_attached_policy_arns(
+                    client=client, role_name=role_name
+                ),
+                timeout_seconds=timeout_in_mins * 60,
+                base_delay_seconds=IAM_READINESS_BASE_DELAY_SECONDS,
+                max_delay_seconds=IAM_READINESS_MAX_DELAY_SECONDS,
+            )
+            logger.info(f"Attached {policy_arn} to {role_name}")
+        except TimeoutError:
+            # Effective permissions are verified by the readiness probe
+            logger.warning(
+                f"{policy_arn} not yet listed on {role_name} after {timeout_in_mins} minutes"
+            )
+        return None
+
+    def _deploy_role_in_target_account(
+        self,
+        client: IAMClient,
+        role_name: str,
+        trust_policy: str,
+        policy_arn: str,
+    ) -> List[str]:
+        changes = self.get_role_changes(
+            client=client,
+            role_name=role_name,
+            trust_policy=trust_policy,
+            policy_arn=policy_arn,
+        )
+        logger.info(f"Changes for {role_name}: {changes or 'none'}")
+        self.apply_role_changes(
+            client=client,
+            role_name=role_name,
+            trust_policy=trust_policy,
+            policy_arn=policy_arn,
+            changes=changes,
+        )
+        return changes
 
     @staticmethod
     def role_exists(role_name: str, target_account_session: Session) -> bool:
@@ -143,33 +272,6 @@ class ProvisionRoles:
                 return False
             raise
 
-    def _put_policy_on_role(
-        self,
-        target_account_session: Session,
-        role_name: str,
-        policy_arn: str,
-        delay: int = 5,
-        timeout_in_mins: int = 1,
-    ) -> None:
-        if not self.role_policy_is_attached(
-            role_name=role_name,
-            policy_arn=policy_arn,
-            target_account_session=target_account_session,
-        ):
-            resource: IAMServiceResource = target_account_session.resource("iam")
-            role = resource.Role(role_name)
-            role.attach_policy(PolicyArn=policy_arn)
-            timeout = datetime.utcnow() + timedelta(minutes=timeout_in_mins)
-            while datetime.utcnow() < timeout:
-                time.sleep(delay)
-                if self.role_policy_is_attached(
-                    role_name=role_name,
-                    policy_arn=policy_arn,
-                    target_account_session=target_account_session,
-                ):
-                    return None
-        return None
-
     @staticmethod
     def role_policy_is_attached(
         role_name: str, policy_arn: str, target_account_session: Session
@@ -185,27 +287,94 @@ class ProvisionRoles:
         )
         return attached
 
-    def _ensure_role_can_be_assumed(
-        self, role_name: str, timeout_in_mins: int = 1, delay: int = 5
-    ) -> None:
-        timeout = datetime.utcnow() + timedelta(minutes=timeout_in_mins)
-        while datetime.utcnow() < timeout:
-            if self._can_assume_role(role_name=role_name):
-                return None
-            time.sleep(delay)
-        raise TimeoutError(
-            f"Could not assume role {role_name} within {timeout_in_mins} minutes"
-        )
-
-    def _can_assume_role(self, role_name: str) -> bool:
+    def _wait_for_roles_to_be_usable(
+        self, role_names: List[str], timeout_seconds: float
+    ) -> Dict[str, float]:
+        """
+        Probes every role in role_names in turn until each has passed
+        IAM_READINESS_CONFIRMATIONS consecutive probes, all under one deadline.
+        Returns the monotonic time of the first probe in each role's
+        confirming streak, so confirmation spacing is not counted as latency
+        """
+        deadline = time.monotonic() + timeout_seconds
+        successes = {role_name: 0 for role_name in role_names}
+        streak_started_at: Dict[str, float] = {}
+        ready_at: Dict[str, float] = {}
+        attempt = 0
+        while True:
+            failed = False
+            for role_name in role_names:
+                if role_name in ready_at:
+                    continue
+                probed_at = time.monotonic()
+                if self._role_is_ready(role_name=role_name):
+                    if successes[role_name] == 0:
+                        streak_started_at[role_name] = probed_at
+                    successes[role_name] += 1
+                    if successes[role_name] >= IAM_READINESS_CONFIRMATIONS:
+                        ready_at[role_name] = streak_started_at[role_name]
+                        logger.info(f"Can assume {role_name} role")
+                else:
+                    successes[role_name] = 0
+                    failed = True
+
+            pending = [
+                role_name for role_name in role_names if role_name not in ready_at
+            ]
+            if not pending:
+                return ready_at
+
+            # Same schedule as utils.wait_with_backoff: jittered backoff after
+            # a failed probe, base spacing between confirmations
+            if failed:
+                attempt += 1
+                ceiling = min(
+                    IAM_READINESS_MAX_DELAY_SECONDS,
+                    IAM_READINESS_BASE_DELAY_SECONDS * 2**attempt,
+                )
+                delay = random.uniform(  # nosec B311: Not using random numbers in a security context
+                    IAM_READINESS_BASE_DELAY_SECONDS, ceiling
+                )
+            else:
+                delay = IAM_READINESS_BASE_DELAY_SECONDS
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Roles {', '.join(pending)} were not usable within {timeout_seconds} seconds"
+                )
+            time.sleep(min(delay, remaining))
+
+    def _role_is_ready(self, role_name: str) -> bool:
+        """
+        Probes role_name by assuming it and making a cheap IAM read under it.
+        The read only succeeds once the attached policy has propagated, so
+        this checks effective permissions as well as the trust policy
+        """
         try:
-            self.auth.get_target_account_session(
+            session = self.auth.get_target_account_session(
                 account_id=self.target_account_id, role_name=role_name
             )
+            client: IAMClient = session.client("iam")
+            client.get_role(RoleName=role_name)
             return True
-        except ClientError:
+        except ClientError as error:
+            logger.debug(
+                f"{role_name} not ready yet: {error.response['Error']['Code']}"
+            )
             return False
 
+    def _record_propagation_latency(self, role_name: str, latency: float) -> None:
+        # Picked up by the IAM propagation metric filter on this Lambda's log group
+        logger.info(
+            {
+                "metric_name": IAM_PROPAGATION_METRIC_NAME,
+                "role_name": role_name,
+                "account_id": self.target_account_id,
+                "latency_seconds": round(latency, 3),
+            }
+        )
+
     def deploy_aws_aft_roles(self) -> None:
         trust_policy = self.generate_aft_trust_policy()
 
@@ -215,20 +384,42 @@ class ProvisionRoles:
         ]
 
         logger.info(f"Deploying roles {', '.join(aft_role_names)}")
+        # One target session and one IAM client (thread-safe) shared by both
+        # role deployments
+        client: IAMClient = self._get_target_account_session().client("iam")
+        role_changes: Dict[str, List[str]] = {}
+        changed_at: Dict[str, float] = {}
+        with ThreadPoolExecutor(max_workers=len(aft_role_names)) as pool:
+            futures = {
+                pool.submit(
+                    self._deploy_role_in_target_account,
+                    client=client,
+                    role_name=role_name,
+                    trust_policy=trust_policy,
+                    policy_arn=self.ADMINISTRATOR_ACCESS_MANAGED_POLICY_ARN,
+                ): role_name
+                for role_name in aft_role_names
+            }
+            for future in as_completed(futures):
+                role_name = futures[future]
+                role_changes[role_name] = future.result()
+                changed_at[role_name] = time.monotonic()
+                logger.info(f"Deployed {role_name} role")
+
+        # Guard for IAM eventual consistency: wait only as long as the roles
+        # actually need to become usable. Both roles are probed under one
+        # deadline that fits inside the create_role Lambda timeout, and only
+        # roles that were created or updated have a propagation latency,
+        # measured from the end of their own deployment
+        ready_at = self._wait_for_roles_to_be_usable(
+            role_names=aft_role_names, timeout_seconds=IAM_READINESS_TIMEOUT_SECONDS
+        )
         for role_name in aft_role_names:
-            self._deploy_role_in_target_account(
-                role_name=role_name,
-                trust_policy=trust_policy,
-                policy_arn=self.ADMINISTRATOR_ACCESS_MANAGED_POLICY_ARN,
-            )
-            logger.info(f"Deployed {role_name} role")
-
-        for role_name in aft_role_names:
-            self._ensure_role_can_be_assumed(role_name=role_name)
-            logger.info(f"Can assume {role_name} role")
-
-        # Guard for IAM eventual consistency
-        time.sleep(65)
+            if role_changes[role_name]:
+                self._record_propagation_latency(
+                    role_name=role_name,
+                    latency=ready_at[role_name] - changed_at[role_name],
+                )
 
 
 # From persist-metadata Lambda
@@ -20,6 +20,7 @@ from aft_common.exceptions import (
     NoAccountFactoryPortfolioFound,
     ServiceRoleNotAssociated,
 )
+from aft_common.logger import log_payload
 from aft_common.organizations import OrganizationsAgent
 from boto3.session import Session
 
@@ -276,11 +277,11 @@ def update_existing_account(
             )
         )
 
-    logger.info(
-        "Modifying existing account leveraging parameters: "
-        + utils.sanitize_input_for_logging(str(provisioning_parameters))
-        + " with provisioned product ID "
-        + target_product["Id"]
+    log_payload(
+        logger,
+        "account_request_framework.update_existing_account",
+        f"Modifying existing account with provisioned product ID {target_product['Id']} leveraging parameters",
+        provisioning_parameters,
     )
     update_response = client.update_provisioned_product(
         ProvisionedProductId=target_product["Id"],
@@ -291,7 +292,12 @@ def update_existing_account(
         ProvisioningParameters=provisioning_parameters,
         UpdateToken=str(uuid.uuid1()),
     )
-    logger.info(utils.sanitize_input_for_logging(update_response))
+    log_payload(
+        logger,
+        "account_request_framework.update_existing_account",
+        "Update response",
+        update_response,
+    )
 
 
 def get_account_request_record(
@@ -309,8 +315,12 @@ def get_account_request_record(
         primary_key={"id": request_table_id},
     )
     if item:
-        logger.info("Record found")
-        logger.info(utils.sanitize_input_for_logging(item))
+        log_payload(
+            logger,
+            "account_request_framework.get_account_request_record",
+            "Record found",
+            item,
+        )
         return item
     else:
         raise Exception(f"Account {request_table_id}  not found in {table_name}")
@@ -19,6 +19,7 @@ from typing import (
     Union,
 )
 
+import aft_common.logger as aft_logger
 from boto3.session import Session
 from botocore.config import Config
 from botocore.exceptions import ClientError
@@ -118,6 +119,47 @@ def get_high_retry_botoconfig() -> Config:
     )
 
 
+def wait_with_backoff(
+    condition: Callable[[], bool],
+    timeout_seconds: float,
+    base_delay_seconds: float = 1.0,
+    max_delay_seconds: float = 16.0,
+    required_successes: int = 1,
+) -> float:
+    """
+    Polls condition until it returns True required_successes times in a row.
+
+    Failed checks are retried with full-jitter exponential backoff, clipped at
+    max_delay_seconds. Consecutive confirmations are spaced by
+    base_delay_seconds. Returns the seconds elapsed until the condition held,
+    and raises TimeoutError once timeout_seconds have passed.
+    """
+    start = time.monotonic()
+    deadline = start + timeout_seconds
+    attempt = 0
+    successes = 0
+    while True:
+        if condition():
+            successes += 1
+            if successes >= required_successes:
+                return time.monotonic() - start
+            delay = base_delay_seconds
+        else:
+            successes = 0
+            attempt += 1
+            ceiling = min(max_delay_seconds, base_delay_seconds * 2**attempt)
+            delay = random.uniform(  # nosec B311: Not using random numbers in a security context
+                base_delay_seconds, ceiling
+            )
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f"Condition not met within {timeout_seconds} seconds ({attempt} failed checks)"
+            )
+        time.sleep(min(delay, remaining))
+
+
 def emails_are_equal(first_email: str, second_email: str) -> bool:
     return first_email.lower() == second_email.lower()
 
@@ -136,8 +178,9 @@ def invoke_lambda(
         LogType="Tail",
         Payload=payload,
     )
-    sanitized_response = sanitize_input_for_logging(response)
-    logger.info(sanitized_response)
+    aft_logger.log_payload(
+        logger, "aft_utils.invoke_lambda", "Invoke response", response
+    )
     return response
 
 
@@ -162,7 +205,8 @@ def invoke_step_function(
     sanitized_sfn_arn = sanitize_input_for_logging(sfn_arn)
     logger.info("Starting SFN execution of " + sanitized_sfn_arn)
     response = client.start_execution(stateMachineArn=sfn_arn, input=input)
-    logger.debug(sanitize_input_for_logging(response))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(sanitize_input_for_logging(response))
     return response
 
 
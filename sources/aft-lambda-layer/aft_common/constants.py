@@ -19,6 +19,9 @@ SSM_PARAM_AFT_SFN_NAME = (
 )
 SSM_PARAM_AFT_DDB_REQ_TABLE = "/aft/resources/ddb/aft-request-table-name"
 SSM_PARAM_AFT_DDB_AUDIT_TABLE = "/aft/resources/ddb/aft-request-audit-table-name"
+SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE = (
+    "/aft/resources/ddb/aft-support-enrollment-table-name"
+)
 SSM_PARAM_AFT_REQUEST_ACTION_TRIGGER_FUNCTION_ARN = (
     "/aft/resources/lambda/aft-account-request-action-trigger-function-arn"
 )
@@ -51,6 +54,7 @@ SSM_PARAM_AFT_MAXIMUM_CONCURRENT_CUSTOMIZATIONS = (
 SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED = (
     "/aft/config/feature/cloudtrail-data-events-enabled"
 )
+SSM_PARAM_CLOUDTRAIL_CONVERGED_MARKER = "/aft/resources/cloudtrail/converged-marker"
 SSM_PARAM_FEATURE_ENTERPRISE_SUPPORT_ENABLED = (
     "/aft/config/feature/enterprise-support-enabled"
 )
@@ -4,11 +4,13 @@
 import json
 import logging
 import os
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional
 
 import jsonschema
-from aft_common.aft_utils import get_high_retry_botoconfig, sanitize_input_for_logging
+from aft_common.aft_utils import get_high_retry_botoconfig
 from aft_common.constants import SSM_PARAM_AFT_DDB_META_TABLE
+from aft_common.ddb import ParallelScanStats, parallel_scan
+from aft_common.logger import LazyLogPayload, log_payload
 from aft_common.organizations import OrganizationsAgent
 from aft_common.ssm import get_ssm_parameter_value
 from boto3.session import Session
@@ -19,6 +21,11 @@ else:
     OrganizationsClient = object
 
 AFT_SHARED_ACCOUNT_NAMES = ["ct-management", "log-archive", "audit"]
+IDENTIFY_TARGETS_LOG_CALL_SITE = "customizations.identify_targets"
+AFT_ACCOUNT_IDS_SCAN_SEGMENTS = 4
+
+# Memoization - table name -> account IDs, cleared at the start of each invocation
+_AFT_ACCOUNT_IDS_CACHE: Dict[str, FrozenSet[str]] = {}
 
 logger = logging.getLogger("aft")
 
@@ -30,9 +37,7 @@ def validate_identify_targets_request(payload: Dict[str, Any]) -> bool:
     )
     with open(schema_path) as schema_file:
         schema_object = json.load(schema_file)
-    logger.info(
-        "Schema Loaded:" + sanitize_input_for_logging(json.dumps(schema_object))
-    )
+    logger.info("Schema Loaded:%s", LazyLogPayload(schema_object))
     validated = jsonschema.validate(payload, schema_object)
     if validated is None:
         logger.info("Request Validated")
@@ -41,52 +46,73 @@ def validate_identify_targets_request(payload: Dict[str, Any]) -> bool:
         raise Exception("Failure validating request.\n{validated}")
 
 
-def get_all_aft_account_ids(aft_management_session: Session) -> List[str]:
+def get_all_aft_account_ids(
+    aft_management_session: Session, use_cache: bool = True
+) -> List[str]:
+    """
+    Returns the IDs of all accounts in the AFT metadata table.
+
+    The result is memoized at module scope, keyed by table name, so repeated
+    calls within an invocation share one scan. Handlers call
+    reset_aft_account_ids_cache() on entry so a warm container never serves
+    accounts vended or removed since its previous invocation.
+    """
     table_name = get_ssm_parameter_value(
         aft_management_session, SSM_PARAM_AFT_DDB_META_TABLE
     )
-    dynamodb = aft_management_session.resource("dynamodb")
-    table = dynamodb.Table(table_name)
-    logger.info("Scanning DynamoDB table: " + table_name)
-
-    items: List[Dict[str, Any]] = []
-    response = table.scan(ProjectionExpression="id", ConsistentRead=True)
-    items.extend(response["Items"])
-    while "LastEvaluatedKey" in response:
-        logger.debug(
-            "Paginated response found, continuing at {}".format(
-                sanitize_input_for_logging(response["LastEvaluatedKey"])
-            )
-        )
-        response = table.scan(ExclusiveStartKey=response["LastEvaluatedKey"])
-        items.extend(response["Items"])
 
-    aft_account_ids = [item["id"] for item in items]
+    cached_account_ids = _AFT_ACCOUNT_IDS_CACHE.get(table_name)
+    if use_cache and cached_account_ids is not None:
+        logger.debug(f"Using cached account IDs for DynamoDB table: {table_name}")
+        return list(cached_account_ids)
+
+    aft_account_ids = [
+        item["id"]
+        for item in parallel_scan(
+            aft_management_session,
+            table_name,
+            total_segments=AFT_ACCOUNT_IDS_SCAN_SEGMENTS,
+            projection=["id"],
+            consistent_read=True,
+            stats=ParallelScanStats(),
+        )
+    ]
 
     if not aft_account_ids:
         raise Exception("No accounts found in the Account Metadata table")
 
+    _AFT_ACCOUNT_IDS_CACHE[table_name] = frozenset(aft_account_ids)
     return aft_account_ids
 
 
+def reset_aft_account_ids_cache() -> None:
+    _AFT_ACCOUNT_IDS_CACHE.clear()
+
+
 def filter_non_aft_accounts(
     session: Session, account_list: List[str], operation: str = "include"
 ) -> List[str]:
-    aft_accounts = get_all_aft_account_ids(session)
+    aft_accounts = set(get_all_aft_account_ids(session))
     core_accounts = get_core_accounts(session)
-    logger.info("Running AFT Filter for accounts " + str(account_list))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Running AFT Filter for accounts",
+        account_list,
+        noun="accounts",
+    )
     filtered_accounts = []
     for a in account_list:
-        logger.info("Evaluating account " + a)
+        logger.debug("Evaluating account " + a)
         if a not in aft_accounts:
             if operation == "include":
                 if a not in core_accounts:
                     logger.info("Account " + a + " is being filtered.")
                     filtered_accounts.append(a)
                 else:
-                    logger.info("Account " + a + " is NOT being filtered.")
+                    logger.debug("Account " + a + " is NOT being filtered.")
         else:
-            logger.info("Account " + a + " is NOT being filtered.")
+            logger.debug("Account " + a + " is NOT being filtered.")
     for a in filtered_accounts:
         if a in account_list:
             account_list.remove(a)
@@ -140,7 +166,13 @@ def get_accounts_by_tags(
                                 "Account " + a + " MATCHED with tags " + str(tags)
                             )
                             matched_accounts.append(a)
-    logger.info(matched_accounts)
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Accounts matched by tags",
+        matched_accounts,
+        noun="accounts",
+    )
     if len(matched_accounts) > 0:
         return matched_accounts
     else:
@@ -154,7 +186,13 @@ def get_included_accounts(
     included: List[Dict[str, Any]],
 ) -> List[str]:
     all_aft_accounts = get_all_aft_account_ids(aft_management_session)
-    logger.info("All AFT accounts: " + str(all_aft_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "All AFT accounts",
+        all_aft_accounts,
+        noun="accounts",
+    )
     included_accounts = []
     for d in included:
         if d["type"] == "all":
@@ -177,14 +215,26 @@ def get_included_accounts(
             included_accounts.extend(d["target_value"])
     # Remove Duplicates
     included_accounts = list(set(included_accounts))
-    logger.info("Included Accounts (pre-AFT filter): " + str(included_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Included Accounts (pre-AFT filter)",
+        included_accounts,
+        noun="accounts",
+    )
 
     # Filter non-AFT accounts
     included_accounts = filter_non_aft_accounts(
         aft_management_session, included_accounts
     )
 
-    logger.info("Included Accounts (post-AFT filter): " + str(included_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Included Accounts (post-AFT filter)",
+        included_accounts,
+        noun="accounts",
+    )
     return included_accounts
 
 
@@ -213,14 +263,26 @@ def get_excluded_accounts(
             excluded_accounts.extend(d["target_value"])
     # Remove Duplicates
     excluded_accounts = list(set(excluded_accounts))
-    logger.info("Excluded Accounts (pre-AFT filter): " + str(excluded_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Excluded Accounts (pre-AFT filter)",
+        excluded_accounts,
+        noun="accounts",
+    )
 
     # Filter non-AFT accounts
     excluded_accounts = filter_non_aft_accounts(
         aft_management_session, excluded_accounts, "exclude"
     )
 
-    logger.info("Excluded Accounts (post-AFT filter): " + str(excluded_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "Excluded Accounts (post-AFT filter)",
+        excluded_accounts,
+        noun="accounts",
+    )
     return excluded_accounts
 
 
@@ -230,5 +292,11 @@ def get_target_accounts(
     for i in excluded_accounts:
         if i in included_accounts:
             included_accounts.remove(i)
-    logger.info("TARGET ACCOUNTS: " + str(included_accounts))
+    log_payload(
+        logger,
+        IDENTIFY_TARGETS_LOG_CALL_SITE,
+        "TARGET ACCOUNTS",
+        included_accounts,
+        noun="accounts",
+    )
     return included_accounts
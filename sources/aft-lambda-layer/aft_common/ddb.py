@@ -2,27 +2,42 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 import logging
-from typing import TYPE_CHECKING, Any, Dict, Optional
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence
 
-from aft_common.aft_utils import sanitize_input_for_logging
-from boto3.dynamodb.types import TypeDeserializer
+from aft_common.logger import LazyLogPayload
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from boto3.session import Session
 
 if TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
     from mypy_boto3_dynamodb.type_defs import (
         AttributeValueTypeDef,
         DeleteItemOutputTableTypeDef,
         GetItemOutputTableTypeDef,
         PutItemOutputTableTypeDef,
+        ScanOutputTypeDef,
     )
 else:
     AttributeValueTypeDef = object
     GetItemOutputTableTypeDef = object
     PutItemOutputTableTypeDef = object
     DeleteItemOutputTableTypeDef = object
+    DynamoDBClient = object
+    ScanOutputTypeDef = object
 
 logger = logging.getLogger("aft")
 
+# Pages buffered between scan workers and the consumer before workers block
+PARALLEL_SCAN_MAX_BUFFERED_PAGES = 8
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+_SEGMENT_DONE = object()
+
 
 def get_ddb_item(
     session: Session, table_name: str, primary_key: Dict[str, Any]
@@ -41,10 +56,9 @@ def put_ddb_item(
     dynamodb = session.resource("dynamodb")
     table = dynamodb.Table(table_name)
 
-    logger.info(f"Inserting item into {table_name} table: {str(item)}")
+    logger.info("Inserting item into %s table: %s", table_name, item)
     response = table.put_item(Item=item)
-    sanitized_response = sanitize_input_for_logging(response)
-    logger.info(sanitized_response)
+    logger.info("%s", LazyLogPayload(response))
     return response
 
 
@@ -56,11 +70,49 @@ def delete_ddb_item(
 
     logger.info(f"Deleting item with key: {primary_key} from: {table_name} table")
     response = table.delete_item(Key=primary_key)
-    sanitized_response = sanitize_input_for_logging(response)
-    logger.info(sanitized_response)
+    logger.info("%s", LazyLogPayload(response))
     return response
 
 
+def batch_get_ddb_items(
+    session: Session, table_name: str, primary_keys: Sequence[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Fetches primary_keys with BatchGetItem, retrying unprocessed keys.
+    Missing items are omitted from the result
+    """
+    dynamodb = session.resource("dynamodb")
+    logger.info(f"Getting {len(primary_keys)} items from table: {table_name}")
+    items: List[Dict[str, Any]] = []
+    for start in range(0, len(primary_keys), BATCH_GET_MAX_KEYS):
+        request: Dict[str, Any] = {
+            table_name: {"Keys": list(primary_keys[start : start + BATCH_GET_MAX_KEYS])}
+        }
+        attempt = 0
+        while request:
+            if attempt:
+                # Unprocessed keys are returned under throttling; back off
+                time.sleep(min(0.05 * 2**attempt, 2.0))
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response["Responses"].get(table_name, []))
+            request = response.get("UnprocessedKeys") or {}
+            attempt += 1
+    return items
+
+
+def batch_put_ddb_items(
+    session: Session, table_name: str, items: Sequence[Dict[str, Any]]
+) -> None:
+    dynamodb = session.resource("dynamodb")
+    table = dynamodb.Table(table_name)
+
+    logger.info(f"Inserting {len(items)} items into table: {table_name}")
+    # batch_writer resubmits unprocessed items
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
 def unmarshal_ddb_item(
     low_level_data: Dict[str, AttributeValueTypeDef],
 ) -> Dict[str, Any]:
@@ -69,3 +121,154 @@ def unmarshal_ddb_item(
     deserializer = TypeDeserializer()
     python_data = {k: deserializer.deserialize(v) for k, v in low_level_data.items()}
     return python_data
+
+
+class ParallelScanStats:
+    """
+    Running totals for a parallel_scan, safe to update from the segment workers
+    """
+
+    def __init__(self) -> None:
+        self.pages = 0
+        self.items = 0
+        self.scanned_count = 0
+        self.consumed_capacity_units = 0.0
+        self._lock = threading.Lock()
+
+    def record_page(self, response: ScanOutputTypeDef) -> None:
+        with self._lock:
+            self.pages += 1
+            self.items += response["Count"]
+            self.scanned_count += response["ScannedCount"]
+            self.consumed_capacity_units += response.get("ConsumedCapacity", {}).get(
+                "CapacityUnits", 0.0
+            )
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "items": self.items,
+                "scanned_count": self.scanned_count,
+                "consumed_capacity_units": self.consumed_capacity_units,
+            }
+
+
+def _build_scan_params(
+    table_name: str,
+    projection: Optional[Sequence[str]],
+    filter_expression: Optional[ConditionBase],
+    consistent_read: bool,
+) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "TableName": table_name,
+        "ConsistentRead": consistent_read,
+        "ReturnConsumedCapacity": "TOTAL",
+    }
+    names: Dict[str, str] = {}
+    values: Dict[str, Any] = {}
+
+    if filter_expression is not None:
+        built = ConditionExpressionBuilder().build_expression(filter_expression)
+        params["FilterExpression"] = built.condition_expression
+        names.update(built.attribute_name_placeholders)
+        serializer = TypeSerializer()
+        values.update(
+            {
+                placeholder: serializer.serialize(value)
+                for placeholder, value in built.attribute_value_placeholders.items()
+            }
+        )
+
+    if projection:
+        # Placeholders avoid collisions with reserved words such as "timestamp"
+        projection_placeholders = []
+        for idx, attribute in enumerate(projection):
+            placeholder = f"#proj{idx}"
+            names[placeholder] = attribute
+            projection_placeholders.append(placeholder)
+        params["ProjectionExpression"] = ", ".join(projection_placeholders)
+
+    if names:
+        params["ExpressionAttributeNames"] = names
+    if values:
+        params["ExpressionAttributeValues"] = values
+    return params
+
+
+def parallel_scan(
+    session: Session,
+    table_name: str,
+    total_segments: int = 4,
+    projection: Optional[Sequence[str]] = None,
+    filter_expression: Optional[ConditionBase] = None,
+    consistent_read: bool = False,
+    stats: Optional[ParallelScanStats] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scans an entire table using Segment/TotalSegments across a thread pool,
+    yielding deserialized items as pages arrive rather than materializing the
+    table. Item order is not guaranteed. Workers block once
+    PARALLEL_SCAN_MAX_BUFFERED_PAGES pages are waiting on the consumer, and
+    stop early if the generator is closed.
+    """
+    if total_segments < 1:
+        raise ValueError("total_segments must be at least 1")
+
+    # Low-level clients are thread-safe, sessions and resources are not
+    client: DynamoDBClient = session.client("dynamodb")
+    params = _build_scan_params(
+        table_name=table_name,
+        projection=projection,
+        filter_expression=filter_expression,
+        consistent_read=consistent_read,
+    )
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=PARALLEL_SCAN_MAX_BUFFERED_PAGES)
+    stop = threading.Event()
+
+    def _put(page: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _scan_segment(segment: int) -> None:
+        try:
+            segment_params = dict(params, Segment=segment, TotalSegments=total_segments)
+            while not stop.is_set():
+                response = client.scan(**segment_params)
+                if stats is not None:
+                    stats.record_page(response)
+                if not _put(response["Items"]):
+                    return
+                if "LastEvaluatedKey" not in response:
+                    break
+                segment_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            _put(_SEGMENT_DONE)
+        except Exception as error:
+            _put(error)
+
+    logger.info(f"Scanning DynamoDB table: {table_name} with {total_segments} segments")
+    executor = ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        for segment in range(total_segments):
+            executor.submit(_scan_segment, segment)
+
+        remaining_segments = total_segments
+        while remaining_segments > 0:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining_segments -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                yield unmarshal_ddb_item(item)
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+        if stats is not None:
+            logger.info(f"Parallel scan of {table_name}: {stats.as_dict()}")
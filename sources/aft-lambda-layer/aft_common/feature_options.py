@@ -1,23 +1,93 @@
 # Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 #
+import hashlib
+import json
 import logging
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    TypeVar,
+)
 
 import aft_common.aft_utils as utils
+from aft_common.constants import (
+    SSM_PARAM_AFT_DDB_META_TABLE,
+    SSM_PARAM_CLOUDTRAIL_CONVERGED_MARKER,
+)
+from aft_common.ddb import get_ddb_item
+from aft_common.ssm import get_ssm_parameter_value
 from boto3.session import Session
 from botocore.exceptions import ClientError
 
 if TYPE_CHECKING:
     from mypy_boto3_cloudtrail import CloudTrailClient
     from mypy_boto3_ec2 import EC2Client, EC2ServiceResource
+    from mypy_boto3_ec2.type_defs import FilterTypeDef
+    from mypy_boto3_ssm import SSMClient
 else:
     EC2Client = object
     EC2ServiceResource = object
     CloudTrailClient = object
+    FilterTypeDef = object
+    SSMClient = object
 
 SUPPORT_API_REGION = "us-east-1"
 CLOUDTRAIL_TRAIL_NAME = "aws-aft-CustomizationsCloudTrail"
+# Bump when build_event_selectors or create_trail change, so converged markers
+# written for the previous desired state are ignored
+CLOUDTRAIL_DESIRED_STATE_VERSION = "1"
+CLOUDTRAIL_CONVERGED_MARKER_TTL_SECONDS = 3600
+DEFAULT_VPC_DELETION_MAX_WORKERS = 8
+DEFAULT_VPC_PLAN_ATTRIBUTE = "default_vpc_deletion_plan"
+DEFAULT_VPC_STEP_PENDING = "pending"
+DEFAULT_VPC_STEP_DONE = "done"
+_ALREADY_DELETED_ERROR_CODES = [
+    "Gateway.NotAttached",
+    "InvalidInternetGatewayID.NotFound",
+    "InvalidSubnetID.NotFound",
+    "InvalidRouteTableID.NotFound",
+    "InvalidNetworkAclID.NotFound",
+    "InvalidGroup.NotFound",
+    "InvalidVpcID.NotFound",
+]
+
+T = TypeVar("T")
+
+
+class DefaultVpcResources(TypedDict):
+    vpc_id: str
+    internet_gateways: List[str]
+    subnets: List[str]
+    route_tables: List[str]
+    network_acls: List[str]
+    security_groups: List[str]
+
+
+class DefaultVpcDeletionStep(TypedDict):
+    region: str
+    action: str
+    resource_id: str
+    vpc_id: str
+    status: str
+
+
+class DefaultVpcDeletionPlan(TypedDict):
+    account_id: str
+    request_id: str
+    regions: Dict[str, List[DefaultVpcDeletionStep]]
+
 
 logger = logging.getLogger("aft")
 
@@ -182,6 +252,276 @@ def delete_security_groups(client: EC2Client, security_groups: List[str]) -> Non
             )
 
 
+def _describe_vpc_children(
+    client: EC2Client,
+    operation: str,
+    result_key: str,
+    filters: List[FilterTypeDef],
+) -> List[Dict[str, Any]]:
+    paginator = client.get_paginator(operation)  # type: ignore[call-overload]
+    resources: List[Dict[str, Any]] = []
+    for page in paginator.paginate(Filters=filters):
+        resources.extend(page[result_key])
+    return resources
+
+
+def get_default_vpc_resources(client: EC2Client, vpc: str) -> DefaultVpcResources:
+    """
+    One filtered Describe* per resource type; main route tables, the default
+    ACL and the default SG are dropped here since they go away with the VPC
+    """
+    logger.info("Getting resources for VPC: " + vpc)
+    vpc_filter: List[FilterTypeDef] = [{"Name": "vpc-id", "Values": [vpc]}]
+    igws = _describe_vpc_children(
+        client,
+        "describe_internet_gateways",
+        "InternetGateways",
+        [{"Name": "attachment.vpc-id", "Values": [vpc]}],
+    )
+    subnets = _describe_vpc_children(client, "describe_subnets", "Subnets", vpc_filter)
+    route_tables = _describe_vpc_children(
+        client, "describe_route_tables", "RouteTables", vpc_filter
+    )
+    acls = _describe_vpc_children(
+        client, "describe_network_acls", "NetworkAcls", vpc_filter
+    )
+    sgs = _describe_vpc_children(
+        client, "describe_security_groups", "SecurityGroups", vpc_filter
+    )
+
+    resources: DefaultVpcResources = {
+        "vpc_id": vpc,
+        "internet_gateways": [i["InternetGatewayId"] for i in igws],
+        "subnets": [s["SubnetId"] for s in subnets],
+        "route_tables": [
+            rt["RouteTableId"]
+            for rt in route_tables
+            if not any(a.get("Main", False) for a in rt.get("Associations", []))
+        ],
+        "network_acls": [a["NetworkAclId"] for a in acls if not a["IsDefault"]],
+        "security_groups": [
+            sg["GroupId"] for sg in sgs if sg["GroupName"] != "default"
+        ],
+    }
+    logger.info(
+        "Resources for VPC " + vpc + ": " + utils.sanitize_input_for_logging(resources)
+    )
+    return resources
+
+
+def _run_in_regions(
+    session: Session,
+    regions: List[str],
+    region_handler: Callable[[EC2Client], T],
+    max_workers: int = DEFAULT_VPC_DELETION_MAX_WORKERS,
+) -> Dict[str, T]:
+    """
+    Fans region_handler out across regions, returning region -> result.
+    Every region runs to completion before any failure is raised.
+    """
+    # Sessions are not thread-safe; clients are, so build them up front
+    clients = {region: session.client("ec2", region_name=region) for region in regions}
+    results: Dict[str, T] = {}
+    failures: Dict[str, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions)))) as pool:
+        futures = {
+            pool.submit(region_handler, client): region
+            for region, client in clients.items()
+        }
+        for future in as_completed(futures):
+            region = futures[future]
+            try:
+                results[region] = future.result()
+            except Exception as error:
+                logger.error(f"Failed default VPC handling in {region}: {error}")
+                failures[region] = error
+
+    if failures:
+        raise Exception(
+            "Failed default VPC handling in regions: "
+            + ", ".join(f"{region} ({error})" for region, error in failures.items())
+        )
+    return results
+
+
+def _plan_default_vpc_deletion_in_region(
+    client: EC2Client,
+) -> List[DefaultVpcDeletionStep]:
+    region = client.meta.region_name
+    vpc = get_default_vpc(client)
+    if vpc is None:
+        return []
+    resources = get_default_vpc_resources(client, vpc)
+
+    def _step(action: str, resource_id: str) -> DefaultVpcDeletionStep:
+        return {
+            "region": region,
+            "action": action,
+            "resource_id": resource_id,
+            "vpc_id": vpc,
+            "status": DEFAULT_VPC_STEP_PENDING,
+        }
+
+    # Dependency order: IGWs and subnets hold references to the VPC's
+    # route tables, ACLs and SGs, all of which must go before the VPC
+    steps: List[DefaultVpcDeletionStep] = []
+    for igw in resources["internet_gateways"]:
+        steps.append(_step("detach_internet_gateway", igw))
+        steps.append(_step("delete_internet_gateway", igw))
+    steps.extend(_step("delete_subnet", s) for s in resources["subnets"])
+    steps.extend(_step("delete_route_table", r) for r in resources["route_tables"])
+    steps.extend(_step("delete_network_acl", a) for a in resources["network_acls"])
+    steps.extend(
+        _step("delete_security_group", sg) for sg in resources["security_groups"]
+    )
+    steps.append(_step("delete_vpc", vpc))
+    return steps
+
+
+def build_default_vpc_deletion_plan(
+    session: Session,
+    regions: List[str],
+    account_id: str,
+    request_id: str,
+    max_workers: int = DEFAULT_VPC_DELETION_MAX_WORKERS,
+) -> DefaultVpcDeletionPlan:
+    """
+    Describes the default VPC of every region and returns a JSON-serializable
+    plan of ordered deletion steps per region; nothing is modified
+    """
+    steps_by_region = _run_in_regions(
+        session, regions, _plan_default_vpc_deletion_in_region, max_workers
+    )
+    return {
+        "account_id": account_id,
+        "request_id": request_id,
+        "regions": {
+            region: steps for region, steps in sorted(steps_by_region.items()) if steps
+        },
+    }
+
+
+def _apply_default_vpc_deletion_step(
+    client: EC2Client, step: DefaultVpcDeletionStep
+) -> None:
+    action = step["action"]
+    resource_id = step["resource_id"]
+    logger.info(f"{step['region']}: {action} {resource_id}")
+    try:
+        if action == "detach_internet_gateway":
+            client.detach_internet_gateway(
+                InternetGatewayId=resource_id, VpcId=step["vpc_id"]
+            )
+        elif action == "delete_internet_gateway":
+            client.delete_internet_gateway(InternetGatewayId=resource_id)
+        elif action == "delete_subnet":
+            client.delete_subnet(SubnetId=resource_id)
+        elif action == "delete_route_table":
+            client.delete_route_table(RouteTableId=resource_id)
+        elif action == "delete_network_acl":
+            client.delete_network_acl(NetworkAclId=resource_id)
+        elif action == "delete_security_group":
+            client.delete_security_group(GroupId=resource_id)
+        elif action == "delete_vpc":
+            client.delete_vpc(VpcId=resource_id)
+        else:
+            raise ValueError(f"Unknown default VPC deletion action: {action}")
+    except ClientError as error:
+        # Already gone, e.g. completed by an attempt that timed out before checkpointing
+        if error.response["Error"]["Code"] not in _ALREADY_DELETED_ERROR_CODES:
+            raise
+        logger.info(f"{step['region']}: {resource_id} already removed")
+
+
+def apply_default_vpc_deletion_plan(
+    session: Session,
+    plan: DefaultVpcDeletionPlan,
+    checkpoint: Optional[Callable[[DefaultVpcDeletionPlan], None]] = None,
+    checkpoint_interval_seconds: float = 10.0,
+    max_workers: int = DEFAULT_VPC_DELETION_MAX_WORKERS,
+) -> DefaultVpcDeletionPlan:
+    """
+    Executes the pending steps of a plan, regions in parallel and steps in
+    order within a region, marking each step done in place. checkpoint is
+    called with the plan at most every checkpoint_interval_seconds, when a
+    region finishes, and once more on exit, so a retried invocation can
+    resume from the first pending step.
+    """
+    lock = threading.Lock()
+    last_checkpoint = [time.monotonic()]
+
+    def _checkpoint(force: bool) -> None:
+        if checkpoint is None:
+            return
+        with lock:
+            now = time.monotonic()
+            if force or now - last_checkpoint[0] >= checkpoint_interval_seconds:
+                checkpoint(plan)
+                last_checkpoint[0] = now
+
+    def _apply_region(client: EC2Client) -> None:
+        for step in plan["regions"][client.meta.region_name]:
+            if step["status"] == DEFAULT_VPC_STEP_DONE:
+                continue
+            _apply_default_vpc_deletion_step(client, step)
+            step["status"] = DEFAULT_VPC_STEP_DONE
+            _checkpoint(force=False)
+        _checkpoint(force=True)
+
+    pending_regions = [
+        region
+        for region, steps in plan["regions"].items()
+        if any(step["status"] != DEFAULT_VPC_STEP_DONE for step in steps)
+    ]
+    logger.info(f"Applying default VPC deletion plan for regions {pending_regions}")
+    try:
+        if pending_regions:
+            _run_in_regions(session, pending_regions, _apply_region, max_workers)
+    finally:
+        _checkpoint(force=True)
+    return plan
+
+
+def get_default_vpc_deletion_checkpoint(
+    aft_management_session: Session, account_id: str
+) -> Optional[DefaultVpcDeletionPlan]:
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_META_TABLE
+    )
+    item = get_ddb_item(aft_management_session, table_name, {"id": account_id})
+    if item is None or DEFAULT_VPC_PLAN_ATTRIBUTE not in item:
+        return None
+    plan: DefaultVpcDeletionPlan = json.loads(item[DEFAULT_VPC_PLAN_ATTRIBUTE])
+    return plan
+
+
+def put_default_vpc_deletion_checkpoint(
+    aft_management_session: Session, plan: DefaultVpcDeletionPlan
+) -> None:
+    """
+    Stores the plan on the account's metadata item; the item is never
+    created here so accounts absent from the metadata table are skipped
+    """
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_META_TABLE
+    )
+    table = aft_management_session.resource("dynamodb").Table(table_name)
+    try:
+        table.update_item(
+            Key={"id": plan["account_id"]},
+            UpdateExpression="SET #plan = :plan",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeNames={"#plan": DEFAULT_VPC_PLAN_ATTRIBUTE},
+            ExpressionAttributeValues={":plan": json.dumps(plan)},
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        logger.info(
+            f"No metadata record for {plan['account_id']}, plan not checkpointed"
+        )
+
+
 def trail_exists(session: Session) -> bool:
     client: CloudTrailClient = session.client("cloudtrail")
     logger.info("Checking for trail " + CLOUDTRAIL_TRAIL_NAME)
@@ -242,31 +582,35 @@ def create_trail(session: Session, s3_bucket: str, kms_key: str) -> None:
     )
 
 
+def build_event_selectors(log_bucket_arns: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "Name": "No Log Archive Buckets",
+            "FieldSelectors": [
+                {"Field": "eventCategory", "Equals": ["Data"]},
+                {"Field": "resources.type", "Equals": ["AWS::S3::Object"]},
+                {"Field": "resources.ARN", "NotEquals": log_bucket_arns},
+            ],
+        },
+        {
+            "Name": "Lamdba Functions",
+            "FieldSelectors": [
+                {"Field": "eventCategory", "Equals": ["Data"]},
+                {
+                    "Field": "resources.type",
+                    "Equals": ["AWS::Lambda::Function"],
+                },
+            ],
+        },
+    ]
+
+
 def put_event_selectors(session: Session, log_bucket_arns: List[str]) -> None:
     client = session.client("cloudtrail")
     logger.info("Putting Event Selectors")
     client.put_event_selectors(
         TrailName=CLOUDTRAIL_TRAIL_NAME,
-        AdvancedEventSelectors=[
-            {
-                "Name": "No Log Archive Buckets",
-                "FieldSelectors": [
-                    {"Field": "eventCategory", "Equals": ["Data"]},
-                    {"Field": "resources.type", "Equals": ["AWS::S3::Object"]},
-                    {"Field": "resources.ARN", "NotEquals": log_bucket_arns},
-                ],
-            },
-            {
-                "Name": "Lamdba Functions",
-                "FieldSelectors": [
-                    {"Field": "eventCategory", "Equals": ["Data"]},
-                    {
-                        "Field": "resources.type",
-                        "Equals": ["AWS::Lambda::Function"],
-                    },
-                ],
-            },
-        ],
+        AdvancedEventSelectors=build_event_selectors(log_bucket_arns),
     )
 
 
@@ -297,3 +641,132 @@ def get_target_account_and_customization_id_from_event(
 
 def is_valid_account_id(account_id: str) -> bool:
     return account_id.isdigit() and len(account_id) == 12
+
+
+class CloudTrailState(TypedDict):
+    exists: bool
+    advanced_event_selectors: Optional[List[Dict[str, Any]]]
+    is_logging: bool
+
+
+def get_trail_state(client: CloudTrailClient) -> CloudTrailState:
+    """
+    Reads everything the reconciler compares with a single client
+    """
+    try:
+        client.get_trail(Name=CLOUDTRAIL_TRAIL_NAME)
+    except client.exceptions.TrailNotFoundException:
+        return CloudTrailState(
+            exists=False, advanced_event_selectors=None, is_logging=False
+        )
+    selectors = client.get_event_selectors(TrailName=CLOUDTRAIL_TRAIL_NAME)
+    status = client.get_trail_status(Name=CLOUDTRAIL_TRAIL_NAME)
+    return CloudTrailState(
+        exists=True,
+        advanced_event_selectors=selectors.get("AdvancedEventSelectors"),
+        is_logging=status["IsLogging"],
+    )
+
+
+def _normalize_event_selectors(
+    selectors: Optional[Sequence[Mapping[str, Any]]],
+) -> List[Tuple[str, List[Tuple[str, Any]]]]:
+    # Selector and operator ordering carries no meaning, so compare sorted
+    normalized = []
+    for selector in selectors or []:
+        fields = []
+        for field_selector in selector["FieldSelectors"]:
+            operators = {
+                key: sorted(value) if isinstance(value, list) else value
+                for key, value in field_selector.items()
+                if key != "Field"
+            }
+            fields.append((field_selector["Field"], sorted(operators.items())))
+        normalized.append((selector.get("Name", ""), sorted(fields)))
+    return sorted(normalized)
+
+
+def get_cloudtrail_desired_state_hash(s3_bucket_name: str, kms_key_arn: str) -> str:
+    desired = {
+        "version": CLOUDTRAIL_DESIRED_STATE_VERSION,
+        "trail_name": CLOUDTRAIL_TRAIL_NAME,
+        "s3_bucket_name": s3_bucket_name,
+        "kms_key_arn": kms_key_arn,
+    }
+    return hashlib.sha256(json.dumps(desired, sort_keys=True).encode()).hexdigest()
+
+
+def cloudtrail_is_converged(aft_management_session: Session, desired_hash: str) -> bool:
+    """
+    True if a previous run converged the org trail to desired_hash within the
+    marker TTL. The TTL bounds how long drift, such as a new log archive
+    bucket, can go unnoticed
+    """
+    try:
+        marker = json.loads(
+            get_ssm_parameter_value(
+                aft_management_session, SSM_PARAM_CLOUDTRAIL_CONVERGED_MARKER
+            )
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "ParameterNotFound":
+            raise
+        return False
+    except ValueError:
+        return False
+    return bool(
+        marker.get("desired_hash") == desired_hash
+        and marker.get("expires_at", 0) > time.time()
+    )
+
+
+def record_cloudtrail_converged(
+    aft_management_session: Session,
+    desired_hash: str,
+    ttl_seconds: int = CLOUDTRAIL_CONVERGED_MARKER_TTL_SECONDS,
+) -> None:
+    client: SSMClient = aft_management_session.client("ssm")
+    client.put_parameter(
+        Name=SSM_PARAM_CLOUDTRAIL_CONVERGED_MARKER,
+        Value=json.dumps(
+            {"desired_hash": desired_hash, "expires_at": int(time.time()) + ttl_seconds}
+        ),
+        Type="String",
+        Overwrite=True,
+    )
+
+
+def reconcile_org_trail(
+    ct_management_session: Session,
+    log_archive_session: Session,
+    s3_bucket_name: str,
+    kms_key_arn: str,
+) -> List[str]:
+    """
+    Converges the AFT org trail to its desired state, applying only the
+    changes that differ. Returns the actions taken
+    """
+    client: CloudTrailClient = ct_management_session.client("cloudtrail")
+    state = get_trail_state(client)
+    actions = []
+
+    if not state["exists"]:
+        create_trail(ct_management_session, s3_bucket_name, kms_key_arn)
+        actions.append("create_trail")
+
+    desired_selectors = build_event_selectors(get_log_bucket_arns(log_archive_session))
+    if _normalize_event_selectors(
+        state["advanced_event_selectors"]
+    ) != _normalize_event_selectors(desired_selectors):
+        client.put_event_selectors(
+            TrailName=CLOUDTRAIL_TRAIL_NAME,
+            AdvancedEventSelectors=desired_selectors,
+        )
+        actions.append("put_event_selectors")
+
+    if not state["is_logging"]:
+        client.start_logging(Name=CLOUDTRAIL_TRAIL_NAME)
+        actions.append("start_logging")
+
+    logger.info(f"Org trail reconciled, actions: {actions or 'none'}")
+    return actions
@@ -17,10 +17,13 @@
 import json
 import logging
 import os
+import random
 from datetime import date, datetime
+from functools import lru_cache
 from json import JSONEncoder
-from typing import TYPE_CHECKING, Any, MutableMapping, Tuple
+from typing import TYPE_CHECKING, Any, Dict, MutableMapping, Optional, Tuple, Union
 
+import aft_common.aft_utils as utils
 from botocore.response import StreamingBody
 
 if TYPE_CHECKING:
@@ -28,37 +31,218 @@ if TYPE_CHECKING:
 else:
     from logging import LoggerAdapter
 
-
-_ORIGINAL_LOG_FACTORY = logging.getLogRecordFactory()
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 ACCOUNT_ID_FIELD_NAME = "account_id"
 CUSTOMIZATION_REQUEST_ID_FIELD_NAME = "customization_request_id"
 
+# Set on a LogRecord once record.msg holds a JSON document; callers logging
+# pre-encoded JSON may pass extra={JSON_ENCODED_FIELD_NAME: True}
+JSON_ENCODED_FIELD_NAME = "aft_json_encoded"
 
-def _already_json_encoded(blob: str) -> bool:
-    try:
-        json.loads(blob)
-        return True
-    except (json.JSONDecodeError, TypeError):
-        # TypeErrors are generated when attempting to loads an array/dict/obj
-        return False
+# Only JSON objects and arrays are passed through as pre-encoded; any other
+# string, including bare JSON scalars, is encoded without a trial parse
+_JSON_DOCUMENT_START_CHARS = frozenset("{[")
+
+# JSON object keyed by call site (plus "default"), each value a subset of
+# {"sample_rate": float, "max_bytes": int, "max_list_items": int}
+PAYLOAD_LOG_POLICY_ENV_VAR = "AFT_LOG_PAYLOAD_POLICY"
+DEFAULT_PAYLOAD_LOG_POLICY_KEY = "default"
 
 
 class _AFTEncoder(JSONEncoder):
     def default(self, obj: object) -> object:
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, StreamingBody):
-            return obj.read().decode()
-        else:
-            return JSONEncoder.default(self, obj)
+        return _encode_default(obj)
+
+
+def _encode_default(obj: object) -> object:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif isinstance(obj, StreamingBody):
+        return obj.read().decode()
+    elif isinstance(obj, LazyLogPayload):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _use_orjson() -> bool:
+    return (
+        orjson is not None
+        and os.environ.get("AFT_LOG_JSON_ENCODER", "orjson").lower() == "orjson"
+    )
+
+
+def _json_encode(obj: Any) -> str:
+    if _use_orjson():
+        try:
+            encoded: bytes = orjson.dumps(
+                obj, default=_encode_default, option=orjson.OPT_NON_STR_KEYS
+            )
+            return encoded.decode()
+        except TypeError:
+            # orjson is stricter than json (e.g. integers > 64 bits), defer to json
+            pass
+    try:
+        return json.dumps(obj, cls=_AFTEncoder)
+    except TypeError:
+        return json.dumps(str(obj))
+
+
+class LazyLogPayload:
+    """
+    Wraps a payload so that str() and sanitization only run if the record is
+    emitted, e.g. logger.debug("Response: %s", LazyLogPayload(response))
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Any) -> None:
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return utils.sanitize_input_for_logging(self.payload)
+
+
+class PayloadLogPolicy:
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        max_bytes: int = 8192,
+        max_list_items: int = 10,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_list_items = max_list_items
+
+    def sampled(self) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        return (
+            random.random()  # nosec B311: Not using random numbers in a security context
+            < self.sample_rate
+        )
+
+
+@lru_cache(maxsize=None)
+def _get_payload_log_policies() -> Dict[str, Dict[str, Any]]:
+    raw_policies = os.environ.get(PAYLOAD_LOG_POLICY_ENV_VAR)
+    if not raw_policies:
+        return {}
+    try:
+        policies = json.loads(raw_policies)
+    except json.JSONDecodeError:
+        logging.getLogger("aft").warning(
+            f"Ignoring malformed {PAYLOAD_LOG_POLICY_ENV_VAR} environment variable"
+        )
+        return {}
+    return policies if isinstance(policies, dict) else {}
+
+
+def get_payload_log_policy(call_site: str) -> PayloadLogPolicy:
+    """
+    Resolves the policy for a call site; call site settings override the
+    "default" entry, which overrides the PayloadLogPolicy defaults
+    """
+    policies = _get_payload_log_policies()
+    settings = dict(policies.get(DEFAULT_PAYLOAD_LOG_POLICY_KEY, {}))
+    settings.update(policies.get(call_site, {}))
+    return PayloadLogPolicy(
+        sample_rate=float(settings.get("sample_rate", 1.0)),
+        max_bytes=int(settings.get("max_bytes", 8192)),
+        max_list_items=int(settings.get("max_list_items", 10)),
+    )
+
+
+def _summarize_payload(payload: Any, max_list_items: int, noun: str) -> Any:
+    if isinstance(payload, dict):
+        return {
+            key: _summarize_payload(value, max_list_items, noun="items")
+            for key, value in payload.items()
+        }
+    if isinstance(payload, (list, tuple, set, frozenset)):
+        items = list(payload)
+        head = [
+            _summarize_payload(item, max_list_items, noun="items")
+            for item in items[:max_list_items]
+        ]
+        if len(items) <= max_list_items:
+            return head
+        return f"{len(items):,} {noun}, first {max_list_items}: {head}"
+    return payload
+
+
+class _PolicyRenderedPayload(LazyLogPayload):
+    __slots__ = ("policy", "noun")
+
+    def __init__(self, payload: Any, policy: PayloadLogPolicy, noun: str) -> None:
+        super().__init__(payload)
+        self.policy = policy
+        self.noun = noun
+
+    def __str__(self) -> str:
+        summarized = _summarize_payload(
+            self.payload, self.policy.max_list_items, noun=self.noun
+        )
+        rendered = utils.sanitize_input_for_logging(summarized)
+        encoded = rendered.encode()
+        if len(encoded) <= self.policy.max_bytes:
+            return rendered
+        truncated = encoded[: self.policy.max_bytes].decode(errors="ignore")
+        return (
+            f"{truncated}...[truncated {len(encoded) - self.policy.max_bytes:,} bytes]"
+        )
+
+
+def log_payload(
+    logger: Union[logging.Logger, LoggerAdapter],
+    call_site: str,
+    message: str,
+    payload: Any,
+    level: int = logging.INFO,
+    noun: str = "items",
+) -> None:
+    """
+    Logs a large payload (boto3 responses, account payloads, target lists)
+    subject to the call site's PayloadLogPolicy: sampled, lists summarized
+    to their first max_list_items entries and output capped at max_bytes.
+    Rendering is deferred until the record is emitted.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    policy = get_payload_log_policy(call_site)
+    if not policy.sampled():
+        return
+    logger.log(
+        level,
+        "%s: %s",
+        message,
+        _PolicyRenderedPayload(payload, policy, noun),
+        stacklevel=2,
+    )
+
+
+class _StructuredMessage:
+    """
+    Log message whose fields are serialized by _AFTFormatter at emit time
+    """
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]) -> None:
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return _json_encode(self.fields)
 
 
 class _AccountCustomizationAdapter(LoggerAdapter):
     def process(
         self, message: str, kwargs: MutableMapping[str, Any]
-    ) -> Tuple[str, MutableMapping[str, Any]]:
+    ) -> Tuple[Any, MutableMapping[str, Any]]:
         # Handle optionality
         if self.extra is None:
             self.extra = {}
@@ -69,17 +253,51 @@ class _AccountCustomizationAdapter(LoggerAdapter):
             ),
             "detail": message,
         }
-        return (
-            json.dumps(log_tracing, cls=_AFTEncoder),
-            kwargs,
-        )
+        return _StructuredMessage(log_tracing), kwargs
+
 
+def _is_json_document(message: str) -> bool:
+    stripped = message.lstrip()
+    if not stripped or stripped[0] not in _JSON_DOCUMENT_START_CHARS:
+        return False
+    try:
+        json.loads(stripped)
+        return True
+    except json.JSONDecodeError:
+        return False
 
-def _aft_record_factory(*args: Any, **kwargs: Any) -> logging.LogRecord:
-    record = _ORIGINAL_LOG_FACTORY(*args, **kwargs)
-    if isinstance(record.msg, dict) or not _already_json_encoded(record.msg):
-        record.msg = json.dumps(record.msg, cls=_AFTEncoder)
-    return record
+
+def _encode_record_message(record: logging.LogRecord) -> None:
+    """
+    Replaces record.msg with its JSON encoding exactly once per record.
+    Runs at emit time, so records dropped by logger or handler levels are
+    never serialized. Strings that already hold a JSON document are passed
+    through unchanged.
+    """
+    if getattr(record, JSON_ENCODED_FIELD_NAME, False):
+        return
+
+    msg = record.msg
+    if isinstance(msg, _StructuredMessage):
+        fields = msg.fields
+        if record.args and isinstance(fields.get("detail"), str):
+            fields = dict(fields, detail=fields["detail"] % record.args)
+        encoded = _json_encode(fields)
+    elif isinstance(msg, str):
+        message = record.getMessage() if record.args else msg
+        encoded = message if _is_json_document(message) else _json_encode(message)
+    else:
+        encoded = _json_encode(msg)
+
+    record.msg = encoded
+    record.args = None
+    setattr(record, JSON_ENCODED_FIELD_NAME, True)
+
+
+class _AFTFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        _encode_record_message(record)
+        return super().format(record)
 
 
 def _get_log_level() -> str:
@@ -96,13 +314,11 @@ def configure_aft_logger() -> None:
     else:
         console = logging.StreamHandler()
         root_logger.addHandler(console)
-    console.setFormatter(logging.Formatter(fmt))
+    console.setFormatter(_AFTFormatter(fmt))
 
     aft_logger = logging.getLogger("aft")
     aft_logger.setLevel(_get_log_level())
 
-    logging.setLogRecordFactory(_aft_record_factory)
-
 
 def customization_request_logger(
     aws_account_id: str,
@@ -3,18 +3,37 @@
 
 import argparse
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional, TypedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict
 
 import aft_common.constants
 import requests
-from aft_common import aft_utils as utils
 from aft_common.auth import AuthClient
-from aft_common.ssm import get_ssm_parameter_value
 from boto3.session import Session
+from botocore.credentials import ReadOnlyCredentials
+
+if TYPE_CHECKING:
+    from mypy_boto3_ssm import SSMClient
+else:
+    SSMClient = object
 
 logger = logging.getLogger("aft")
 
+METRICS_API_ENDPOINT = "https://metrics.awssolutionsbuilder.com/generic"
+METRICS_POST_TIMEOUT_SECONDS = 5
+METRICS_FLUSH_TIMEOUT_SECONDS = 2.0
+
+_DEPLOYMENT_CONFIG_PARAMETERS = {
+    "cloud_trail_enabled": aft_common.constants.SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED,
+    "enterprise_support_enabled": aft_common.constants.SSM_PARAM_FEATURE_ENTERPRISE_SUPPORT_ENABLED,
+    "delete_default_vpc_enabled": aft_common.constants.SSM_PARAM_FEATURE_DEFAULT_VPCS_ENABLED,
+    "aft_version": aft_common.constants.SSM_PARAM_ACCOUNT_AFT_VERSION,
+    "terraform_version": aft_common.constants.SSM_PARAM_ACCOUNT_TERRAFORM_VERSION,
+}
+
 
 class MetricsPayloadType(TypedDict):
     Solution: str
@@ -24,120 +43,232 @@ class MetricsPayloadType(TypedDict):
     Data: Dict[str, Any]
 
 
-class AFTMetrics:
-    def __init__(self) -> None:
-        self.solution_id = "SO0089-aft"
-        self.api_endpoint = "https://metrics.awssolutionsbuilder.com/generic"
-        self.auth = AuthClient()
+class _DeploymentContext(TypedDict):
+    reporting_enabled: bool
+    version: Optional[str]
+    uuid: Optional[str]
+    config: Optional[Dict[str, str]]
+    errors: List[str]
 
-    def _get_uuid(self, aft_management_session: Session) -> str:
-        uuid = get_ssm_parameter_value(
-            aft_management_session,
-            aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING_UUID,
-        )
-        return uuid
 
-    def _metrics_reporting_enabled(self, aft_management_session: Session) -> bool:
-        flag = get_ssm_parameter_value(
-            aft_management_session, aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING
-        )
+# Memoization - deployment config is read once per container
+_DEPLOYMENT_CONTEXT: Optional[_DeploymentContext] = None
+_DEPLOYMENT_CONTEXT_LOCK = threading.Lock()
 
-        if flag.lower() == "true":
-            return True
-        return False
 
-    def _get_aft_deployment_config(
-        self, aft_management_session: Session
-    ) -> Dict[str, str]:
-        config = {}
+def _load_deployment_context(aft_management_session: Session) -> _DeploymentContext:
+    """
+    Reads every parameter the metrics payload needs with a single
+    GetParameters call instead of one GetParameter per value
+    """
+    global _DEPLOYMENT_CONTEXT
+    with _DEPLOYMENT_CONTEXT_LOCK:
+        if _DEPLOYMENT_CONTEXT is not None:
+            return _DEPLOYMENT_CONTEXT
 
-        config["cloud_trail_enabled"] = get_ssm_parameter_value(
-            aft_management_session,
-            aft_common.constants.SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED,
-        )
-        config["enterprise_support_enabled"] = get_ssm_parameter_value(
-            aft_management_session,
-            aft_common.constants.SSM_PARAM_FEATURE_ENTERPRISE_SUPPORT_ENABLED,
-        )
-        config["delete_default_vpc_enabled"] = get_ssm_parameter_value(
-            aft_management_session,
-            aft_common.constants.SSM_PARAM_FEATURE_DEFAULT_VPCS_ENABLED,
-        )
+        names = [
+            aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING,
+            aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING_UUID,
+            *_DEPLOYMENT_CONFIG_PARAMETERS.values(),
+        ]
+        client: SSMClient = aft_management_session.client("ssm")
+        response = client.get_parameters(Names=names)
+        values = {param["Name"]: param["Value"] for param in response["Parameters"]}
+        errors = [
+            f"ParameterNotFound: {name}" for name in response["InvalidParameters"]
+        ]
+
+        config: Optional[Dict[str, str]] = None
+        if all(name in values for name in _DEPLOYMENT_CONFIG_PARAMETERS.values()):
+            config = {
+                key: values[name] for key, name in _DEPLOYMENT_CONFIG_PARAMETERS.items()
+            }
+            config["region"] = str(aft_management_session.region_name)
+
+        _DEPLOYMENT_CONTEXT = {
+            "reporting_enabled": values.get(
+                aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING, ""
+            ).lower()
+            == "true",
+            "version": values.get(aft_common.constants.SSM_PARAM_ACCOUNT_AFT_VERSION),
+            "uuid": values.get(
+                aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING_UUID
+            ),
+            "config": config,
+            "errors": errors,
+        }
+        return _DEPLOYMENT_CONTEXT
 
-        config["aft_version"] = get_ssm_parameter_value(
-            aft_management_session, aft_common.constants.SSM_PARAM_ACCOUNT_AFT_VERSION
-        )
 
-        config["terraform_version"] = get_ssm_parameter_value(
-            aft_management_session,
-            aft_common.constants.SSM_PARAM_ACCOUNT_TERRAFORM_VERSION,
-        )
+# Frozen credentials, region name, timestamp and event
+_QueuedEvent = Tuple[Optional[ReadOnlyCredentials], Optional[str], str, Dict[str, Any]]
 
-        config["region"] = utils.get_session_info(aft_management_session)["region"]
 
-        return config
+def _build_publisher_session(
+    credentials: Optional[ReadOnlyCredentials], region_name: Optional[str]
+) -> Session:
+    if credentials is None:
+        return Session(region_name=region_name)
+    return Session(
+        aws_access_key_id=credentials.access_key,
+        aws_secret_access_key=credentials.secret_key,
+        aws_session_token=credentials.token,
+        region_name=region_name,
+    )
 
-    def wrap_event_for_api(
-        self, aft_management_session: Session, event: Dict[str, Any]
-    ) -> MetricsPayloadType:
-        payload: MetricsPayloadType = {
-            "Solution": self.solution_id,
-            "TimeStamp": datetime.utcnow().isoformat(timespec="seconds"),
-            "Version": None,
-            "UUID": None,
-            "Data": {},
-        }
-        payload["Solution"] = self.solution_id
 
-        data_body: Dict[str, Any] = {}
-        data_body["event"] = event
+class _MetricsPublisher:
+    """
+    Background thread that drains buffered events to the metrics API over a
+    pooled HTTP session. All failures are logged and dropped.
 
-        errors = []
+    boto3 sessions are not thread-safe, so callers hand over frozen
+    credentials and the thread builds its own session from them.
+    """
 
-        try:
-            payload["Version"] = get_ssm_parameter_value(
-                aft_management_session,
-                aft_common.constants.SSM_PARAM_ACCOUNT_AFT_VERSION,
+    def __init__(self) -> None:
+        self._events: "queue.Queue[_QueuedEvent]" = queue.Queue()
+        self._http = requests.Session()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def submit(
+        self, aft_management_session: Session, timestamp: str, event: Dict[str, Any]
+    ) -> None:
+        credentials = aft_management_session.get_credentials()
+        self._ensure_started()
+        self._events.put(
+            (
+                credentials.get_frozen_credentials() if credentials else None,
+                aft_management_session.region_name,
+                timestamp,
+                event,
             )
-        except Exception as e:
-            payload["Version"] = None
-            errors.append(str(e))
-
-        try:
-            payload["UUID"] = self._get_uuid(aft_management_session)
-        except Exception as e:
-            payload["UUID"] = None
-            errors.append(str(e))
+        )
 
-        try:
-            data_body["config"] = self._get_aft_deployment_config(
-                aft_management_session
+    def flush(self, timeout_seconds: float) -> bool:
+        deadline = time.monotonic() + timeout_seconds
+        with self._events.all_tasks_done:
+            while self._events.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info(
+                        f"Metrics flush timed out with {self._events.unfinished_tasks} events pending"
+                    )
+                    return False
+                self._events.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="aft-metrics", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            credentials, region_name, timestamp, event = self._events.get()
+            try:
+                self._publish(credentials, region_name, timestamp, event)
+            except Exception as e:
+                logger.info(f"Unable to report metrics. Event: {event}; Error: {e}")
+            finally:
+                self._events.task_done()
+
+    def _publish(
+        self,
+        credentials: Optional[ReadOnlyCredentials],
+        region_name: Optional[str],
+        timestamp: str,
+        event: Dict[str, Any],
+    ) -> None:
+        context = _DEPLOYMENT_CONTEXT
+        if context is None:
+            context = _load_deployment_context(
+                _build_publisher_session(credentials, region_name)
             )
-        except Exception as e:
-            data_body["config"] = None
-            errors.append(str(e))
+        if not context["reporting_enabled"]:
+            return
+        payload = _wrap_event(context, timestamp, event)
+        self._http.post(
+            METRICS_API_ENDPOINT, json=payload, timeout=METRICS_POST_TIMEOUT_SECONDS
+        )
 
-        if not errors:
-            data_body["error"] = None
-        else:
-            data_body["error"] = " | ".join(errors)
 
-        payload["Data"] = data_body
+def _wrap_event(
+    context: _DeploymentContext, timestamp: str, event: Dict[str, Any]
+) -> MetricsPayloadType:
+    return {
+        "Solution": AFTMetrics.SOLUTION_ID,
+        "TimeStamp": timestamp,
+        "Version": context["version"],
+        "UUID": context["uuid"],
+        "Data": {
+            "event": event,
+            "config": context["config"],
+            "error": " | ".join(context["errors"]) if context["errors"] else None,
+        },
+    }
 
-        return payload
 
-    def post_event(self, action: str, status: Optional[str] = None) -> None:
-        aft_management_session = self.auth.get_aft_management_session()
+_PUBLISHER = _MetricsPublisher()
 
-        if self._metrics_reporting_enabled(aft_management_session):
-            event = {"action": action, "status": status}
 
-            payload = self.wrap_event_for_api(aft_management_session, event)
+class AFTMetrics:
+    SOLUTION_ID = "SO0089-aft"
+
+    def __init__(self, auth: Optional[AuthClient] = None) -> None:
+        self.solution_id = AFTMetrics.SOLUTION_ID
+        self.api_endpoint = METRICS_API_ENDPOINT
+        # Avoid building an AuthClient (SSM + STS calls) just to report metrics
+        self.aft_management_session = (
+            auth.get_aft_management_session() if auth is not None else Session()
+        )
+
+    def _metrics_reporting_enabled(self, aft_management_session: Session) -> bool:
+        return _load_deployment_context(aft_management_session)["reporting_enabled"]
 
-            response = requests.post(self.api_endpoint, json=payload)
+    def wrap_event_for_api(
+        self, aft_management_session: Session, event: Dict[str, Any]
+    ) -> MetricsPayloadType:
+        try:
+            context = _load_deployment_context(aft_management_session)
+        except Exception as e:
+            context = {
+                "reporting_enabled": False,
+                "version": None,
+                "uuid": None,
+                "config": None,
+                "errors": [str(e)],
+            }
+        return _wrap_event(
+            context, datetime.utcnow().isoformat(timespec="seconds"), event
+        )
 
+    def post_event(self, action: str, status: Optional[str] = None) -> None:
+        """
+        Buffers the event for the background publisher and returns
+        immediately; call flush() before the invocation or process ends
+        """
+        event = {"action": action, "status": status}
+        _PUBLISHER.submit(
+            self.aft_management_session,
+            datetime.utcnow().isoformat(timespec="seconds"),
+            event,
+        )
         return None
 
+    @staticmethod
+    def flush(timeout_seconds: float = METRICS_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """
+        Waits up to timeout_seconds for buffered events to be sent. Lambda
+        freezes background threads between invocations, so handlers call this
+        before returning. Returns False if events were still pending.
+        """
+        return _PUBLISHER.flush(timeout_seconds)
+
 
 # Executes when run as a script from the CodeBuild containers
 if __name__ == "__main__":
@@ -162,6 +293,7 @@ if __name__ == "__main__":
     try:
         aft_metrics = AFTMetrics()
         aft_metrics.post_event(action=args.codebuild_name, status=args.codebuild_status)
+        aft_metrics.flush(timeout_seconds=METRICS_POST_TIMEOUT_SECONDS)
         logger.info(f"Successfully logged metrics. Action: {args.codebuild_name}")
     except Exception as e:
         logger.info(
@@ -1,12 +1,23 @@
 # Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 #
-from typing import TYPE_CHECKING
+import logging
+import math
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, TypedDict
 
 from aft_common.aft_utils import (
     get_high_retry_botoconfig,
     resubmit_request_on_boto_throttle,
 )
+from aft_common.constants import SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE
+from aft_common.ddb import (
+    batch_get_ddb_items,
+    batch_put_ddb_items,
+    get_ddb_item,
+    put_ddb_item,
+)
+from aft_common.ssm import get_ssm_parameter_value
 from boto3.session import Session
 from botocore.config import Config
 
@@ -15,46 +26,265 @@ if TYPE_CHECKING:
 else:
     SupportClient = object
 
+logger = logging.getLogger("aft")
+
 SUPPORT_API_REGION = "us-east-1"
+# Keeps the account list well inside the 8000 character case body limit
+ENROLLMENT_CASE_MAX_ACCOUNTS = 500
 
 
-@resubmit_request_on_boto_throttle
-def account_enrollment_requested(
-    ct_management_session: Session, account_id: str
-) -> bool:
-    """
-    Query the open support cases, if a case is open with the expected title, return True
-    else we return False
-    """
-    submitted_enroll_case_title = f"Add Account {account_id} to Enterprise Support"
+class BatchEnrollmentResult(TypedDict):
+    already_enrolled: List[str]
+    # Case ID -> accounts included in that consolidated case
+    cases: Dict[str, List[str]]
+    # Requested IDs that are not 12 digit account IDs, never enrolled
+    invalid_account_ids: List[str]
 
+
+def get_enrollment_case_subject(account_id: str) -> str:
+    return f"Add Account {account_id} to Enterprise Support"
+
+
+def _get_support_client(session: Session) -> SupportClient:
     # Must use us-east-1 region for Support API
     botoconfig = Config.merge(
         get_high_retry_botoconfig(), Config(region_name=SUPPORT_API_REGION)
     )
-    client: SupportClient = ct_management_session.client("support", config=botoconfig)
+    return session.client("support", config=botoconfig)
+
+
+def get_enrollment_ledger_case_id(
+    aft_management_session: Session, account_id: str
+) -> Optional[str]:
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE
+    )
+    item = get_ddb_item(aft_management_session, table_name, {"id": account_id})
+    if item is None:
+        return None
+    return str(item["case_id"])
+
+
+def get_enrollment_ledger_case_ids(
+    aft_management_session: Session, account_ids: Sequence[str]
+) -> Dict[str, str]:
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE
+    )
+    items = batch_get_ddb_items(
+        aft_management_session,
+        table_name,
+        [{"id": account_id} for account_id in account_ids],
+    )
+    return {str(item["id"]): str(item["case_id"]) for item in items}
+
+
+def _build_ledger_item(account_id: str, case_id: str, subject: str) -> Dict[str, str]:
+    return {
+        "id": account_id,
+        "case_id": case_id,
+        "subject": subject,
+        "recorded_time": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def record_enrollment_case(
+    aft_management_session: Session, account_id: str, case_id: str
+) -> None:
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE
+    )
+    put_ddb_item(
+        aft_management_session,
+        table_name,
+        _build_ledger_item(
+            account_id, case_id, get_enrollment_case_subject(account_id)
+        ),
+    )
+
+
+def get_case_after_time(joined_date: Optional[str]) -> Optional[str]:
+    """
+    An account's enrollment case cannot predate the account joining the
+    organization, so its joined date bounds the case scan
+    """
+    if not joined_date:
+        return None
+    try:
+        return datetime.fromisoformat(joined_date).isoformat()
+    except ValueError:
+        logger.warning(f"Unable to parse joined date {joined_date}, scanning all cases")
+        return None
+
+
+@resubmit_request_on_boto_throttle
+def get_enrollment_case_index(
+    ct_management_session: Session, after_time: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Scans the support cases created after after_time once and indexes their
+    case IDs by subject, so any number of accounts can be looked up
+    """
+    client = _get_support_client(ct_management_session)
     paginator = client.get_paginator("describe_cases")
-    pages = paginator.paginate(
+    params = dict(
         includeResolvedCases=True,
         language="en",
         includeCommunications=False,
     )
-    for page in pages:
+    if after_time is not None:
+        params["afterTime"] = after_time
+
+    index: Dict[str, str] = {}
+    for page in paginator.paginate(**params):
         for case in page["cases"]:
-            if case["subject"] == submitted_enroll_case_title:
-                return True
+            index.setdefault(case["subject"], case["caseId"])
+    logger.info(f"Indexed {len(index)} support case subjects")
+    return index
+
+
+def account_enrollment_requested(
+    ct_management_session: Session,
+    account_id: str,
+    aft_management_session: Optional[Session] = None,
+    case_index: Optional[Dict[str, str]] = None,
+    after_time: Optional[str] = None,
+) -> bool:
+    """
+    Returns True if an enrollment case was already raised for the account.
 
-    return False
+    The enrollment ledger is checked first. Otherwise the subject index is
+    consulted, built from a case scan bounded by after_time if not provided,
+    and a match is backfilled into the ledger
+    """
+    if aft_management_session is not None:
+        case_id = get_enrollment_ledger_case_id(aft_management_session, account_id)
+        if case_id is not None:
+            logger.info(f"Enrollment case {case_id} found in ledger for {account_id}")
+            return True
 
+    if case_index is None:
+        case_index = get_enrollment_case_index(
+            ct_management_session, after_time=after_time
+        )
+    case_id = case_index.get(get_enrollment_case_subject(account_id))
+    if case_id is None:
+        return False
 
-def generate_case(session: Session, account_id: str) -> None:
+    if aft_management_session is not None:
+        record_enrollment_case(aft_management_session, account_id, case_id)
+    return True
+
+
+def generate_case(
+    session: Session,
+    account_id: str,
+    aft_management_session: Optional[Session] = None,
+) -> str:
     support: SupportClient = session.client("support", region_name=SUPPORT_API_REGION)
-    support.create_case(
+    response = support.create_case(
         issueType="customer-service",
         serviceCode="account-management",
         categoryCode="billing",
         severityCode="low",
-        subject=f"Add Account {account_id} to Enterprise Support",
+        subject=get_enrollment_case_subject(account_id),
         communicationBody=f"Please add account number {account_id} to our enterprise support plan.",
         language="en",
     )
+    case_id = response["caseId"]
+    if aft_management_session is not None:
+        record_enrollment_case(aft_management_session, account_id, case_id)
+    return case_id
+
+
+def _chunk_accounts(account_ids: List[str], case_count: int) -> List[List[str]]:
+    case_count = max(
+        1, case_count, math.ceil(len(account_ids) / ENROLLMENT_CASE_MAX_ACCOUNTS)
+    )
+    size = math.ceil(len(account_ids) / case_count)
+    return [
+        account_ids[start : start + size] for start in range(0, len(account_ids), size)
+    ]
+
+
+def enroll_accounts_in_batches(
+    ct_management_session: Session,
+    aft_management_session: Session,
+    account_ids: Sequence[str],
+    case_count: int = 1,
+    after_time: Optional[str] = None,
+) -> BatchEnrollmentResult:
+    """
+    Raises consolidated enrollment cases for every account in account_ids not
+    already enrolled, using at least case_count cases.
+
+    Accounts are deduplicated against the ledger with BatchGetItem, then
+    against a single case scan for enrollment cases raised before the ledger
+    existed. Every account is recorded in the ledger with the case that
+    covers it, so re-running after a partial failure only raises cases for
+    accounts that are still pending
+    """
+    account_ids = list(dict.fromkeys(account_ids))
+    ledger = get_enrollment_ledger_case_ids(aft_management_session, account_ids)
+    pending = [account_id for account_id in account_ids if account_id not in ledger]
+
+    backfill: List[Dict[str, str]] = []
+    if pending:
+        case_index = get_enrollment_case_index(
+            ct_management_session, after_time=after_time
+        )
+        still_pending = []
+        for account_id in pending:
+            subject = get_enrollment_case_subject(account_id)
+            if subject in case_index:
+                backfill.append(
+                    _build_ledger_item(account_id, case_index[subject], subject)
+                )
+            else:
+                still_pending.append(account_id)
+        pending = still_pending
+
+    table_name = get_ssm_parameter_value(
+        aft_management_session, SSM_PARAM_AFT_DDB_SUPPORT_ENROLLMENT_TABLE
+    )
+    if backfill:
+        batch_put_ddb_items(aft_management_session, table_name, backfill)
+
+    pending_ids = set(pending)
+    result = BatchEnrollmentResult(
+        already_enrolled=[
+            account_id for account_id in account_ids if account_id not in pending_ids
+        ],
+        cases={},
+        invalid_account_ids=[],
+    )
+    if not pending:
+        logger.info("All accounts already have an enrollment case")
+        return result
+
+    support = _get_support_client(ct_management_session)
+    chunks = _chunk_accounts(pending, case_count)
+    for number, chunk in enumerate(chunks, start=1):
+        subject = (
+            f"Add {len(chunk)} accounts to Enterprise Support ({number}/{len(chunks)})"
+        )
+        account_lines = "\n".join(chunk)
+        response = support.create_case(
+            issueType="customer-service",
+            serviceCode="account-management",
+            categoryCode="billing",
+            severityCode="low",
+            subject=subject,
+            communicationBody=f"Please add the following account numbers to our enterprise support plan:\n{account_lines}",
+            language="en",
+        )
+        case_id = response["caseId"]
+        # Recorded per case so a failure on a later case keeps earlier progress
+        batch_put_ddb_items(
+            aft_management_session,
+            table_name,
+            [_build_ledger_item(account_id, case_id, subject) for account_id in chunk],
+        )
+        result["cases"][case_id] = chunk
+        logger.info(f"Raised enrollment case {case_id} for {len(chunk)} accounts")
+    return result
@@ -0,0 +1,315 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, TypedDict
+
+import aft_common.aft_utils as utils
+from aft_common.account_provisioning_framework import ProvisionRoles
+from aft_common.auth import AuthClient
+from aft_common.constants import SSM_PARAM_ACCOUNT_CT_MANAGEMENT_ACCOUNT_ID
+from aft_common.logger import configure_aft_logger
+from aft_common.organizations import OrganizationsAgent
+from aft_common.ssm import get_ssm_parameter_value
+from boto3.session import Session
+
+if TYPE_CHECKING:
+    from mypy_boto3_iam import IAMClient
+    from mypy_boto3_sts import STSClient
+else:
+    IAMClient = object
+    STSClient = object
+
+logger = logging.getLogger("aft")
+
+RECONCILE_MAX_WORKERS = 16
+# Role chaining caps the CT management session at one hour; it is refreshed
+# well before that so long fleet runs never use expired credentials
+CT_MANAGEMENT_SESSION_DURATION_SECONDS = 3600
+CT_MANAGEMENT_SESSION_REFRESH_SECONDS = 2700
+TARGET_ACCOUNT_SESSION_DURATION_SECONDS = 900
+
+RECONCILE_STATUS_IN_SYNC = "in_sync"
+RECONCILE_STATUS_CHANGED = "changed"
+RECONCILE_STATUS_DRIFTED = "drifted"  # dry run only
+RECONCILE_STATUS_FAILED = "failed"
+
+
+class AccountReconciliationResult(TypedDict):
+    account_id: str
+    status: str
+    changes: Dict[str, List[str]]
+    error: Optional[str]
+
+
+class RoleReconciliationReport(TypedDict):
+    dry_run: bool
+    elapsed_seconds: float
+    account_count: int
+    status_counts: Dict[str, int]
+    changed: List[AccountReconciliationResult]
+    failed: List[AccountReconciliationResult]
+    # Accounts not attempted before the deadline; pass them to a follow-up run
+    skipped_account_ids: List[str]
+
+
+class AftRoleReconciler:
+    """
+    Converges the AFT roles across many accounts without going through the
+    provisioning pipeline. Each account is diffed with a GetRole and a
+    ListAttachedRolePolicies call per role, and only the missing changes are
+    applied
+    """
+
+    def __init__(
+        self,
+        auth: AuthClient,
+        max_workers: int = RECONCILE_MAX_WORKERS,
+        dry_run: bool = False,
+    ) -> None:
+        self.auth = auth
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+
+        aft_management_session = auth.get_aft_management_session()
+        self.ct_management_account_id = get_ssm_parameter_value(
+            aft_management_session, SSM_PARAM_ACCOUNT_CT_MANAGEMENT_ACCOUNT_ID
+        )
+        self.partition = utils.get_aws_partition(aft_management_session)
+
+        # Desired state is identical for every account
+        provisioning = ProvisionRoles(
+            auth=auth, account_id=self.ct_management_account_id
+        )
+        self.trust_policy = provisioning.generate_aft_trust_policy()
+        self.policy_arn = provisioning.ADMINISTRATOR_ACCESS_MANAGED_POLICY_ARN
+        self.role_names = [
+            ProvisionRoles.SERVICE_ROLE_NAME,
+            ProvisionRoles.EXECUTION_ROLE_NAME,
+        ]
+
+        self._session_lock = threading.Lock()
+        self._ct_management_session: Optional[Session] = None
+        self._ct_management_sts: Optional[STSClient] = None
+        self._ct_management_session_created_at = 0.0
+
+    def _get_ct_management_session(self) -> Session:
+        with self._session_lock:
+            age = time.monotonic() - self._ct_management_session_created_at
+            if (
+                self._ct_management_session is None
+                or age > CT_MANAGEMENT_SESSION_REFRESH_SECONDS
+            ):
+                self._ct_management_session = self.auth.get_ct_management_session(
+                    role_name=ProvisionRoles.SERVICE_ROLE_NAME,
+                    session_duration=CT_MANAGEMENT_SESSION_DURATION_SECONDS,
+                )
+                # Clients are thread-safe, sessions are not: share one STS client
+                self._ct_management_sts = self._ct_management_session.client(
+                    "sts", config=utils.get_high_retry_botoconfig()
+                )
+                self._ct_management_session_created_at = time.monotonic()
+            return self._ct_management_session
+
+    def _get_target_account_session(self, account_id: str) -> Session:
+        ct_management_session = self._get_ct_management_session()
+        if account_id == self.ct_management_account_id:
+            return ct_management_session
+
+        sts = self._ct_management_sts
+        assert sts is not None  # nosec B101: set with the session above
+        credentials = sts.assume_role(
+            RoleArn=AuthClient._build_role_arn(
+                partition=self.partition,
+                account_id=account_id,
+                role_name=AuthClient.CONTROL_TOWER_EXECUTION_ROLE_NAME,
+            ),
+            RoleSessionName=self.auth._assume_role_session_name,
+            DurationSeconds=TARGET_ACCOUNT_SESSION_DURATION_SECONDS,
+        )["Credentials"]
+        return Session(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+            region_name=ct_management_session.region_name,
+        )
+
+    def reconcile_account(self, account_id: str) -> AccountReconciliationResult:
+        changes: Dict[str, List[str]] = {}
+        try:
+            session = self._get_target_account_session(account_id=account_id)
+            # Adaptive retry mode backs off client-side when IAM throttles
+            client: IAMClient = session.client(
+                "iam", config=utils.get_high_retry_botoconfig()
+            )
+            for role_name in self.role_names:
+                role_changes = ProvisionRoles.get_role_changes(
+                    client=client,
+                    role_name=role_name,
+                    trust_policy=self.trust_policy,
+                    policy_arn=self.policy_arn,
+                )
+                if not role_changes:
+                    continue
+                changes[role_name] = role_changes
+                if not self.dry_run:
+                    ProvisionRoles.apply_role_changes(
+                        client=client,
+                        role_name=role_name,
+                        trust_policy=self.trust_policy,
+                        policy_arn=self.policy_arn,
+                        changes=role_changes,
+                    )
+        except Exception as error:
+            # Any failure, including botocore connection errors, is confined
+            # to this account so the fleet run still produces its report
+            logger.exception(f"Failed to reconcile AFT roles in {account_id}: {error}")
+            return AccountReconciliationResult(
+                account_id=account_id,
+                status=RECONCILE_STATUS_FAILED,
+                changes=changes,
+                error=str(error),
+            )
+
+        if not changes:
+            status = RECONCILE_STATUS_IN_SYNC
+        elif self.dry_run:
+            status = RECONCILE_STATUS_DRIFTED
+        else:
+            status = RECONCILE_STATUS_CHANGED
+        return AccountReconciliationResult(
+            account_id=account_id, status=status, changes=changes, error=None
+        )
+
+    def reconcile(
+        self, account_ids: Iterable[str], deadline_seconds: Optional[float] = None
+    ) -> RoleReconciliationReport:
+        """
+        Reconciles account_ids with at most max_workers accounts in flight.
+        When deadline_seconds is set, no new account is started after it
+        elapses and the remainder is reported in skipped_account_ids
+        """
+        start = time.monotonic()
+        pending = list(dict.fromkeys(account_ids))
+        pending.reverse()
+        results: List[AccountReconciliationResult] = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight: Set[Future[AccountReconciliationResult]] = set()
+            while pending or in_flight:
+                out_of_time = (
+                    deadline_seconds is not None
+                    and time.monotonic() - start >= deadline_seconds
+                )
+                while pending and not out_of_time and len(in_flight) < self.max_workers:
+                    in_flight.add(pool.submit(self.reconcile_account, pending.pop()))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+
+        status_counts: Dict[str, int] = {}
+        for result in results:
+            status_counts[result["status"]] = status_counts.get(result["status"], 0) + 1
+        report = RoleReconciliationReport(
+            dry_run=self.dry_run,
+            elapsed_seconds=round(time.monotonic() - start, 3),
+            account_count=len(results),
+            status_counts=status_counts,
+            changed=[
+                r
+                for r in results
+                if r["status"] in (RECONCILE_STATUS_CHANGED, RECONCILE_STATUS_DRIFTED)
+            ],
+            failed=[r for r in results if r["status"] == RECONCILE_STATUS_FAILED],
+            skipped_account_ids=list(reversed(pending)),
+        )
+        logger.info(
+            {
+                "dry_run": report["dry_run"],
+                "elapsed_seconds": report["elapsed_seconds"],
+                "account_count": report["account_count"],
+                "status_counts": report["status_counts"],
+                "skipped_account_count": len(report["skipped_account_ids"]),
+            }
+        )
+        return report
+
+
+def get_reconciliation_targets(
+    auth: AuthClient,
+    account_ids: Optional[Iterable[str]] = None,
+    ou_names: Optional[List[str]] = None,
+) -> List[str]:
+    targets = list(account_ids or [])
+    if ou_names:
+        orgs_agent = OrganizationsAgent(
+            ct_management_session=auth.get_ct_management_session(
+                role_name=ProvisionRoles.SERVICE_ROLE_NAME
+            )
+        )
+        targets.extend(orgs_agent.get_account_ids_in_ous(ou_names=ou_names))
+    return list(dict.fromkeys(targets))
+
+
+def reconcile_aft_roles(
+    auth: AuthClient,
+    account_ids: Optional[Iterable[str]] = None,
+    ou_names: Optional[List[str]] = None,
+    max_workers: int = RECONCILE_MAX_WORKERS,
+    dry_run: bool = False,
+    deadline_seconds: Optional[float] = None,
+) -> RoleReconciliationReport:
+    targets = get_reconciliation_targets(
+        auth=auth, account_ids=account_ids, ou_names=ou_names
+    )
+    logger.info(f"Reconciling AFT roles in {len(targets)} accounts")
+    reconciler = AftRoleReconciler(auth=auth, max_workers=max_workers, dry_run=dry_run)
+    return reconciler.reconcile(account_ids=targets, deadline_seconds=deadline_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reconcile the AFT roles across many accounts, e.g. after rotating the trust policy"
+    )
+    parser.add_argument(
+        "--account-ids", nargs="*", default=[], help="Target account IDs"
+    )
+    parser.add_argument(
+        "--ou-names",
+        nargs="*",
+        default=[],
+        help="Target OUs, in the same format as account requests",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=RECONCILE_MAX_WORKERS,
+        help="Accounts reconciled concurrently",
+    )
+    parser.add_argument(
+        "--deadline-seconds",
+        type=float,
+        default=None,
+        help="Stop starting new accounts after this many seconds",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report drift without changing roles"
+    )
+    args = parser.parse_args()
+
+    configure_aft_logger()
+    report = reconcile_aft_roles(
+        auth=AuthClient(),
+        account_ids=args.account_ids,
+        ou_names=args.ou_names,
+        max_workers=args.max_workers,
+        dry_run=args.dry_run,
+        deadline_seconds=args.deadline_seconds,
+    )
+    print(json.dumps(report, indent=2))
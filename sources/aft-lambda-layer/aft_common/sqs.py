@@ -9,6 +9,7 @@ from typing import TYPE_CHECKING, Any, Dict, Optional
 import aft_common.constants
 import aft_common.ssm
 from aft_common import aft_utils as utils
+from aft_common.logger import log_payload
 from boto3.session import Session
 
 if TYPE_CHECKING:
@@ -65,7 +66,7 @@ def send_sqs_message(
 ) -> SendMessageResultTypeDef:
     sqs: SQSClient = session.client("sqs")
     logger.info("Sending SQS message to " + sqs_url)
-    logger.info(message)
+    log_payload(logger, "sqs.send_sqs_message", "Message", message)
 
     unique_id = str(uuid.uuid1())
 
@@ -75,7 +76,6 @@ def send_sqs_message(
         MessageDeduplicationId=unique_id,
         MessageGroupId=unique_id,
     )
-    sanitized_response = utils.sanitize_input_for_logging(response)
-    logger.info(sanitized_response)
+    log_payload(logger, "sqs.send_sqs_message", "Send response", response)
 
     return response
@@ -0,0 +1,303 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import terraform_client as terraform
+
+
+class AsyncTerraformClient:
+    """
+    asyncio counterpart of terraform_client, holding its endpoint, token and
+    Terraform version instead of module globals.
+
+    Waits are asyncio sleeps, so one event loop can watch hundreds of runs.
+    HTTP calls go through the pooled, retrying terraform_client session on a
+    worker pool no larger than the connection pool, so the thread count is
+    bounded by max_connections rather than by the number of workspaces
+    """
+
+    def __init__(
+        self,
+        api_endpoint,
+        api_token,
+        terraform_version=None,
+        max_connections=terraform.CONNECTION_POOL_SIZE,
+    ):
+        self.api_endpoint = api_endpoint
+        self.terraform_version = terraform_version
+        self.headers = {
+            "Authorization": "Bearer {}".format(api_token),
+            "Content-type": "application/vnd.api+json",
+        }
+        self.client = terraform.TerraformClient()
+        self.executor = ThreadPoolExecutor(max_workers=max_connections)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.client.session.close()
+
+    async def request(self, method, path, payload=None, data=None, headers=None):
+        url = path if path.startswith("http") else self.api_endpoint + path
+        response = await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(
+                self.client.request,
+                method,
+                url,
+                headers or self.headers,
+                payload=payload,
+                data=data,
+            ),
+        )
+        terraform.raise_for_errors(response)
+        return response
+
+    async def get_all_pages(self, path):
+        items = []
+        page_number = 1
+        while page_number:
+            response = await self.request(
+                "GET",
+                "{}?page[size]={}&page[number]={}".format(
+                    path, terraform.PAGE_SIZE, page_number
+                ),
+            )
+            items.extend(response["data"])
+            page_number = (
+                response.get("meta", {}).get("pagination", {}).get("next-page")
+            )
+        return items
+
+    async def check_workspace_exists(self, organization_name, workspace_name):
+        try:
+            response = await self.request(
+                "GET",
+                "/organizations/{}/workspaces/{}".format(
+                    organization_name, workspace_name
+                ),
+            )
+        except terraform.ClientError as error:
+            if error.status == "404":
+                return None
+            raise
+        return (response or {}).get("data", {}).get("id")
+
+    async def get_project_id(self, organization_name, project_name):
+        projects = await self.get_all_pages(
+            "/organizations/{}/projects".format(organization_name)
+        )
+        for project in projects:
+            if project["attributes"]["name"] == project_name:
+                return project["id"]
+        raise ValueError(
+            "Project '{}' not found in organization '{}'".format(
+                project_name, organization_name
+            )
+        )
+
+    async def create_workspace(self, organization_name, workspace_name, project_name):
+        workspace_id = await self.check_workspace_exists(
+            organization_name, workspace_name
+        )
+        if workspace_id:
+            return workspace_id
+        project_id = await self.get_project_id(organization_name, project_name)
+        response = await self.request(
+            "POST",
+            "/organizations/{}/workspaces".format(organization_name),
+            payload={
+                "data": {
+                    "attributes": {
+                        "name": workspace_name,
+                        "terraform-version": self.terraform_version,
+                        "auto-apply": True,
+                    },
+                    "type": "workspaces",
+                    "relationships": {
+                        "project": {"data": {"type": "projects", "id": project_id}}
+                    },
+                }
+            },
+        )
+        return response["data"]["id"]
+
+    async def delete_workspace(self, workspace_id):
+        await self.request("DELETE", "/workspaces/{}".format(workspace_id))
+
+    async def get_workspace_vars(self, workspace_id):
+        response = await self.request("GET", "/workspaces/{}/vars".format(workspace_id))
+        return response["data"]
+
+    async def set_variable(
+        self, workspace_id, key, value, description, sensitive, category
+    ):
+        await self.request(
+            "POST",
+            "/workspaces/{}/vars".format(workspace_id),
+            payload=self.__build_var_payload(
+                key, value, description, sensitive, category
+            ),
+        )
+
+    async def update_variable(
+        self, workspace_id, var_id, key, value, description, sensitive, category
+    ):
+        await self.request(
+            "PATCH",
+            "/workspaces/{}/vars/{}".format(workspace_id, var_id),
+            payload=self.__build_var_payload(
+                key, value, description, sensitive, category
+            ),
+        )
+
+    async def create_configuration_version(self, workspace_id):
+        response = await self.request(
+            "POST",
+            "/workspaces/{}/configuration-versions".format(workspace_id),
+            payload={
+                "data": {
+                    "type": "configuration-versions",
+                    "attributes": {"auto-queue-runs": False},
+                }
+            },
+        )
+        return response["data"]["id"], response["data"]["attributes"]["upload-url"]
+
+    async def upload_configuration_content(self, data, upload_url):
+        await self.request(
+            "PUT",
+            upload_url,
+            data=data,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "Accept": "application/json",
+            },
+        )
+
+    async def create_run(self, workspace_id, cv_id=None, is_destroy=False):
+        relationships = {
+            "workspace": {"data": {"type": "workspaces", "id": workspace_id}}
+        }
+        if cv_id is not None:
+            relationships["configuration-version"] = {
+                "data": {"type": "configuration-versions", "id": cv_id}
+            }
+        response = await self.request(
+            "POST",
+            "/runs",
+            payload={
+                "data": {
+                    "attributes": {
+                        "is-destroy": is_destroy,
+                        "message": "{}un created by AFT".format(
+                            "Destroy r" if is_destroy else "R"
+                        ),
+                    },
+                    "type": "runs",
+                    "relationships": relationships,
+                }
+            },
+        )
+        return response["data"]["id"]
+
+    async def get_action_status(self, object_type, object_id):
+        response = await self.request("GET", "/{}/{}".format(object_type, object_id))
+        return response["data"]["attributes"]["status"]
+
+    async def wait_to_stabilize(
+        self, entity_type, entity_id, target_states, timeout_seconds=None
+    ):
+        """
+        Same contract as terraform_client.wait_to_stabilize: exponential
+        backoff restarting on each status change, TerminalStateError on a
+        terminal state that is not a target and TimeoutError at the deadline
+        """
+        if timeout_seconds is None:
+            timeout_seconds = terraform.get_wait_timeout_seconds()
+        start = time.monotonic()
+        deadline = start + timeout_seconds
+        transition_start = start
+        previous_status = None
+        attempt = 0
+        while True:
+            status = await self.get_action_status(entity_type, entity_id)
+            now = time.monotonic()
+            if status != previous_status:
+                print(
+                    "{} {} transitioned {} -> {} after {:.1f}s ({:.1f}s total)".format(
+                        entity_type,
+                        entity_id,
+                        previous_status,
+                        status,
+                        now - transition_start,
+                        now - start,
+                    )
+                )
+                if previous_status is not None:
+                    terraform.get_metrics().record_span(
+                        "{}.{}".format(entity_type, previous_status),
+                        now - transition_start,
+                    )
+                previous_status = status
+                transition_start = now
+                attempt = 0
+
+            if status in target_states:
+                return status
+            if status in terraform.TERMINAL_STATES:
+                raise terraform.TerminalStateError(entity_type, entity_id, status)
+            remaining = deadline - now
+            if remaining <= 0:
+                raise TimeoutError(
+                    "{} {} did not reach {} within {}s, last status {}".format(
+                        entity_type, entity_id, target_states, timeout_seconds, status
+                    )
+                )
+            await asyncio.sleep(
+                min(
+                    terraform.POLL_MAX_DELAY_SECONDS,
+                    terraform.POLL_BASE_DELAY_SECONDS * 2**attempt,
+                    remaining,
+                )
+            )
+            attempt += 1
+
+    async def wait_for_all(self, entity_type, entity_ids, target_states):
+        """
+        Waits on every entity concurrently. Returns a dict of entity ID to its
+        final status, or to the exception that ended its wait
+        """
+        results = await asyncio.gather(
+            *[
+                self.wait_to_stabilize(entity_type, entity_id, target_states)
+                for entity_id in entity_ids
+            ],
+            return_exceptions=True,
+        )
+        return dict(zip(entity_ids, results))
+
+    @staticmethod
+    def __build_var_payload(key, value, description, sensitive, category):
+        return {
+            "data": {
+                "attributes": {
+                    "key": key,
+                    "value": value,
+                    "description": description,
+                    "category": category,
+                    "sensitive": sensitive,
+                },
+                "type": "vars",
+            }
+        }
@@ -2,8 +2,17 @@
 # Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 #
+import hashlib
+import hmac
+import json
 import os
+import random
+import re
+import threading
 import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
 
 import requests
@@ -12,25 +21,388 @@ TERRAFORM_API_ENDPOINT = ""
 LOCAL_CONFIGURATION_PATH = ""
 TERRAFORM_VERSION = ""
 
+MAX_RETRIES = 5
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 30
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+# A 429 means the request was rejected before being processed, so any method
+# can be retried. Server errors are only retried for idempotent methods
+IDEMPOTENT_METHODS = ["GET", "PUT", "PATCH", "DELETE"]
+CONNECTION_POOL_SIZE = 16
+# The TFE/TFC API allows 30 requests per second per token; requests from
+# concurrent workspaces are spaced to stay below it
+RATE_LIMIT_PER_SECOND = 25
+
+POLL_BASE_DELAY_SECONDS = 0.5
+POLL_MAX_DELAY_SECONDS = 15
+# Overridable through TF_WAIT_TIMEOUT_SECONDS; keeps a stuck run from
+# hanging the CodeBuild job until the build itself times out
+DEFAULT_WAIT_TIMEOUT_SECONDS = 2 * 60 * 60
+# States a run or configuration version can never leave
+TERMINAL_STATES = ["errored", "canceled", "force_canceled", "discarded"]
+
+PAGE_SIZE = 100
+# Project IDs persisted through TF_DIRECTORY_CACHE_PATH are ignored once older
+# than this, so batch runs pick up projects changed elsewhere
+DIRECTORY_CACHE_TTL_SECONDS = 60 * 60
+
+# Collapse IDs and names in API paths so calls are counted per endpoint
+ENDPOINT_ID_PATTERN = re.compile(r"/(ws|run|cv|var|prj|org|sv)-[^/]+")
+ORGANIZATION_PATTERN = re.compile(r"/organizations/[^/]+")
+WORKSPACE_NAME_PATTERN = re.compile(
+    r"(/organizations/\{organization\}/workspaces)/[^/]+"
+)
+
+CLIENT = None
+DIRECTORY = None
+METRICS = None
+NOTIFICATION_LISTENER = None
+
 
 def init(api_endpoint, tf_version, config_path):
     global TERRAFORM_API_ENDPOINT
     global TERRAFORM_VERSION
     global LOCAL_CONFIGURATION_PATH
+    global CLIENT
+    global DIRECTORY
+    global METRICS
 
     TERRAFORM_API_ENDPOINT = api_endpoint
     TERRAFORM_VERSION = tf_version
     LOCAL_CONFIGURATION_PATH = config_path
+    CLIENT = TerraformClient()
+    DIRECTORY = None
+    METRICS = Metrics()
+
+
+def get_client():
+    global CLIENT
+    if CLIENT is None:
+        CLIENT = TerraformClient()
+    return CLIENT
+
+
+def get_metrics():
+    global METRICS
+    if METRICS is None:
+        METRICS = Metrics()
+    return METRICS
+
+
+@contextmanager
+def timed(span_name):
+    """
+    Records how long the enclosed block takes under span_name
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        get_metrics().record_span(span_name, time.monotonic() - start)
+
+
+class Metrics:
+    """
+    Per-endpoint call counts and latencies, plus named timing spans,
+    aggregated across threads and summarized at the end of an operation
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.endpoints = {}
+        self.spans = {}
+        self.__lock = threading.Lock()
+
+    def record_call(self, method, url, status, seconds):
+        key = "{} {}".format(method, self.endpoint_template(url))
+        with self.__lock:
+            endpoint = self.__aggregate(self.endpoints, key, seconds)
+            endpoint["errors"] = endpoint.get("errors", 0) + (
+                0 if isinstance(status, int) and status < 400 else 1
+            )
+
+    def record_span(self, span_name, seconds):
+        with self.__lock:
+            self.__aggregate(self.spans, span_name, seconds)
+
+    @staticmethod
+    def endpoint_template(url):
+        if not url.startswith(TERRAFORM_API_ENDPOINT):
+            # Configuration uploads go to pre-signed archivist URLs
+            return "upload"
+        path = url[len(TERRAFORM_API_ENDPOINT) :].split("?")[0]
+        path = ENDPOINT_ID_PATTERN.sub("/{id}", path)
+        path = ORGANIZATION_PATTERN.sub("/organizations/{organization}", path)
+        return WORKSPACE_NAME_PATTERN.sub(r"\1/{name}", path)
+
+    def summary(self):
+        with self.__lock:
+            return {
+                "elapsed_seconds": round(time.monotonic() - self.start, 3),
+                "total_calls": sum(e["count"] for e in self.endpoints.values()),
+                "endpoints": {
+                    key: self.__rounded(value) for key, value in self.endpoints.items()
+                },
+                "spans": {
+                    key: self.__rounded(value) for key, value in self.spans.items()
+                },
+            }
+
+    def write_summary(self, path=None):
+        """
+        Prints the summary as one JSON line and, when path or
+        TF_METRICS_PATH is set, also writes it there for the post-build step
+        """
+        summary = json.dumps(self.summary())
+        print("Terraform API metrics: {}".format(summary))
+        path = path or os.environ.get("TF_METRICS_PATH")
+        if path:
+            with open(path, "w") as file:
+                file.write(summary)
+
+    @staticmethod
+    def __aggregate(aggregates, key, seconds):
+        aggregate = aggregates.setdefault(
+            key, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        aggregate["count"] += 1
+        aggregate["total_seconds"] += seconds
+        aggregate["max_seconds"] = max(aggregate["max_seconds"], seconds)
+        return aggregate
+
+    @staticmethod
+    def __rounded(aggregate):
+        return {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in aggregate.items()
+        }
+
+
+def get_directory():
+    global DIRECTORY
+    if DIRECTORY is None:
+        DIRECTORY = OrganizationDirectory(
+            TERRAFORM_API_ENDPOINT, os.environ.get("TF_DIRECTORY_CACHE_PATH")
+        )
+    return DIRECTORY
+
+
+class OrganizationDirectory:
+    """
+    Project and workspace IDs indexed by organization and name, kept for the
+    lifetime of the process. Workspaces are resolved one at a time unless the
+    organization was listed in full with load_workspace_directory.
+
+    Only project IDs are persisted to cache_path for later batch runs; a
+    workspace deleted or recreated by another process would leave a stale
+    ID that fails every later call against it
+    """
+
+    def __init__(self, api_endpoint, cache_path=None):
+        self.api_endpoint = api_endpoint
+        self.cache_path = cache_path
+        self.projects = {}
+        self.workspaces = {}
+        self.complete_organizations = []
+        self.created_at = time.time()
+        self.__lock = threading.RLock()
+        if cache_path:
+            self.__load()
+
+    def get_project_ids(self, organization_name):
+        with self.__lock:
+            return self.projects.get(organization_name)
+
+    def set_project_ids(self, organization_name, project_ids):
+        with self.__lock:
+            self.projects[organization_name] = project_ids
+            self.__save()
+
+    def get_workspace_id(self, organization_name, workspace_name):
+        with self.__lock:
+            return self.workspaces.get(organization_name, {}).get(workspace_name)
+
+    def is_complete(self, organization_name):
+        with self.__lock:
+            return organization_name in self.complete_organizations
+
+    def set_workspace_id(self, organization_name, workspace_name, workspace_id):
+        with self.__lock:
+            self.workspaces.setdefault(organization_name, {})[
+                workspace_name
+            ] = workspace_id
+
+    def set_workspace_ids(self, organization_name, workspace_ids):
+        with self.__lock:
+            self.workspaces[organization_name] = workspace_ids
+            if organization_name not in self.complete_organizations:
+                self.complete_organizations.append(organization_name)
+
+    def remove_workspace_id(self, workspace_id):
+        with self.__lock:
+            for workspace_ids in self.workspaces.values():
+                for name in [n for n, i in workspace_ids.items() if i == workspace_id]:
+                    del workspace_ids[name]
+
+    def __load(self):
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return
+        if cache.get("api_endpoint") != self.api_endpoint:
+            return
+        if time.time() - cache.get("saved_at", 0) > DIRECTORY_CACHE_TTL_SECONDS:
+            return
+        self.projects = cache.get("projects", {})
+        self.created_at = cache["saved_at"]
+
+    def __save(self):
+        if not self.cache_path:
+            return
+        # Keeps the original timestamp, so incremental updates never extend
+        # the lifetime of a directory listed long ago
+        cache = {
+            "api_endpoint": self.api_endpoint,
+            "saved_at": self.created_at,
+            "projects": self.projects,
+        }
+        temporary_path = "{}.tmp".format(self.cache_path)
+        with open(temporary_path, "w") as file:
+            json.dump(cache, file)
+        os.replace(temporary_path, self.cache_path)
+
+
+class TerraformClient:
+    """
+    Holds one pooled requests.Session so every TFE/TFC API call reuses
+    keep-alive connections, and retries rate-limited or failed calls with
+    backoff that honors Retry-After
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES, rate_limit=RATE_LIMIT_PER_SECOND):
+        self.max_retries = max_retries
+        self.min_interval = 1.0 / rate_limit
+        # TFE installations commonly use private certificates
+        self.verify = os.environ.get("TF_DISTRIBUTION") != "tfe"
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=CONNECTION_POOL_SIZE, pool_maxsize=CONNECTION_POOL_SIZE
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.__rate_limit_lock = threading.Lock()
+        self.__next_request_at = 0.0
+
+    def request(self, method, url, headers, payload=None, data=None):
+        """
+        Sends the request and returns the parsed JSON body, or None when a
+        successful response has no body. The body is parsed exactly once
+        """
+        attempt = 0
+        while True:
+            with self.__rate_limit_lock:
+                now = time.monotonic()
+                slot = max(now, self.__next_request_at)
+                self.__next_request_at = slot + self.min_interval
+            if slot > now:
+                time.sleep(slot - now)
+            if hasattr(data, "seek"):
+                # Streamed bodies are rewound so a retry resends the content
+                data.seek(0)
+            sent_at = time.monotonic()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    json=payload,
+                    data=data,
+                    verify=self.verify,
+                )
+            except requests.exceptions.ConnectionError:
+                get_metrics().record_call(method, url, None, time.monotonic() - sent_at)
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise
+                delay = self.__backoff_delay(attempt)
+            else:
+                get_metrics().record_call(
+                    method, url, response.status_code, time.monotonic() - sent_at
+                )
+                if not self.__should_retry(method, response.status_code, attempt):
+                    return self.__parse(response)
+                delay = self.__retry_after_delay(response)
+                if delay is None:
+                    delay = self.__backoff_delay(attempt)
+                print(
+                    "Received status {} from {}, retrying in {:.1f}s".format(
+                        response.status_code, method, delay
+                    )
+                )
+            time.sleep(delay)
+            attempt += 1
+
+    def __should_retry(self, method, status_code, attempt):
+        if attempt >= self.max_retries or status_code not in RETRYABLE_STATUS_CODES:
+            return False
+        return status_code == 429 or method in IDEMPOTENT_METHODS
+
+    @staticmethod
+    def __backoff_delay(attempt):
+        # Full jitter exponential backoff
+        ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2**attempt)
+        return random.uniform(0, ceiling)  # nosec B311
+
+    @staticmethod
+    def __retry_after_delay(response):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0), RETRY_MAX_DELAY_SECONDS)
+
+    @staticmethod
+    def __parse(response):
+        # Error responses without a JSON error document would otherwise look
+        # like success to callers that only check for "errors"
+        if not response.content:
+            if response.ok:
+                return None
+            raise ClientError(status=str(response.status_code), message=response.reason)
+        try:
+            return response.json()
+        except ValueError:
+            if response.ok:
+                return None
+            raise ClientError(
+                status=str(response.status_code), message=response.text[:500]
+            )
 
 
 def check_workspace_exists(organization_name, workspace_name, api_token):
+    directory = get_directory()
+    workspace_id = directory.get_workspace_id(organization_name, workspace_name)
+    if workspace_id or directory.is_complete(organization_name):
+        return workspace_id
+
+    workspace_id = __fetch_workspace_id(organization_name, workspace_name, api_token)
+    if workspace_id:
+        directory.set_workspace_id(organization_name, workspace_name, workspace_id)
+    return workspace_id
+
+
+def __fetch_workspace_id(organization_name, workspace_name, api_token):
     endpoint = "{}/organizations/{}/workspaces/{}".format(
         TERRAFORM_API_ENDPOINT, organization_name, workspace_name
     )
     headers = __build_standard_headers(api_token)
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    response = requests.get(endpoint, headers=headers, verify=tf_dist != "tfe")
-    data = response.json()
+    data = get_client().request("GET", endpoint, headers) or {}
 
     if "data" in data.keys():
         if "id" in data["data"].keys():
@@ -38,45 +410,75 @@ def check_workspace_exists(organization_name, workspace_name, api_token):
     return None
 
 
+def load_workspace_directory(organization_name, api_token):
+    """
+    Lists every workspace in the organization once, so later lookups for
+    any number of workspaces are answered without API calls
+    """
+    endpoint = "{}/organizations/{}/workspaces".format(
+        TERRAFORM_API_ENDPOINT, organization_name
+    )
+    workspaces = __get_all_pages(endpoint, __build_standard_headers(api_token))
+    get_directory().set_workspace_ids(
+        organization_name,
+        {workspace["attributes"]["name"]: workspace["id"] for workspace in workspaces},
+    )
+
+
 def create_workspace(organization_name, workspace_name, api_token, project_name):
     workspace_id = check_workspace_exists(organization_name, workspace_name, api_token)
-    project_id = get_project_id(organization_name, project_name, api_token)
-
     if workspace_id:
         return workspace_id
-    else:
-        endpoint = "{}/organizations/{}/workspaces".format(
-            TERRAFORM_API_ENDPOINT, organization_name
-        )
-        headers = __build_standard_headers(api_token)
-        payload = {
-            "data": {
-                "attributes": {
-                    "name": workspace_name,
-                    "terraform-version": TERRAFORM_VERSION,
-                    "auto-apply": True,
-                },
-                "type": "workspaces",
-                "relationships": {
-                    "project": {"data": {"type": "projects", "id": project_id}}
-                },
-            }
+
+    project_id = get_project_id(organization_name, project_name, api_token)
+    endpoint = "{}/organizations/{}/workspaces".format(
+        TERRAFORM_API_ENDPOINT, organization_name
+    )
+    headers = __build_standard_headers(api_token)
+    payload = {
+        "data": {
+            "attributes": {
+                "name": workspace_name,
+                "terraform-version": TERRAFORM_VERSION,
+                "auto-apply": True,
+            },
+            "type": "workspaces",
+            "relationships": {
+                "project": {"data": {"type": "projects", "id": project_id}}
+            },
         }
+    }
+    try:
         response = __post(endpoint, headers, payload)
-        return response["data"]["id"]
+        workspace_id = response["data"]["id"]
+    except ClientError as error:
+        # The directory may predate a workspace created by another process
+        if error.status != "422":
+            raise
+        workspace_id = __fetch_workspace_id(
+            organization_name, workspace_name, api_token
+        )
+        if not workspace_id:
+            raise
+    get_directory().set_workspace_id(organization_name, workspace_name, workspace_id)
+    return workspace_id
 
 
 def get_project_id(organization_name, project_name, api_token):
-    endpoint = "{}/organizations/{}/projects".format(
-        TERRAFORM_API_ENDPOINT, organization_name
-    )
-    headers = __build_standard_headers(api_token)
-    response = __get(endpoint, headers)
-    projects = response["data"]
+    directory = get_directory()
+    project_ids = directory.get_project_ids(organization_name)
+    if project_ids is None or project_name not in project_ids:
+        endpoint = "{}/organizations/{}/projects".format(
+            TERRAFORM_API_ENDPOINT, organization_name
+        )
+        projects = __get_all_pages(endpoint, __build_standard_headers(api_token))
+        project_ids = {
+            project["attributes"]["name"]: project["id"] for project in projects
+        }
+        directory.set_project_ids(organization_name, project_ids)
 
-    for project in projects:
-        if project["attributes"]["name"] == project_name:
-            return project["id"]
+    if project_name in project_ids:
+        return project_ids[project_name]
 
     raise ValueError(
         "Project '{}' not found in organization '{}'".format(
@@ -103,9 +505,10 @@ def create_configuration_version(workspace_id, api_token):
 
 
 def upload_configuration_content(data, upload_url):
+    # data may be bytes or a file opened in binary mode, which is streamed
+    # from disk instead of being read into memory
     headers = {"Content-Type": "application/octet-stream", "Accept": "application/json"}
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    requests.put(upload_url, data=data, headers=headers, verify=tf_dist != "tfe")
+    get_client().request("PUT", upload_url, headers, data=data)
 
 
 def set_environment_variable(
@@ -197,8 +600,9 @@ def delete_workspace(workspace_id, api_token):
     sanitized_workspace_id = __sanitize_input_for_logging(workspace_id)
     headers = __build_standard_headers(api_token)
     response = __delete(endpoint, headers)
+    get_directory().remove_workspace_id(workspace_id)
     if response is not None:
-        errors = response["errors"]
+        errors = response.get("errors", [])
         if len(errors) == 0:
             print("Successfully deleted workspace {}".format(sanitized_workspace_id))
         else:
@@ -208,23 +612,156 @@ def delete_workspace(workspace_id, api_token):
         print("Successfully deleted workspace {}".format(sanitized_workspace_id))
 
 
-def wait_to_stabilize(entity_type, entity_id, target_states, api_token):
+def get_wait_timeout_seconds():
+    return float(
+        os.environ.get("TF_WAIT_TIMEOUT_SECONDS", DEFAULT_WAIT_TIMEOUT_SECONDS)
+    )
+
+
+def wait_to_stabilize(
+    entity_type, entity_id, target_states, api_token, timeout_seconds=None
+):
+    """
+    Polls the entity until it reaches one of target_states, backing off
+    exponentially from POLL_BASE_DELAY_SECONDS to POLL_MAX_DELAY_SECONDS.
+    The backoff restarts on every status change. When a notification
+    listener is running, a run notification ends the current sleep early.
+
+    Raises TerminalStateError if the entity ends in a terminal state that is
+    not a target, and TimeoutError once timeout_seconds have elapsed
+    """
+    if timeout_seconds is None:
+        timeout_seconds = get_wait_timeout_seconds()
+    sanitized_entity = "{} {}".format(
+        entity_type, __sanitize_input_for_logging(entity_id)
+    )
+    start = time.monotonic()
+    deadline = start + timeout_seconds
+    transition_start = start
+    previous_status = None
+    attempt = 0
     while True:
         status = get_action_status(entity_type, entity_id, api_token)
+        now = time.monotonic()
+        if status != previous_status:
+            print(
+                "{} transitioned {} -> {} after {:.1f}s ({:.1f}s total)".format(
+                    sanitized_entity,
+                    __sanitize_input_for_logging(previous_status),
+                    __sanitize_input_for_logging(status),
+                    now - transition_start,
+                    now - start,
+                )
+            )
+            if previous_status is not None:
+                get_metrics().record_span(
+                    "{}.{}".format(entity_type, previous_status),
+                    now - transition_start,
+                )
+            previous_status = status
+            transition_start = now
+            attempt = 0
+
         if status in target_states:
-            break
-        print(
-            "{} not yet ready. In status {}".format(
-                entity_type, __sanitize_input_for_logging(status)
+            return status
+        if status in TERMINAL_STATES:
+            raise TerminalStateError(entity_type, entity_id, status)
+
+        remaining = deadline - now
+        if remaining <= 0:
+            raise TimeoutError(
+                "{} did not reach {} within {}s, last status {}".format(
+                    sanitized_entity,
+                    target_states,
+                    timeout_seconds,
+                    __sanitize_input_for_logging(status),
+                )
             )
+        delay = min(
+            POLL_MAX_DELAY_SECONDS, POLL_BASE_DELAY_SECONDS * 2**attempt, remaining
         )
-        time.sleep(10)
-    return status
+        if NOTIFICATION_LISTENER is not None:
+            NOTIFICATION_LISTENER.wait(entity_id, delay)
+        else:
+            time.sleep(delay)
+        attempt += 1
+
+
+def start_notification_listener(port, token=None):
+    """
+    Starts a local listener for TFE/TFC run notifications, so that
+    wait_to_stabilize polls as soon as a run changes state rather than at
+    its next backoff interval. A generic notification configuration pointing
+    at this listener must be set up on the workspace. Polling stays the
+    source of truth, notifications only shorten the wait
+    """
+    global NOTIFICATION_LISTENER
+    if NOTIFICATION_LISTENER is None:
+        NOTIFICATION_LISTENER = NotificationListener(port, token)
+        NOTIFICATION_LISTENER.start()
+    return NOTIFICATION_LISTENER
+
+
+class NotificationListener:
+    def __init__(self, port, token=None):
+        self.token = token
+        self.__condition = threading.Condition()
+        self.__notified_run_ids = set()
+        listener = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not listener.is_authentic(
+                    body, self.headers.get("X-TFE-Notification-Signature")
+                ):
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+                try:
+                    run_id = json.loads(body).get("run_id")
+                except ValueError:
+                    run_id = None
+                if run_id:
+                    listener.notify(run_id)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("0.0.0.0", port), Handler)  # nosec B104
+
+    def start(self):
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print("Listening for Terraform notifications on port {}".format(self.port))
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def is_authentic(self, body, signature):
+        if not self.token:
+            return True
+        expected = hmac.new(self.token.encode(), body, hashlib.sha512).hexdigest()
+        return signature is not None and hmac.compare_digest(expected, signature)
+
+    def notify(self, run_id):
+        with self.__condition:
+            self.__notified_run_ids.add(run_id)
+            self.__condition.notify_all()
+
+    def wait(self, entity_id, timeout):
+        with self.__condition:
+            self.__condition.wait_for(
+                lambda: entity_id in self.__notified_run_ids, timeout=timeout
+            )
+            self.__notified_run_ids.discard(entity_id)
 
 
 def get_action_status(object_type, object_id, api_token):
     endpoint = "{}/{}/{}".format(TERRAFORM_API_ENDPOINT, object_type, object_id)
-    print(endpoint)
     headers = __build_standard_headers(api_token)
     response = __get(endpoint, headers)
     return response["data"]["attributes"]["status"]
@@ -237,43 +774,48 @@ def __build_standard_headers(api_token):
     }
 
 
+def __get_all_pages(endpoint, headers):
+    items = []
+    page_number = 1
+    while page_number:
+        response = __get(
+            "{}?page[size]={}&page[number]={}".format(endpoint, PAGE_SIZE, page_number),
+            headers,
+        )
+        items.extend(response["data"])
+        page_number = response.get("meta", {}).get("pagination", {}).get("next-page")
+    return items
+
+
 def __post(endpoint, headers, payload):
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    response = requests.post(
-        endpoint, headers=headers, json=payload, verify=tf_dist != "tfe"
-    )
-    __handle_errors(response)
-    return response.json()
+    response = get_client().request("POST", endpoint, headers, payload=payload)
+    raise_for_errors(response)
+    return response
 
 
 def __patch(endpoint, headers, payload):
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    response = requests.patch(
-        endpoint, headers=headers, json=payload, verify=tf_dist != "tfe"
-    )
-    __handle_errors(response)
-    return response.json()
+    response = get_client().request("PATCH", endpoint, headers, payload=payload)
+    raise_for_errors(response)
+    return response
 
 
 def __get(endpoint, headers):
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    response = requests.get(endpoint, headers=headers, verify=tf_dist != "tfe")
-    __handle_errors(response)
-    return response.json()
+    response = get_client().request("GET", endpoint, headers)
+    raise_for_errors(response)
+    return response
 
 
 def __delete(endpoint, headers):
-    tf_dist = os.environ.get("TF_DISTRIBUTION")
-    response = requests.delete(endpoint, headers=headers, verify=tf_dist != "tfe")
-    # __handle_errors(response)
-    return response.json()
+    response = get_client().request("DELETE", endpoint, headers)
+    # raise_for_errors(response)
+    return response
 
 
-def __handle_errors(response):
-    if response is None or response.json() is None or "errors" not in response.json():
+def raise_for_errors(response):
+    if response is None or "errors" not in response:
         return
 
-    errors = response.json()["errors"]
+    errors = response["errors"]
     print("Handling errors: {}".format(errors))
     if len(errors) == 0:
         print("Empty set of errors returned by client; raising internal failure")
@@ -300,3 +842,11 @@ class ClientError(Exception):
     def __init__(self, status, message):
         self.status = status
         super().__init__(message)
+
+
+class TerminalStateError(Exception):
+    def __init__(self, entity_type, entity_id, status):
+        self.status = status
+        super().__init__(
+            "{} {} ended in terminal status {}".format(entity_type, entity_id, status)
+        )
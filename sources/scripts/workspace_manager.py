@@ -4,12 +4,70 @@
 #
 
 import argparse
+import asyncio
+import hashlib
 import io
+import json
 import os
+import re
+import sys
+import tarfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 import boto3
 import terraform_client as terraform
+from async_terraform_client import AsyncTerraformClient
+
+VAR_UPDATE_MAX_WORKERS = 8
+HASH_CHUNK_SIZE = 1024 * 1024
+# Rendered by the buildspecs into every generated .tf file on each build
+GENERATED_TIMESTAMP_PATTERN = re.compile(rb"^## Updated on: .* ##$", re.MULTILINE)
+# Environment variables recording the last uploaded configuration, so an
+# unchanged tarball can reuse its configuration version
+CONFIGURATION_HASH_VAR = "AFT_CONFIGURATION_SHA256"
+CONFIGURATION_VERSION_VAR = "AFT_CONFIGURATION_VERSION_ID"
+# Credentials on a workspace are reused while they stay valid for at least
+# this long, overridable through TF_CREDENTIALS_MIN_REMAINING_SECONDS, so a
+# run queued with them can still finish
+CREDENTIALS_MIN_REMAINING_SECONDS = 40 * 60
+# The access key description records which role the credentials belong to
+# and when they expire; only the access key itself is readable in the API
+ACCESS_KEY_DESCRIPTION = "AWS access key for {} expiring {}"
+ACCESS_KEY_DESCRIPTION_PATTERN = re.compile(
+    r"^AWS access key for (?P<role_arn>\S+) expiring (?P<expiration>\S+)$"
+)
+MANIFEST_MAX_CONCURRENCY = 4
+# Above this many workspaces in one organization, listing the organization
+# once is cheaper than looking each workspace up
+DIRECTORY_PRELOAD_MIN_WORKSPACES = 10
+
+RUN_TARGET_STATES = [
+    "planned",
+    "applied",
+    "cost_estimated",
+    "planned_and_finished",
+    "errored",
+    "policy_checked",
+]
+
+STS_CLIENT = None
+STS_CLIENT_LOCK = threading.Lock()
+# If in a Run there is no resource change, after execution it will be 'planned_and_finished', which can be a stabilized state
+DESTROY_TARGET_STATES = ["planned", "applied", "planned_and_finished", "policy_checked"]
+# "planned", "cost_estimated" and "policy_checked" come before the destroy is
+# applied, and deleting the workspace discards its state, so bulk offboarding
+# only deletes once the destroy has actually been applied
+DESTROY_SUCCESS_STATES = ["applied", "planned_and_finished"]
+RUN_SUCCESS_STATES = [
+    "planned",
+    "applied",
+    "cost_estimated",
+    "planned_and_finished",
+    "policy_checked",
+]
 
 
 def setup_and_run_workspace(
@@ -19,7 +77,9 @@ def setup_and_run_workspace(
     role_session_name,
     api_token,
     project_name,
+    config_path=None,
 ):
+    # Credentials are placed by stage_run right before the run is queued
     workspace_id = setup_workspace(
         organization_name,
         workspace_name,
@@ -27,8 +87,11 @@ def setup_and_run_workspace(
         role_session_name,
         api_token,
         project_name,
+        set_credentials=False,
+    )
+    run_id = stage_run(
+        workspace_id, assume_role_arn, role_session_name, api_token, config_path
     )
-    run_id = stage_run(workspace_id, assume_role_arn, role_session_name, api_token)
     return run_id
 
 
@@ -39,40 +102,89 @@ def setup_workspace(
     role_session_name,
     api_token,
     project_name,
+    set_credentials=True,
 ):
-    workspace_id = terraform.create_workspace(
-        organization_name, workspace_name, api_token, project_name
-    )
+    with terraform.timed("workspace_setup"):
+        workspace_id = terraform.create_workspace(
+            organization_name, workspace_name, api_token, project_name
+        )
     print(
         "Successfully created workspace {} with ID {}".format(
             workspace_name, workspace_id
         )
     )
-    set_aws_credentials(workspace_id, assume_role_arn, role_session_name, api_token)
-    print(
-        "Successfully placed AWS credentials on workspace for {}".format(
-            assume_role_arn
+    if set_credentials:
+        set_aws_credentials(workspace_id, assume_role_arn, role_session_name, api_token)
+        print(
+            "Successfully placed AWS credentials on workspace for {}".format(
+                assume_role_arn
+            )
         )
-    )
     return workspace_id
 
 
 # def stage_run(workspace_id, s3_uri, assume_role_arn, api_token):
-def stage_run(workspace_id, assume_role_arn, role_session_name, api_token):
-    cv_id, upload_url = terraform.create_configuration_version(workspace_id, api_token)
-    print("Successfully created a new configuration version: {}".format(cv_id))
-    with open(LOCAL_CONFIGURATION_PATH, "rb") as file:
-        data = file.read()
-    terraform.upload_configuration_content(data, upload_url)
-    print(
-        "Successfully uploaded configuration content to upload URL: {}".format(
-            upload_url
-        )
+def stage_run(
+    workspace_id, assume_role_arn, role_session_name, api_token, config_path=None
+):
+    run_id, _ = __stage_run(
+        workspace_id, assume_role_arn, role_session_name, api_token, config_path
     )
-    terraform.wait_to_stabilize(
-        "configuration-versions", cv_id, ["uploaded"], api_token
+    return run_id
+
+
+def __stage_run(
+    workspace_id, assume_role_arn, role_session_name, api_token, config_path
+):
+    config_path = config_path or LOCAL_CONFIGURATION_PATH
+    current_vars = terraform.get_workspace_vars(workspace_id, api_token)
+    with terraform.timed("configuration_hash"):
+        content_hash = __hash_configuration(config_path)
+    cv_id = __get_reusable_configuration_version(current_vars, content_hash, api_token)
+    if cv_id is not None:
+        print(
+            "Configuration unchanged, reusing configuration version: {}".format(cv_id)
+        )
+    else:
+        cv_id, upload_url = terraform.create_configuration_version(
+            workspace_id, api_token
+        )
+        print("Successfully created a new configuration version: {}".format(cv_id))
+        with terraform.timed("configuration_upload"):
+            with open(config_path, "rb") as file:
+                terraform.upload_configuration_content(file, upload_url)
+        print(
+            "Successfully uploaded configuration content to upload URL: {}".format(
+                upload_url
+            )
+        )
+        with terraform.timed("configuration_version_wait"):
+            terraform.wait_to_stabilize(
+                "configuration-versions", cv_id, ["uploaded"], api_token
+            )
+    set_aws_credentials(
+        workspace_id,
+        assume_role_arn,
+        role_session_name,
+        api_token,
+        extra_vars=[
+            __build_var(
+                CONFIGURATION_HASH_VAR,
+                content_hash,
+                "SHA-256 of the configuration uploaded by AFT",
+                False,
+                "env",
+            ),
+            __build_var(
+                CONFIGURATION_VERSION_VAR,
+                cv_id,
+                "Configuration version uploaded by AFT",
+                False,
+                "env",
+            ),
+        ],
+        current_vars=current_vars,
     )
-    set_aws_credentials(workspace_id, assume_role_arn, role_session_name, api_token)
     print(
         "Successfully placed AWS credentials on workspace for {}".format(
             assume_role_arn
@@ -80,147 +192,386 @@ def stage_run(workspace_id, assume_role_arn, role_session_name, api_token):
     )
     run_id = terraform.create_run(workspace_id, cv_id, api_token)
     print("Successfully created run: {}".format(run_id))
-    terraform.wait_to_stabilize(
-        "runs",
-        run_id,
-        [
-            "planned",
-            "applied",
-            "cost_estimated",
-            "planned_and_finished",
-            "errored",
-            "policy_checked",
-        ],
-        api_token,
-    )
-    return run_id
+    with terraform.timed("run_wait"):
+        status = terraform.wait_to_stabilize(
+            "runs", run_id, RUN_TARGET_STATES, api_token
+        )
+    return run_id, status
 
 
-def set_aws_credentials(workspace_id, assume_role_arn, role_session_name, api_token):
-    role_credentials = __assume_role(assume_role_arn, role_session_name)
-    current_vars = terraform.get_workspace_vars(workspace_id, api_token)
-    transformed_current_vars_dict = __transform_workspace_vars(current_vars)
+def __hash_configuration(path):
+    """
+    Hashes the files inside the configuration tarball rather than the
+    tarball itself, which differs on every build because of file mtimes,
+    ownership and the gzip header. The generated "Updated on" comments
+    are ignored for the same reason
+    """
+    digest = hashlib.sha256()
+    try:
+        archive = tarfile.open(path, "r:*")
+    except tarfile.ReadError:
+        return __hash_file(path)
+    with archive:
+        for member in sorted(archive.getmembers(), key=lambda member: member.name):
+            digest.update(member.name.encode())
+            digest.update(member.type)
+            if member.isfile():
+                content = archive.extractfile(member).read()
+                digest.update(GENERATED_TIMESTAMP_PATTERN.sub(b"", content))
+            elif member.issym() or member.islnk():
+                digest.update(member.linkname.encode())
+            digest.update(b"\0")
+    return digest.hexdigest()
 
-    if "AWS_ACCESS_KEY_ID" in transformed_current_vars_dict:
-        terraform.update_environment_variable(
-            transformed_current_vars_dict["AWS_ACCESS_KEY_ID"],
-            "AWS_ACCESS_KEY_ID",
-            role_credentials["AccessKeyId"],
-            "AWS access key",
-            workspace_id,
-            False,
-            "env",
+
+def __hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def __get_reusable_configuration_version(current_vars, content_hash, api_token):
+    """
+    Returns the configuration version last uploaded for this exact content,
+    if it is still available to queue runs against
+    """
+    values = {
+        var["attributes"]["key"]: var["attributes"].get("value")
+        for var in current_vars
+        if var["attributes"]["category"] == "env"
+    }
+    cv_id = values.get(CONFIGURATION_VERSION_VAR)
+    if not cv_id or values.get(CONFIGURATION_HASH_VAR) != content_hash:
+        return None
+    try:
+        status = terraform.get_action_status("configuration-versions", cv_id, api_token)
+    except terraform.ClientError:
+        return None
+    # Old configuration versions are eventually archived and can't be reused
+    return cv_id if status == "uploaded" else None
+
+
+def deploy_manifest(
+    manifest,
+    organization_name,
+    role_session_name,
+    api_token,
+    project_name,
+    max_concurrency=MANIFEST_MAX_CONCURRENCY,
+):
+    """
+    Sets up, uploads, runs and waits for every workspace in the manifest,
+    with at most max_concurrency workspaces in flight. Each entry needs
+    workspace_name, config_file and assume_role_arn, and may override
+    organization_name, assume_role_session_name and project_name.
+
+    A failing workspace does not stop the others; every entry gets a result
+    """
+    entries_per_organization = {}
+    for entry in manifest:
+        entry_organization = entry.get("organization_name", organization_name)
+        entries_per_organization[entry_organization] = (
+            entries_per_organization.get(entry_organization, 0) + 1
+        )
+    for entry_organization, count in entries_per_organization.items():
+        if count >= DIRECTORY_PRELOAD_MIN_WORKSPACES:
+            terraform.load_workspace_directory(entry_organization, api_token)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = [
+            pool.submit(
+                __deploy_manifest_entry,
+                entry,
+                organization_name,
+                role_session_name,
+                api_token,
+                project_name,
+            )
+            for entry in manifest
+        ]
+        return [future.result() for future in futures]
+
+
+def __deploy_manifest_entry(
+    entry, organization_name, role_session_name, api_token, project_name
+):
+    start = time.monotonic()
+    result = {
+        "workspace_name": entry["workspace_name"],
+        "workspace_id": None,
+        "run_id": None,
+        "status": None,
+        "succeeded": False,
+        "error": None,
+    }
+    try:
+        assume_role_arn = entry["assume_role_arn"]
+        entry_role_session_name = entry.get(
+            "assume_role_session_name", role_session_name
+        )
+        result["workspace_id"] = setup_workspace(
+            entry.get("organization_name", organization_name),
+            entry["workspace_name"],
+            assume_role_arn,
+            entry_role_session_name,
             api_token,
+            entry.get("project_name", project_name),
+            set_credentials=False,
         )
-    else:
-        terraform.set_environment_variable(
-            "AWS_ACCESS_KEY_ID",
-            role_credentials["AccessKeyId"],
-            "AWS access key",
-            workspace_id,
-            False,
-            "env",
+        result["run_id"], result["status"] = __stage_run(
+            result["workspace_id"],
+            assume_role_arn,
+            entry_role_session_name,
             api_token,
+            entry["config_file"],
+        )
+        result["succeeded"] = result["status"] in RUN_SUCCESS_STATES
+    except Exception as error:
+        print(
+            "Failed to deploy workspace {}: {}".format(
+                __sanitize_input_for_logging(entry.get("workspace_name")),
+                __sanitize_input_for_logging(error),
+            )
         )
+        result["error"] = str(error)
+    result["elapsed_seconds"] = round(time.monotonic() - start, 1)
+    return result
 
-    if "AWS_SECRET_ACCESS_KEY" in transformed_current_vars_dict:
-        terraform.update_environment_variable(
-            transformed_current_vars_dict["AWS_SECRET_ACCESS_KEY"],
-            "AWS_SECRET_ACCESS_KEY",
-            role_credentials["SecretAccessKey"],
-            "AWS secret access key",
-            workspace_id,
-            True,
-            "env",
-            api_token,
+
+def __load_manifest(manifest_path):
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    if isinstance(manifest, dict):
+        manifest = manifest["workspaces"]
+    return manifest
+
+
+def set_aws_credentials(
+    workspace_id,
+    assume_role_arn,
+    role_session_name,
+    api_token,
+    extra_vars=None,
+    current_vars=None,
+):
+    if current_vars is None:
+        current_vars = terraform.get_workspace_vars(workspace_id, api_token)
+    desired_vars = list(extra_vars or [])
+    expiration = __get_fresh_credentials_expiration(current_vars, assume_role_arn)
+    if expiration is not None:
+        print(
+            "AWS credentials on workspace are valid until {}, skipping refresh".format(
+                expiration.isoformat()
+            )
         )
     else:
-        terraform.set_environment_variable(
-            "AWS_SECRET_ACCESS_KEY",
-            role_credentials["SecretAccessKey"],
-            "AWS secret access key",
-            workspace_id,
-            True,
-            "env",
-            api_token,
+        role_credentials = __assume_role(assume_role_arn, role_session_name)
+        desired_vars += [
+            __build_var(
+                "AWS_ACCESS_KEY_ID",
+                role_credentials["AccessKeyId"],
+                ACCESS_KEY_DESCRIPTION.format(
+                    assume_role_arn, role_credentials["Expiration"].isoformat()
+                ),
+                False,
+                "env",
+            ),
+            __build_var(
+                "AWS_SECRET_ACCESS_KEY",
+                role_credentials["SecretAccessKey"],
+                "AWS secret access key",
+                True,
+                "env",
+            ),
+            __build_var(
+                "AWS_SESSION_TOKEN",
+                role_credentials["SessionToken"],
+                "AWS session token",
+                True,
+                "env",
+            ),
+        ]
+    return reconcile_workspace_vars(workspace_id, desired_vars, api_token, current_vars)
+
+
+def __get_fresh_credentials_expiration(current_vars, assume_role_arn):
+    """
+    Returns the expiration of the credentials already on the workspace if
+    they were issued for assume_role_arn and remain valid long enough
+    """
+    env_vars = {
+        var["attributes"]["key"]: var["attributes"]
+        for var in current_vars
+        if var["attributes"]["category"] == "env"
+    }
+    if not all(
+        key in env_vars for key in ["AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"]
+    ):
+        return None
+    match = ACCESS_KEY_DESCRIPTION_PATTERN.match(
+        (env_vars.get("AWS_ACCESS_KEY_ID") or {}).get("description") or ""
+    )
+    if match is None or match.group("role_arn") != assume_role_arn:
+        return None
+    try:
+        expiration = datetime.fromisoformat(match.group("expiration"))
+    except ValueError:
+        return None
+    min_remaining_seconds = float(
+        os.environ.get(
+            "TF_CREDENTIALS_MIN_REMAINING_SECONDS", CREDENTIALS_MIN_REMAINING_SECONDS
         )
+    )
+    remaining = (expiration - datetime.now(timezone.utc)).total_seconds()
+    if remaining < min_remaining_seconds:
+        return None
+    return expiration
 
-    if "AWS_SESSION_TOKEN" in transformed_current_vars_dict:
-        terraform.update_environment_variable(
-            transformed_current_vars_dict["AWS_SESSION_TOKEN"],
-            "AWS_SESSION_TOKEN",
-            role_credentials["SessionToken"],
-            "AWS session token",
+
+def set_terraform_variables(workspace_id, input_variables, api_token):
+    if input_variables is None:
+        return
+    desired_vars = [
+        __build_var(
+            key,
+            value,
+            "Terraform input variable set by AFT",
+            False,
+            "terraform",
+        )
+        for key, value in input_variables.items()
+    ]
+    return reconcile_workspace_vars(workspace_id, desired_vars, api_token)
+
+
+def reconcile_workspace_vars(workspace_id, desired_vars, api_token, current_vars=None):
+    """
+    Diffs desired_vars against the variables already on the workspace and
+    only creates or patches those that differ, applying the changes
+    concurrently. Sensitive values are write-only in the API, so they can
+    never be compared and are always patched. current_vars can be passed
+    when the caller already fetched them
+    """
+    with terraform.timed("workspace_vars"):
+        return __reconcile_workspace_vars(
+            workspace_id, desired_vars, api_token, current_vars
+        )
+
+
+def __reconcile_workspace_vars(workspace_id, desired_vars, api_token, current_vars):
+    if current_vars is None:
+        current_vars = terraform.get_workspace_vars(workspace_id, api_token)
+    current_by_key = {
+        (var["attributes"]["key"], var["attributes"]["category"]): var
+        for var in current_vars
+    }
+
+    changes = []
+    unchanged = 0
+    for desired in desired_vars:
+        current = current_by_key.get((desired["key"], desired["category"]))
+        if current is None:
+            changes.append((None, desired))
+        elif __var_is_unchanged(current["attributes"], desired):
+            unchanged += 1
+        else:
+            changes.append((current["id"], desired))
+
+    if changes:
+        with ThreadPoolExecutor(
+            max_workers=min(len(changes), VAR_UPDATE_MAX_WORKERS)
+        ) as pool:
+            futures = [
+                pool.submit(
+                    __apply_var_change, workspace_id, var_id, desired, api_token
+                )
+                for var_id, desired in changes
+            ]
+            for future in futures:
+                future.result()
+
+    summary = {
+        "created": len([var_id for var_id, _ in changes if var_id is None]),
+        "updated": len([var_id for var_id, _ in changes if var_id is not None]),
+        "unchanged": unchanged,
+    }
+    print(
+        "Reconciled variables on workspace {}: {}".format(
+            __sanitize_input_for_logging(workspace_id), summary
+        )
+    )
+    return summary
+
+
+def __apply_var_change(workspace_id, var_id, desired, api_token):
+    if var_id is None:
+        terraform.set_environment_variable(
+            desired["key"],
+            desired["value"],
+            desired["description"],
             workspace_id,
-            True,
-            "env",
+            desired["sensitive"],
+            desired["category"],
             api_token,
         )
     else:
-        terraform.set_environment_variable(
-            "AWS_SESSION_TOKEN",
-            role_credentials["SessionToken"],
-            "AWS session token",
+        terraform.update_environment_variable(
+            var_id,
+            desired["key"],
+            desired["value"],
+            desired["description"],
             workspace_id,
-            True,
-            "env",
+            desired["sensitive"],
+            desired["category"],
             api_token,
         )
 
 
-def set_terraform_variables(workspace_id, input_variables, api_token):
-    if input_variables is None:
-        return
-    current_vars = terraform.get_workspace_vars(workspace_id, api_token)
-    transformed_current_vars_dict = __transform_workspace_vars(current_vars)
-    print(input_variables)
-    for key in input_variables:
-        value = input_variables[key]
-        print("Processing terraform variable {} with value {}".format(key, value))
-        if key not in transformed_current_vars_dict:
-            terraform.set_environment_variable(
-                key,
-                value,
-                "Terraform input variable set by AFT",
-                workspace_id,
-                False,
-                "terraform",
-                api_token,
-            )
-        else:
-            terraform.update_environment_variable(
-                transformed_current_vars_dict[key],
-                key,
-                value,
-                "Terraform input variable set by AFT",
-                workspace_id,
-                False,
-                "terraform",
-                api_token,
-            )
+def __var_is_unchanged(current, desired):
+    if current["sensitive"] or desired["sensitive"]:
+        return False
+    return (
+        current.get("value") == desired["value"]
+        and current.get("description") == desired["description"]
+    )
+
+
+def __build_var(key, value, description, sensitive, category):
+    return {
+        "key": key,
+        "value": value,
+        "description": description,
+        "sensitive": sensitive,
+        "category": category,
+    }
 
 
 def stage_destroy(workspace_id, assume_role_arn, assume_role_session_name, api_token):
-    set_aws_credentials(
+    run_id = queue_destroy(
         workspace_id, assume_role_arn, assume_role_session_name, api_token
     )
-    run_id = terraform.create_destroy_run(workspace_id, api_token)
-    # If in a Run there is no resource change, after execution it will be 'planned_and_finished', which can be a stabilized state
-    terraform.wait_to_stabilize(
-        "runs",
-        run_id,
-        ["planned", "applied", "planned_and_finished", "policy_checked"],
-        api_token,
-    )
+    with terraform.timed("destroy_run_wait"):
+        terraform.wait_to_stabilize("runs", run_id, DESTROY_TARGET_STATES, api_token)
     return run_id
 
 
-def delete_workspace(organization_name, workspace_name, assume_role_arn, api_token):
+def queue_destroy(workspace_id, assume_role_arn, assume_role_session_name, api_token):
+    set_aws_credentials(
+        workspace_id, assume_role_arn, assume_role_session_name, api_token
+    )
+    return terraform.create_destroy_run(workspace_id, api_token)
+
+
+def delete_workspace(
+    organization_name, workspace_name, assume_role_arn, role_session_name, api_token
+):
     workspace_id = terraform.check_workspace_exists(
         organization_name, workspace_name, api_token
     )
     if workspace_id:
-        stage_destroy(workspace_id, assume_role_arn, api_token)
+        stage_destroy(workspace_id, assume_role_arn, role_session_name, api_token)
         terraform.delete_workspace(workspace_id, api_token)
     else:
         print(
@@ -230,19 +581,138 @@ def delete_workspace(organization_name, workspace_name, assume_role_arn, api_tok
         )
 
 
+def offboard_manifest(
+    manifest,
+    organization_name,
+    role_session_name,
+    api_token,
+    max_concurrency=MANIFEST_MAX_CONCURRENCY,
+):
+    """
+    Destroys and deletes every workspace in the manifest. Destroy runs are
+    queued for all workspaces first, then watched concurrently on one event
+    loop, and each workspace is deleted as soon as its destroy run is applied.
+    Workspaces whose destroy did not succeed are kept, since their state
+    still tracks resources
+    """
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        results = list(
+            pool.map(
+                lambda entry: __queue_manifest_destroy(
+                    entry, organization_name, role_session_name, api_token
+                ),
+                manifest,
+            )
+        )
+    asyncio.run(__watch_and_delete(results, api_token, max_concurrency))
+    for result in results:
+        result["elapsed_seconds"] = round(time.monotonic() - result.pop("start"), 1)
+    return results
+
+
+def __queue_manifest_destroy(entry, organization_name, role_session_name, api_token):
+    result = {
+        "workspace_name": entry["workspace_name"],
+        "workspace_id": None,
+        "run_id": None,
+        "status": None,
+        "deleted": False,
+        "succeeded": False,
+        "error": None,
+        "start": time.monotonic(),
+    }
+    try:
+        result["workspace_id"] = terraform.check_workspace_exists(
+            entry.get("organization_name", organization_name),
+            entry["workspace_name"],
+            api_token,
+        )
+        if not result["workspace_id"]:
+            result["status"] = "not_found"
+            result["succeeded"] = True
+            return result
+        result["run_id"] = queue_destroy(
+            result["workspace_id"],
+            entry["assume_role_arn"],
+            entry.get("assume_role_session_name", role_session_name),
+            api_token,
+        )
+        print(
+            "Queued destroy run {} for workspace {}".format(
+                result["run_id"], __sanitize_input_for_logging(entry["workspace_name"])
+            )
+        )
+    except Exception as error:
+        print(
+            "Failed to queue destroy for workspace {}: {}".format(
+                __sanitize_input_for_logging(entry.get("workspace_name")),
+                __sanitize_input_for_logging(error),
+            )
+        )
+        result["error"] = str(error)
+    return result
+
+
+async def __watch_and_delete(results, api_token, max_connections):
+    async with AsyncTerraformClient(
+        terraform.TERRAFORM_API_ENDPOINT, api_token, max_connections=max_connections
+    ) as client:
+        await asyncio.gather(
+            *[
+                __destroy_and_delete(client, result)
+                for result in results
+                if result["run_id"] is not None
+            ]
+        )
+
+
+async def __destroy_and_delete(client, result):
+    try:
+        with terraform.timed("destroy_run_wait"):
+            result["status"] = await client.wait_to_stabilize(
+                "runs", result["run_id"], DESTROY_SUCCESS_STATES
+            )
+        if result["status"] not in DESTROY_SUCCESS_STATES:
+            result["error"] = "Destroy run not applied, workspace kept"
+            return
+        await client.delete_workspace(result["workspace_id"])
+        terraform.get_directory().remove_workspace_id(result["workspace_id"])
+        result["deleted"] = True
+        result["succeeded"] = True
+        print(
+            "Successfully deleted workspace {}".format(
+                __sanitize_input_for_logging(result["workspace_name"])
+            )
+        )
+    except Exception as error:
+        if isinstance(error, terraform.TerminalStateError):
+            result["status"] = error.status
+        elif not result["deleted"]:
+            # e.g. a run waiting on a policy override until the deadline
+            try:
+                result["status"] = await client.get_action_status(
+                    "runs", result["run_id"]
+                )
+            except Exception:
+                pass
+        result["error"] = str(error)
+
+
 def __assume_role(assume_role_arn, role_session_name):
-    sts = boto3.client("sts")
-    response = sts.assume_role(
-        RoleArn=assume_role_arn, RoleSessionName=role_session_name
-    )
+    global STS_CLIENT
+    # Client creation isn't thread-safe, the client itself is
+    with STS_CLIENT_LOCK:
+        if STS_CLIENT is None:
+            STS_CLIENT = boto3.client("sts")
+    with terraform.timed("assume_role"):
+        response = STS_CLIENT.assume_role(
+            RoleArn=assume_role_arn, RoleSessionName=role_session_name
+        )
     return response["Credentials"]
 
 
-def __transform_workspace_vars(workspace_vars):
-    vars_dict = {}
-    for var in workspace_vars:
-        vars_dict[var["attributes"]["key"]] = var["id"]
-    return vars_dict
+def __sanitize_input_for_logging(input):
+    return str(input).encode("unicode_escape").decode()
 
 
 if __name__ == "__main__":
@@ -271,6 +741,17 @@ if __name__ == "__main__":
     parser.add_argument("--terraform_version", type=str, help="Terraform Version")
     parser.add_argument("--config_file", type=str, help="Terraform Config File")
     parser.add_argument("--project_name", type=str, help="Name of the TFE project name")
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="JSON list of workspaces for the deploy_manifest and delete_manifest operations",
+    )
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=MANIFEST_MAX_CONCURRENCY,
+        help="Workspaces processed concurrently by the manifest operations",
+    )
 
     args = parser.parse_args()
 
@@ -279,12 +760,19 @@ if __name__ == "__main__":
     TERRAFORM_VERSION = args.terraform_version
 
     terraform.init(TERRAFORM_API_ENDPOINT, TERRAFORM_VERSION, LOCAL_CONFIGURATION_PATH)
+    exit_code = 0
+    if os.environ.get("TF_NOTIFICATION_LISTENER_PORT"):
+        terraform.start_notification_listener(
+            int(os.environ["TF_NOTIFICATION_LISTENER_PORT"]),
+            os.environ.get("TF_NOTIFICATION_TOKEN"),
+        )
 
     if args.operation == "delete":
         delete_workspace(
             args.organization_name,
             args.workspace_name,
             args.assume_role_arn,
+            args.assume_role_session_name,
             args.api_token,
         )
     elif args.operation == "deploy":
@@ -296,3 +784,28 @@ if __name__ == "__main__":
             args.api_token,
             args.project_name,
         )
+    elif args.operation == "deploy_manifest":
+        results = deploy_manifest(
+            __load_manifest(args.manifest),
+            args.organization_name,
+            args.assume_role_session_name,
+            args.api_token,
+            args.project_name,
+            args.max_concurrency,
+        )
+        print(json.dumps(results, indent=2))
+        if not all(result["succeeded"] for result in results):
+            exit_code = 1
+    elif args.operation == "delete_manifest":
+        results = offboard_manifest(
+            __load_manifest(args.manifest),
+            args.organization_name,
+            args.assume_role_session_name,
+            args.api_token,
+            args.max_concurrency,
+        )
+        print(json.dumps(results, indent=2))
+        if not all(result["succeeded"] for result in results):
+            exit_code = 1
+    terraform.get_metrics().write_summary()
+    sys.exit(exit_code)
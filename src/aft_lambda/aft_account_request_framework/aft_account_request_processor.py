@@ -63,7 +63,7 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
                 ),
             )
             if sqs_message is not None:
-                aft_metrics = AFTMetrics()
+                aft_metrics = AFTMetrics(auth=auth)
 
                 sqs_body = json.loads(sqs_message["Body"])
                 ct_request_is_valid = True
@@ -113,6 +113,8 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
                     raise RuntimeError("Unknown operation received in message")
 
                 sqs.delete_sqs_message(aft_management_session, sqs_message)
+                # Bounded wait so metrics never hold up vending
+                aft_metrics.flush()
                 if not ct_request_is_valid:
                     logger.exception("CT Request is not valid")
                     raise RuntimeError("CT Request is not valid")
@@ -1,60 +1,220 @@
 # Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 #
-import datetime
 import inspect
+import json
 import logging
 import re
+import statistics
 import time
-from typing import Any, Dict, TypedDict
+from typing import Any, Dict, List, TypedDict
 
 from boto3.session import Session
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger()
 logger.setLevel(level=logging.INFO)
 
+# Polling bounds; within them the delay follows the expected phase durations
+MIN_POLL_SECONDS = 5
+MAX_POLL_SECONDS = 30
+# Previous successful builds used to estimate phase durations
+BUILD_HISTORY_SIZE = 5
+# Stop polling this long before the Lambda hard timeout
+LAMBDA_TIMEOUT_MARGIN_SECONDS = 60
+# Used when no Lambda context is available
+DEFAULT_POLL_BUDGET_SECONDS = 14 * 60
+
+METRICS_NAMESPACE = "AFT/LambdaLayerBuild"
+
+LAYER_ARCHIVE_KEY = "layer.zip"
+# S3 user metadata written by the layer buildspec alongside layer.zip
+LAYER_CONTENT_HASH_METADATA_KEY = "content-hash"
+
 
 class LayerBuildStatus(TypedDict):
     Status: int
 
 
+def _sanitize(value: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9-_]", "", value)
+
+
+def _get_phase_history(
+    client: Any, project_name: str, current_build_id: str
+) -> Dict[str, float]:
+    """
+    Median duration per phase type over the last successful builds
+    """
+    build_ids = [
+        build_id
+        for build_id in client.list_builds_for_project(
+            projectName=project_name, sortOrder="DESCENDING"
+        )["ids"]
+        if build_id != current_build_id
+    ][: BUILD_HISTORY_SIZE * 2]
+    if not build_ids:
+        return {}
+
+    durations: Dict[str, List[float]] = {}
+    successful = [
+        build
+        for build in client.batch_get_builds(ids=build_ids)["builds"]
+        if build["buildStatus"] == "SUCCEEDED"
+    ][:BUILD_HISTORY_SIZE]
+    for build in successful:
+        for phase in build.get("phases", []):
+            if "durationInSeconds" in phase:
+                durations.setdefault(phase["phaseType"], []).append(
+                    phase["durationInSeconds"]
+                )
+    return {phase: statistics.median(values) for phase, values in durations.items()}
+
+
+def _next_poll_delay(
+    build: Dict[str, Any], phase_history: Dict[str, float], attempt: int
+) -> float:
+    """
+    Sleeps until the current phase is expected to finish. Without history
+    for the phase, backs off exponentially
+    """
+    phases = build.get("phases", [])
+    current = phases[-1] if phases else None
+    if current is not None and current["phaseType"] in phase_history:
+        started = current["startTime"].timestamp()
+        remaining = phase_history[current["phaseType"]] - (time.time() - started)
+        delay = remaining if remaining > 0 else MIN_POLL_SECONDS * 2 ** min(attempt, 3)
+    else:
+        delay = MIN_POLL_SECONDS * 2 ** min(attempt, 3)
+    return float(min(max(delay, MIN_POLL_SECONDS), MAX_POLL_SECONDS))
+
+
+def _emit_phase_metrics(project_name: str, build: Dict[str, Any]) -> None:
+    """
+    Publishes phase durations using the CloudWatch embedded metric format,
+    which Lambda extracts from stdout without any API call
+    """
+    phases = {
+        phase["phaseType"]: phase["durationInSeconds"]
+        for phase in build.get("phases", [])
+        if "durationInSeconds" in phase
+    }
+    if not phases:
+        return
+    print(
+        json.dumps(
+            {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": METRICS_NAMESPACE,
+                            "Dimensions": [["Project", "BuildStatus"]],
+                            "Metrics": [
+                                {"Name": phase, "Unit": "Seconds"} for phase in phases
+                            ],
+                        }
+                    ],
+                },
+                "Project": project_name,
+                "BuildStatus": build["buildStatus"],
+                **phases,
+            }
+        )
+    )
+
+
+def _published_layer_matches(
+    session: Session, bucket_name: str, content_hash: str
+) -> bool:
+    """
+    True if the layer archive already in S3 was built from content_hash
+    """
+    s3 = session.client("s3")
+    try:
+        head = s3.head_object(Bucket=bucket_name, Key=LAYER_ARCHIVE_KEY)
+    except ClientError as error:
+        code = error.response["Error"]["Code"]
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return False
+        # Without s3:ListBucket, S3 reports a missing key as 403. Building is
+        # always safe, so an unreadable archive is treated as out of date
+        if code in ("403", "AccessDenied", "Forbidden"):
+            logger.info(f"Unable to read {LAYER_ARCHIVE_KEY} metadata ({code})")
+            return False
+        raise
+    return bool(
+        head.get("Metadata", {}).get(LAYER_CONTENT_HASH_METADATA_KEY) == content_hash
+    )
+
+
+def _get_poll_deadline(context: Any) -> float:
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining is None:
+        return time.monotonic() + DEFAULT_POLL_BUDGET_SECONDS
+    return time.monotonic() + get_remaining() / 1000 - LAMBDA_TIMEOUT_MARGIN_SECONDS
+
+
 # This function is directly responsible for building `aft_common` library
 # Do not import  `aft_common` into this handler!
-def lambda_handler(event: Dict[str, Any], context: Dict[str, Any]) -> LayerBuildStatus:
+def lambda_handler(event: Dict[str, Any], context: Any) -> LayerBuildStatus:
+    """
+    Starts the layer build and polls until it finishes. The build is skipped
+    when the published layer archive already carries
+    event["layer_content_hash"]
+    """
     session = Session()
     try:
         client = session.client("codebuild")
 
         codebuild_project_name = event["codebuild_project_name"]
-        job_id = client.start_build(projectName=codebuild_project_name)["build"]["id"]
-        sanitized_codebuild_project_name = re.sub(
-            r"[^a-zA-Z0-9-_]", "", codebuild_project_name
-        )
-        sanitized_job_id = re.sub(r"[^a-zA-Z0-9-_]", "", job_id)
+        sanitized_codebuild_project_name = _sanitize(codebuild_project_name)
+        content_hash: str = event.get("layer_content_hash", "")
+        if content_hash and not event.get("force_build"):
+            if _published_layer_matches(session, event["bucket_name"], content_hash):
+                logger.info(
+                    f"Layer for {sanitized_codebuild_project_name} is up to date, skipping build"
+                )
+                return {"Status": 200}
+
+        # The buildspec stamps the hash of the source it actually clones
+        response = client.start_build(projectName=codebuild_project_name)
+        job_id: str = response["build"]["id"]
+        sanitized_job_id = _sanitize(job_id)
         logger.info(
             f"Started build project {sanitized_codebuild_project_name} job {sanitized_job_id}"
         )
-        # Wait at least 30 seconds for the build to initialize
-        time.sleep(30)
 
-        # 15min Lambda hard-timeout, soft-timeout at 14min
-        end_time = datetime.datetime.utcnow() + datetime.timedelta(minutes=14)
-        while datetime.datetime.utcnow() <= end_time:
+        deadline = _get_poll_deadline(context)
+        try:
+            phase_history = _get_phase_history(client, codebuild_project_name, job_id)
+        except ClientError as error:
+            # Estimates only tune the polling cadence, never fail the build on them
+            logger.info(f"Unable to read build history: {error}")
+            phase_history = {}
+        logger.info(f"Expected phase durations: {phase_history}")
+
+        attempt = 0
+        while True:
             # We pass exactly 1 job ID, so the build list should contain exactly 1 object
-            job_status = client.batch_get_builds(ids=[job_id])["builds"][0][
-                "buildStatus"
-            ]
-            if job_status == "IN_PROGRESS":
-                time.sleep(10)
-                continue
-            elif job_status == "SUCCEEDED":
-                logger.info(f"Build job {sanitized_job_id} completed successfully")
-                return {"Status": 200}
-            else:
+            build = client.batch_get_builds(ids=[job_id])["builds"][0]
+            job_status = build["buildStatus"]
+            if job_status != "IN_PROGRESS":
+                _emit_phase_metrics(codebuild_project_name, build)
+                if job_status == "SUCCEEDED":
+                    logger.info(f"Build job {sanitized_job_id} completed successfully")
+                    return {"Status": 200}
                 logger.info(
                     f"Build {sanitized_job_id} failed - non-success terminal status"
                 )
                 raise Exception(f"Build {job_id} failed - non-success terminal status")
+
+            delay = _next_poll_delay(build, phase_history, attempt)
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            attempt += 1
+
         logger.info(f"Build {sanitized_job_id} failed - time out")
         raise Exception(f"Build {job_id} failed - time out")
 
@@ -14,12 +14,14 @@ from aft_common.account_request_framework import (
 from aft_common.aft_utils import sanitize_input_for_logging
 from aft_common.auth import AuthClient
 from aft_common.customizations import (
+    IDENTIFY_TARGETS_LOG_CALL_SITE,
     get_excluded_accounts,
     get_included_accounts,
     get_target_accounts,
+    reset_aft_account_ids_cache,
     validate_identify_targets_request,
 )
-from aft_common.logger import configure_aft_logger
+from aft_common.logger import configure_aft_logger, log_payload
 from aft_common.organizations import OrganizationsAgent
 from botocore.exceptions import ClientError
 
@@ -34,6 +36,7 @@ logger = logging.getLogger("aft")
 
 
 def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
+    reset_aft_account_ids_cache()
     auth = AuthClient()
     try:
         aft_management_session = auth.get_aft_management_session()
@@ -90,8 +93,12 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, A
                     account_request=account_request,
                     control_tower_event={},
                 )
-                sanitized_payload = sanitize_input_for_logging(account_payload)
-                logger.info(f"Successfully generated payload: {sanitized_payload}")
+                log_payload(
+                    logger,
+                    IDENTIFY_TARGETS_LOG_CALL_SITE,
+                    "Successfully generated payload",
+                    account_payload,
+                )
                 target_account_info.append(account_payload)
 
             return {
@@ -2,7 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 import inspect
-from typing import TYPE_CHECKING, Any, Dict
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import aft_common.ssm
 import boto3
@@ -11,32 +12,29 @@ from aft_common import notifications
 from aft_common.account_provisioning_framework import ProvisionRoles
 from aft_common.auth import AuthClient
 from aft_common.feature_options import (
-    delete_acls,
-    delete_internet_gateways,
-    delete_route_tables,
-    delete_security_groups,
-    delete_subnets,
-    delete_vpc,
+    DefaultVpcDeletionPlan,
+    apply_default_vpc_deletion_plan,
+    build_default_vpc_deletion_plan,
     get_aws_regions,
-    get_default_vpc,
-    get_vpc_acls,
-    get_vpc_internet_gateways,
-    get_vpc_route_tables,
-    get_vpc_security_groups,
-    get_vpc_subnets,
+    get_default_vpc_deletion_checkpoint,
+    put_default_vpc_deletion_checkpoint,
 )
 from aft_common.logger import customization_request_logger
 
 if TYPE_CHECKING:
     from aws_lambda_powertools.utilities.typing import LambdaContext
-    from mypy_boto3_ec2 import EC2Client, EC2ServiceResource
+    from mypy_boto3_ec2 import EC2Client
 else:
     EC2Client = object
-    EC2ServiceResource = object
     LambdaContext = object
 
+# When "true", the plan is built and returned but nothing is deleted
+DRY_RUN_ENV_VAR = "AFT_DEFAULT_VPC_DELETION_DRY_RUN"
 
-def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
+
+def lambda_handler(
+    event: Dict[str, Any], context: LambdaContext
+) -> Optional[DefaultVpcDeletionPlan]:
     request_id = event["customization_request_id"]
     target_account_id = event["account_info"]["account"]["id"]
 
@@ -47,43 +45,47 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
     auth = AuthClient()
     aft_session = boto3.session.Session()
     try:
-        target_account_session = auth.get_target_account_session(
-            account_id=target_account_id, role_name=ProvisionRoles.SERVICE_ROLE_NAME
-        )
-        client: EC2Client = target_account_session.client("ec2")
-        regions = get_aws_regions(client)
-
         if (
             aft_common.ssm.get_ssm_parameter_value(
                 aft_session, utils.SSM_PARAM_FEATURE_DEFAULT_VPCS_ENABLED
             ).lower()
             == "true"
         ):
-            for region in regions:
-                logger.info(
-                    "Deleting default VPC for AFT management account in region "
-                    + region
+            target_account_session = auth.get_target_account_session(
+                account_id=target_account_id,
+                role_name=ProvisionRoles.SERVICE_ROLE_NAME,
+            )
+            client: EC2Client = target_account_session.client("ec2")
+
+            # Resume the plan of a previous attempt of this request, if any
+            plan = get_default_vpc_deletion_checkpoint(aft_session, target_account_id)
+            if plan is None or plan["request_id"] != request_id:
+                regions = get_aws_regions(client)
+                plan = build_default_vpc_deletion_plan(
+                    target_account_session,
+                    regions,
+                    account_id=target_account_id,
+                    request_id=request_id,
                 )
-                session = boto3.session.Session(region_name=region)
-                client = session.client("ec2")
-                vpc = get_default_vpc(client)
-                if vpc is not None:
-                    resource: EC2ServiceResource = boto3.resource(
-                        "ec2", region_name=region
-                    )
-                    # Get Resources
-                    subnets = get_vpc_subnets(resource, vpc)
-                    route_tables = get_vpc_route_tables(resource, vpc)
-                    acls = get_vpc_acls(resource, vpc)
-                    security_groups = get_vpc_security_groups(resource, vpc)
-                    internet_gateways = get_vpc_internet_gateways(resource, vpc)
-                    # Delete Resources
-                    delete_internet_gateways(client, internet_gateways, vpc)
-                    delete_subnets(client, subnets)
-                    delete_route_tables(client, route_tables)
-                    delete_acls(client, acls)
-                    delete_security_groups(client, security_groups)
-                    delete_vpc(client, vpc)
+            else:
+                logger.info("Resuming default VPC deletion plan from checkpoint")
+
+            if os.environ.get(DRY_RUN_ENV_VAR, "false").lower() == "true":
+                logger.info(f"Dry run, default VPC deletion plan: {plan}")
+                return plan
+
+            put_default_vpc_deletion_checkpoint(aft_session, plan)
+            apply_default_vpc_deletion_plan(
+                target_account_session,
+                plan,
+                checkpoint=lambda p: put_default_vpc_deletion_checkpoint(
+                    aft_session, p
+                ),
+            )
+            logger.info(f"Default VPC deletion plan applied: {plan}")
+            return plan
+
+        return None
 
     except Exception as error:
         notifications.send_lambda_failure_sns_message(
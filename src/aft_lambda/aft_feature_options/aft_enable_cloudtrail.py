@@ -10,13 +10,10 @@ from aft_common import notifications
 from aft_common.account_provisioning_framework import ProvisionRoles
 from aft_common.auth import AuthClient
 from aft_common.feature_options import (
-    create_trail,
-    event_selectors_exists,
-    get_log_bucket_arns,
-    put_event_selectors,
-    start_logging,
-    trail_exists,
-    trail_is_logging,
+    cloudtrail_is_converged,
+    get_cloudtrail_desired_state_hash,
+    reconcile_org_trail,
+    record_cloudtrail_converged,
 )
 from aft_common.logger import customization_request_logger
 from boto3.session import Session
@@ -41,17 +38,13 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
     aft_session = Session()
 
     try:
-        ct_session = auth.get_ct_management_session(
-            role_name=ProvisionRoles.SERVICE_ROLE_NAME
-        )
-        log_archive_session = auth.get_log_archive_session(
-            role_name=ProvisionRoles.SERVICE_ROLE_NAME
-        )
-
         # Get SSM Parameters
         cloudtrail_enabled = aft_common.ssm.get_ssm_parameter_value(
             aft_session, utils.SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED
         )
+        if cloudtrail_enabled != "true":
+            return None
+
         s3_log_bucket_arn = aft_common.ssm.get_ssm_parameter_value(
             aft_session, "/aft/account/log-archive/log_bucket_arn"
         )
@@ -59,16 +52,28 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
         kms_key_arn = aft_common.ssm.get_ssm_parameter_value(
             aft_session, "/aft/account/log-archive/kms_key_arn"
         )
-        log_bucket_arns = get_log_bucket_arns(log_archive_session)
 
-        if cloudtrail_enabled == "true":
-            logger.info("Enabling Cloudtrail")
-            if not trail_exists(ct_session):
-                create_trail(ct_session, s3_bucket_name, kms_key_arn)
-            if not event_selectors_exists(ct_session):
-                put_event_selectors(ct_session, log_bucket_arns)
-            if not trail_is_logging(ct_session):
-                start_logging(ct_session)
+        # The org trail is a singleton, so once a previous account converged
+        # it there is nothing to do until the marker expires
+        desired_hash = get_cloudtrail_desired_state_hash(s3_bucket_name, kms_key_arn)
+        if cloudtrail_is_converged(aft_session, desired_hash):
+            logger.info("Org trail already converged, skipping")
+            return None
+
+        logger.info("Enabling Cloudtrail")
+        ct_session = auth.get_ct_management_session(
+            role_name=ProvisionRoles.SERVICE_ROLE_NAME
+        )
+        log_archive_session = auth.get_log_archive_session(
+            role_name=ProvisionRoles.SERVICE_ROLE_NAME
+        )
+        reconcile_org_trail(
+            ct_management_session=ct_session,
+            log_archive_session=log_archive_session,
+            s3_bucket_name=s3_bucket_name,
+            kms_key_arn=kms_key_arn,
+        )
+        record_cloudtrail_converged(aft_session, desired_hash)
 
     except Exception as error:
         notifications.send_lambda_failure_sns_message(
@@ -84,3 +89,4 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
         }
         logger.exception(message)
         raise
+    return None
@@ -2,15 +2,23 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 import inspect
-from typing import TYPE_CHECKING, Any, Dict
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import aft_common.ssm
 from aft_common import constants as utils
 from aft_common import feature_options, notifications
 from aft_common.account_provisioning_framework import ProvisionRoles
+from aft_common.aft_utils import sanitize_input_for_logging
 from aft_common.auth import AuthClient
-from aft_common.logger import customization_request_logger
-from aft_common.premium_support import account_enrollment_requested, generate_case
+from aft_common.logger import configure_aft_logger, customization_request_logger
+from aft_common.premium_support import (
+    BatchEnrollmentResult,
+    account_enrollment_requested,
+    enroll_accounts_in_batches,
+    generate_case,
+    get_case_after_time,
+)
 from boto3.session import Session
 
 if TYPE_CHECKING:
@@ -19,7 +27,78 @@ else:
     LambdaContext = object
 
 
-def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
+# Batch mode, e.g. when importing an existing fleet:
+# {"account_ids": ["111111111111", ...], "case_count": 2}
+BATCH_ACCOUNT_IDS_KEY = "account_ids"
+BATCH_CASE_COUNT_KEY = "case_count"
+
+
+def enroll_batch(
+    event: Dict[str, Any], context: LambdaContext
+) -> BatchEnrollmentResult:
+    configure_aft_logger()
+    logger = logging.getLogger("aft")
+    auth = AuthClient()
+    aft_session = Session()
+    try:
+        account_ids = []
+        invalid_account_ids = []
+        for account_id in event[BATCH_ACCOUNT_IDS_KEY]:
+            if isinstance(account_id, str) and feature_options.is_valid_account_id(
+                account_id
+            ):
+                account_ids.append(account_id)
+            else:
+                invalid_account_ids.append(str(account_id))
+        if invalid_account_ids:
+            logger.warning(
+                f"Skipping invalid account IDs: {sanitize_input_for_logging(invalid_account_ids)}"
+            )
+
+        if (
+            aft_common.ssm.get_ssm_parameter_value(
+                aft_session, utils.SSM_PARAM_FEATURE_ENTERPRISE_SUPPORT_ENABLED
+            ).lower()
+            != "true"
+        ):
+            return BatchEnrollmentResult(
+                already_enrolled=[], cases={}, invalid_account_ids=invalid_account_ids
+            )
+
+        ct_mgmt_session = auth.get_ct_management_session(
+            role_name=ProvisionRoles.SERVICE_ROLE_NAME
+        )
+        result = enroll_accounts_in_batches(
+            ct_management_session=ct_mgmt_session,
+            aft_management_session=aft_session,
+            account_ids=account_ids,
+            case_count=int(event.get(BATCH_CASE_COUNT_KEY, 1)),
+        )
+        result["invalid_account_ids"] = invalid_account_ids
+        return result
+
+    except Exception as error:
+        notifications.send_lambda_failure_sns_message(
+            session=aft_session,
+            message=str(error),
+            context=context,
+            subject="AFT: Failed to batch enroll into Enterprise Support",
+        )
+        message = {
+            "FILE": __file__.split("/")[-1],
+            "METHOD": inspect.stack()[0][3],
+            "EXCEPTION": str(error),
+        }
+        logger.exception(message)
+        raise
+
+
+def lambda_handler(
+    event: Dict[str, Any], context: LambdaContext
+) -> Optional[BatchEnrollmentResult]:
+    if BATCH_ACCOUNT_IDS_KEY in event:
+        return enroll_batch(event, context)
+
     request_id = event["customization_request_id"]
     target_account_id = event["account_info"]["account"]["id"]
 
@@ -44,11 +123,22 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
             ).lower()
             == "true"
         ):
-            if not account_enrollment_requested(ct_mgmt_session, target_account_id):
+            if not account_enrollment_requested(
+                ct_management_session=ct_mgmt_session,
+                account_id=target_account_id,
+                aft_management_session=aft_session,
+                after_time=get_case_after_time(
+                    event["account_info"]["account"].get("joined_date")
+                ),
+            ):
                 logger.info(
                     "Generating support case for enrolling target account into AWS Enterprise Support"
                 )
-                generate_case(ct_mgmt_session, target_account_id)
+                generate_case(
+                    ct_mgmt_session,
+                    target_account_id,
+                    aft_management_session=aft_session,
+                )
 
     except Exception as error:
         notifications.send_lambda_failure_sns_message(
@@ -64,3 +154,4 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> None:
         }
         logger.exception(message)
         raise
+    return None
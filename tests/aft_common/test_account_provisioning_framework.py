@@ -0,0 +1,125 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import time
+
+import pytest
+from aft_common import account_provisioning_framework as apf
+from aft_common.account_provisioning_framework import ProvisionRoles
+
+SERVICE = ProvisionRoles.SERVICE_ROLE_NAME
+EXECUTION = ProvisionRoles.EXECUTION_ROLE_NAME
+
+
+class FakeSession:
+    def client(self, service_name):
+        return object()
+
+
+@pytest.fixture
+def provisioning(monkeypatch):
+    monkeypatch.setattr(apf, "IAM_READINESS_BASE_DELAY_SECONDS", 0.02)
+    monkeypatch.setattr(apf, "IAM_READINESS_MAX_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(apf, "IAM_READINESS_CONFIRMATIONS", 1)
+
+    # Skip __init__: it assumes into CT management to resolve the partition
+    provisioning = ProvisionRoles.__new__(ProvisionRoles)
+    provisioning.target_account_id = "111111111111"
+    provisioning.partition = "aws"
+    provisioning.ADMINISTRATOR_ACCESS_MANAGED_POLICY_ARN = (
+        "arn:aws:iam::aws:policy/AdministratorAccess"
+    )
+    provisioning.recorded = {}
+    monkeypatch.setattr(provisioning, "generate_aft_trust_policy", lambda: "{}")
+    monkeypatch.setattr(provisioning, "_get_target_account_session", FakeSession)
+    monkeypatch.setattr(
+        provisioning,
+        "_record_propagation_latency",
+        lambda role_name, latency: provisioning.recorded.update({role_name: latency}),
+    )
+    monkeypatch.setattr(
+        ProvisionRoles, "apply_role_changes", staticmethod(lambda **kwargs: None)
+    )
+    return provisioning
+
+
+def _role_changes(monkeypatch, changes_by_role):
+    monkeypatch.setattr(
+        ProvisionRoles,
+        "get_role_changes",
+        staticmethod(lambda role_name, **kwargs: changes_by_role[role_name]),
+    )
+
+
+def _ready_after(monkeypatch, provisioning, seconds_by_role):
+    first_probe = {}
+
+    def role_is_ready(role_name):
+        first_probe.setdefault(role_name, time.monotonic())
+        return time.monotonic() - first_probe[role_name] >= seconds_by_role[role_name]
+
+    monkeypatch.setattr(provisioning, "_role_is_ready", role_is_ready)
+
+
+def test_each_role_latency_is_timed_from_its_own_deployment(monkeypatch, provisioning):
+    _role_changes(
+        monkeypatch,
+        {SERVICE: [apf.ROLE_CHANGE_CREATE], EXECUTION: [apf.ROLE_CHANGE_CREATE]},
+    )
+    _ready_after(monkeypatch, provisioning, {SERVICE: 0.3, EXECUTION: 0.0})
+
+    provisioning.deploy_aws_aft_roles()
+
+    assert provisioning.recorded[SERVICE] >= 0.3
+    # The execution role is usable on its first probe; its latency must not
+    # include the service role's wait
+    assert provisioning.recorded[EXECUTION] < 0.1
+
+
+def test_confirmation_probes_are_not_counted_as_latency(monkeypatch, provisioning):
+    monkeypatch.setattr(apf, "IAM_READINESS_BASE_DELAY_SECONDS", 0.1)
+    monkeypatch.setattr(apf, "IAM_READINESS_CONFIRMATIONS", 3)
+    _role_changes(
+        monkeypatch,
+        {SERVICE: [apf.ROLE_CHANGE_CREATE], EXECUTION: [apf.ROLE_CHANGE_CREATE]},
+    )
+    _ready_after(monkeypatch, provisioning, {SERVICE: 0.0, EXECUTION: 0.0})
+
+    provisioning.deploy_aws_aft_roles()
+
+    # Confirming takes two base delays; the roles were usable straight away
+    assert provisioning.recorded[SERVICE] < 0.1
+    assert provisioning.recorded[EXECUTION] < 0.1
+
+
+def test_roles_share_one_readiness_deadline(monkeypatch, provisioning):
+    monkeypatch.setattr(apf, "IAM_READINESS_TIMEOUT_SECONDS", 0.3)
+    _role_changes(monkeypatch, {SERVICE: [], EXECUTION: []})
+    probes = []
+
+    def role_is_ready(role_name):
+        probes.append(role_name)
+        return False
+
+    monkeypatch.setattr(provisioning, "_role_is_ready", role_is_ready)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError) as error:
+        provisioning.deploy_aws_aft_roles()
+
+    # One 0.3s budget for both roles, not 0.3s each
+    assert time.monotonic() - start < 0.5
+    assert f"{SERVICE}, {EXECUTION}" in str(error.value)
+    assert probes[:4] == [SERVICE, EXECUTION, SERVICE, EXECUTION]
+
+
+def test_unchanged_roles_report_no_latency(monkeypatch, provisioning):
+    _role_changes(
+        monkeypatch,
+        {SERVICE: [apf.ROLE_CHANGE_UPDATE_TRUST_POLICY], EXECUTION: []},
+    )
+    _ready_after(monkeypatch, provisioning, {SERVICE: 0.0, EXECUTION: 0.0})
+
+    provisioning.deploy_aws_aft_roles()
+
+    assert set(provisioning.recorded) == {SERVICE}
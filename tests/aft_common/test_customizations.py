@@ -0,0 +1,49 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import pytest
+from aft_common import customizations
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Records the keyword arguments of every parallel_scan of the metadata table"""
+    scans = []
+
+    def parallel_scan(session, table_name, **kwargs):
+        scans.append(dict(kwargs, table_name=table_name))
+        yield from (
+            {"id": account_id} for account_id in ["111111111111", "222222222222"]
+        )
+
+    monkeypatch.setattr(customizations, "parallel_scan", parallel_scan)
+    monkeypatch.setattr(
+        customizations,
+        "get_ssm_parameter_value",
+        lambda session, param: "aft-request-metadata",
+    )
+    customizations.reset_aft_account_ids_cache()
+    yield scans
+    customizations.reset_aft_account_ids_cache()
+
+
+def test_account_ids_come_from_one_consistent_parallel_scan(scans):
+    for _ in range(2):
+        assert sorted(customizations.get_all_aft_account_ids(None)) == [
+            "111111111111",
+            "222222222222",
+        ]
+
+    assert len(scans) == 1
+    assert scans[0]["table_name"] == "aft-request-metadata"
+    assert scans[0]["projection"] == ["id"]
+    assert scans[0]["consistent_read"] is True
+    assert scans[0]["total_segments"] == customizations.AFT_ACCOUNT_IDS_SCAN_SEGMENTS
+
+
+def test_reset_forces_a_new_scan(scans):
+    customizations.get_all_aft_account_ids(None)
+    customizations.reset_aft_account_ids_cache()
+    customizations.get_all_aft_account_ids(None)
+
+    assert len(scans) == 2
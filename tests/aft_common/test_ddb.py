@@ -0,0 +1,108 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import threading
+
+import pytest
+from aft_common import ddb
+
+
+class FakeScanClient:
+    """
+    DynamoDB client serving each scan segment as pages of page_size items,
+    keyed by an "id" string attribute
+    """
+
+    def __init__(self, ids_by_segment, page_size=2, fail_segment=None):
+        self.ids_by_segment = ids_by_segment
+        self.page_size = page_size
+        self.fail_segment = fail_segment
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def scan(self, **params):
+        with self.lock:
+            self.requests.append(params)
+        segment = params["Segment"]
+        if segment == self.fail_segment:
+            raise RuntimeError(f"segment {segment} failed")
+        ids = self.ids_by_segment[segment]
+        start = int(params.get("ExclusiveStartKey", {"id": {"S": "0"}})["id"]["S"])
+        page = ids[start : start + self.page_size]
+        response = {
+            "Items": [{"id": {"S": account_id}} for account_id in page],
+            "Count": len(page),
+            "ScannedCount": len(page),
+            "ConsumedCapacity": {"CapacityUnits": 0.5},
+        }
+        if start + self.page_size < len(ids):
+            response["LastEvaluatedKey"] = {"id": {"S": str(start + self.page_size)}}
+        return response
+
+
+class FakeSession:
+    def __init__(self, client):
+        self.dynamodb = client
+
+    def client(self, service_name):
+        return self.dynamodb
+
+
+IDS_BY_SEGMENT = {
+    0: ["111111111111", "222222222222", "333333333333"],
+    1: [],
+    2: ["444444444444"],
+    3: ["555555555555", "666666666666", "777777777777", "888888888888"],
+}
+
+
+def test_segments_are_merged_and_paginated():
+    client = FakeScanClient(IDS_BY_SEGMENT)
+    stats = ddb.ParallelScanStats()
+
+    items = list(
+        ddb.parallel_scan(
+            FakeSession(client),
+            "aft-request-metadata",
+            total_segments=4,
+            projection=["id"],
+            consistent_read=True,
+            stats=stats,
+        )
+    )
+
+    expected = [account_id for ids in IDS_BY_SEGMENT.values() for account_id in ids]
+    assert sorted(item["id"] for item in items) == sorted(expected)
+    # Every segment is read to its last page, continuing from the last key
+    pages_by_segment = {
+        segment: [
+            r.get("ExclusiveStartKey")
+            for r in client.requests
+            if r["Segment"] == segment
+        ]
+        for segment in IDS_BY_SEGMENT
+    }
+    assert pages_by_segment == {
+        0: [None, {"id": {"S": "2"}}],
+        1: [None],
+        2: [None],
+        3: [None, {"id": {"S": "2"}}],
+    }
+    request = client.requests[0]
+    assert request["TotalSegments"] == 4
+    assert request["ConsistentRead"] is True
+    assert request["ProjectionExpression"] == "#proj0"
+    assert request["ExpressionAttributeNames"] == {"#proj0": "id"}
+    assert stats.as_dict() == {
+        "pages": 6,
+        "items": len(expected),
+        "scanned_count": len(expected),
+        "consumed_capacity_units": 3.0,
+    }
+
+
+def test_segment_failure_is_raised():
+    client = FakeScanClient(IDS_BY_SEGMENT, fail_segment=2)
+
+    with pytest.raises(RuntimeError, match="segment 2 failed"):
+        list(ddb.parallel_scan(FakeSession(client), "aft-request-metadata"))
@@ -0,0 +1,484 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import json
+from types import SimpleNamespace
+
+import pytest
+from aft_common import feature_options
+from botocore.exceptions import ClientError
+
+from src.aft_lambda.aft_feature_options import (
+    aft_delete_default_vpc,
+    aft_enable_cloudtrail,
+)
+
+ACCOUNT_ID = "111111111111"
+REQUEST_ID = "request-1"
+
+DEFAULT_VPC = {
+    "describe_vpcs": [{"VpcId": "vpc-1"}],
+    "describe_internet_gateways": [{"InternetGatewayId": "igw-1"}],
+    "describe_subnets": [{"SubnetId": "subnet-1"}, {"SubnetId": "subnet-2"}],
+    "describe_route_tables": [
+        {"RouteTableId": "rtb-main", "Associations": [{"Main": True}]},
+        {"RouteTableId": "rtb-1", "Associations": []},
+    ],
+    "describe_network_acls": [{"NetworkAclId": "acl-default", "IsDefault": True}],
+    "describe_security_groups": [
+        {"GroupId": "sg-default", "GroupName": "default"},
+        {"GroupId": "sg-1", "GroupName": "web"},
+    ],
+}
+RESULT_KEYS = {
+    "describe_vpcs": "Vpcs",
+    "describe_internet_gateways": "InternetGateways",
+    "describe_subnets": "Subnets",
+    "describe_route_tables": "RouteTables",
+    "describe_network_acls": "NetworkAcls",
+    "describe_security_groups": "SecurityGroups",
+}
+
+
+class FakeEC2:
+    """
+    EC2 client for one region serving fixed Describe* pages. Detach and
+    delete calls are recorded as (operation, resource id); errors maps a
+    resource id to the error code its deletion fails with
+    """
+
+    def __init__(self, region, resources, errors=None):
+        self.meta = SimpleNamespace(region_name=region)
+        self.resources = resources
+        self.errors = errors or {}
+        self.calls = []
+
+    def get_paginator(self, operation):
+        pages = [{RESULT_KEYS[operation]: self.resources.get(operation, [])}]
+        return SimpleNamespace(paginate=lambda Filters: iter(pages))
+
+    def __getattr__(self, name):
+        if not name.startswith(("delete_", "detach_")):
+            raise AttributeError(name)
+
+        def call(**kwargs):
+            resource_id = next(iter(kwargs.values()))
+            self.calls.append((name, resource_id))
+            if resource_id in self.errors:
+                raise ClientError(
+                    {"Error": {"Code": self.errors[resource_id], "Message": ""}}, name
+                )
+
+        return call
+
+
+class FakeSession:
+    def __init__(self, clients):
+        self.clients = {client.meta.region_name: client for client in clients}
+
+    def client(self, service_name, region_name=None):
+        # Without a region, the session's default is the first one
+        return self.clients[region_name or next(iter(self.clients))]
+
+
+def _plan(session, regions):
+    return feature_options.build_default_vpc_deletion_plan(
+        session, regions, account_id=ACCOUNT_ID, request_id=REQUEST_ID
+    )
+
+
+def _mutations(session):
+    return [call for client in session.clients.values() for call in client.calls]
+
+
+def test_plan_orders_steps_by_dependency_and_deletes_nothing():
+    session = FakeSession([FakeEC2("us-east-1", DEFAULT_VPC), FakeEC2("eu-west-1", {})])
+
+    plan = _plan(session, ["us-east-1", "eu-west-1"])
+
+    # Regions without a default VPC have nothing to do
+    assert list(plan["regions"]) == ["us-east-1"]
+    assert [
+        (step["action"], step["resource_id"]) for step in plan["regions"]["us-east-1"]
+    ] == [
+        ("detach_internet_gateway", "igw-1"),
+        ("delete_internet_gateway", "igw-1"),
+        ("delete_subnet", "subnet-1"),
+        ("delete_subnet", "subnet-2"),
+        ("delete_route_table", "rtb-1"),
+        ("delete_security_group", "sg-1"),
+        ("delete_vpc", "vpc-1"),
+    ]
+    assert all(
+        step["status"] == feature_options.DEFAULT_VPC_STEP_PENDING
+        for step in plan["regions"]["us-east-1"]
+    )
+    assert _mutations(session) == []
+
+
+def test_resumed_plan_skips_steps_already_done():
+    plan = _plan(FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)]), ["us-east-1"])
+    steps = plan["regions"]["us-east-1"]
+    for step in steps[:3]:
+        step["status"] = feature_options.DEFAULT_VPC_STEP_DONE
+    # A resumed plan comes back from its JSON checkpoint
+    plan = json.loads(json.dumps(plan))
+    session = FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)])
+
+    feature_options.apply_default_vpc_deletion_plan(session, plan)
+
+    assert _mutations(session) == [
+        (step["action"], step["resource_id"]) for step in steps[3:]
+    ]
+    assert all(
+        step["status"] == feature_options.DEFAULT_VPC_STEP_DONE
+        for step in plan["regions"]["us-east-1"]
+    )
+
+
+def test_already_deleted_resources_are_marked_done():
+    plan = _plan(FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)]), ["us-east-1"])
+    session = FakeSession(
+        [
+            FakeEC2(
+                "us-east-1",
+                DEFAULT_VPC,
+                errors={
+                    "igw-1": "Gateway.NotAttached",
+                    "subnet-1": "InvalidSubnetID.NotFound",
+                },
+            )
+        ]
+    )
+
+    feature_options.apply_default_vpc_deletion_plan(session, plan)
+
+    assert len(_mutations(session)) == len(plan["regions"]["us-east-1"])
+    assert all(
+        step["status"] == feature_options.DEFAULT_VPC_STEP_DONE
+        for step in plan["regions"]["us-east-1"]
+    )
+
+
+def test_failed_step_stays_pending_in_the_final_checkpoint():
+    plan = _plan(FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)]), ["us-east-1"])
+    session = FakeSession(
+        [FakeEC2("us-east-1", DEFAULT_VPC, errors={"sg-1": "DependencyViolation"})]
+    )
+    checkpoints = []
+
+    with pytest.raises(Exception, match="DependencyViolation"):
+        feature_options.apply_default_vpc_deletion_plan(
+            session, plan, checkpoint=lambda p: checkpoints.append(json.dumps(p))
+        )
+
+    statuses = {
+        step["resource_id"]: step["status"]
+        for step in json.loads(checkpoints[-1])["regions"]["us-east-1"]
+    }
+    assert statuses["subnet-2"] == feature_options.DEFAULT_VPC_STEP_DONE
+    assert (
+        statuses["sg-1"]
+        == statuses["vpc-1"]
+        == feature_options.DEFAULT_VPC_STEP_PENDING
+    )
+    assert ("delete_vpc", "vpc-1") not in _mutations(session)
+
+
+class FakeMetadataTable:
+    """AFT metadata table supporting get_item and the checkpoint update_item"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def Table(self, table_name):
+        return self
+
+    def get_item(self, Key):
+        item = self.items.get(Key["id"])
+        return {} if item is None else {"Item": item}
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        if Key["id"] not in self.items:
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": ""}},
+                "UpdateItem",
+            )
+        self.items[Key["id"]][feature_options.DEFAULT_VPC_PLAN_ATTRIBUTE] = (
+            ExpressionAttributeValues[":plan"]
+        )
+
+
+@pytest.fixture
+def metadata_table(monkeypatch):
+    table = FakeMetadataTable({ACCOUNT_ID: {"id": ACCOUNT_ID}})
+    monkeypatch.setattr(
+        feature_options, "get_ssm_parameter_value", lambda session, param: "metadata"
+    )
+    session = SimpleNamespace(resource=lambda service_name: table)
+    return session, table
+
+
+def test_checkpoint_round_trips_through_the_metadata_item(metadata_table):
+    session, table = metadata_table
+    plan = _plan(FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)]), ["us-east-1"])
+    plan["regions"]["us-east-1"][0]["status"] = feature_options.DEFAULT_VPC_STEP_DONE
+
+    assert (
+        feature_options.get_default_vpc_deletion_checkpoint(session, ACCOUNT_ID) is None
+    )
+    feature_options.put_default_vpc_deletion_checkpoint(session, plan)
+
+    assert (
+        feature_options.get_default_vpc_deletion_checkpoint(session, ACCOUNT_ID) == plan
+    )
+
+
+def test_checkpoint_is_skipped_for_accounts_without_metadata(metadata_table):
+    session, table = metadata_table
+    plan = _plan(FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)]), ["us-east-1"])
+    plan["account_id"] = "222222222222"
+
+    feature_options.put_default_vpc_deletion_checkpoint(session, plan)
+
+    assert list(table.items) == [ACCOUNT_ID]
+    assert (
+        feature_options.get_default_vpc_deletion_checkpoint(session, "222222222222")
+        is None
+    )
+
+
+def test_dry_run_returns_the_plan_without_deleting(monkeypatch):
+    target_session = FakeSession([FakeEC2("us-east-1", DEFAULT_VPC)])
+    checkpoints = []
+    monkeypatch.setenv(aft_delete_default_vpc.DRY_RUN_ENV_VAR, "true")
+    monkeypatch.setattr(
+        aft_delete_default_vpc.boto3.session, "Session", lambda: object()
+    )
+    monkeypatch.setattr(
+        aft_delete_default_vpc.aft_common.ssm,
+        "get_ssm_parameter_value",
+        lambda session, param: "true",
+    )
+    monkeypatch.setattr(
+        aft_delete_default_vpc,
+        "AuthClient",
+        lambda: SimpleNamespace(
+            get_target_account_session=lambda account_id, role_name: target_session
+        ),
+    )
+    monkeypatch.setattr(
+        aft_delete_default_vpc,
+        "get_default_vpc_deletion_checkpoint",
+        lambda session, account_id: None,
+    )
+    monkeypatch.setattr(
+        aft_delete_default_vpc,
+        "get_aws_regions",
+        lambda client: [client.meta.region_name],
+    )
+    monkeypatch.setattr(
+        aft_delete_default_vpc,
+        "put_default_vpc_deletion_checkpoint",
+        lambda session, plan: checkpoints.append(plan),
+    )
+    plan = aft_delete_default_vpc.lambda_handler(
+        {
+            "customization_request_id": REQUEST_ID,
+            "account_info": {"account": {"id": ACCOUNT_ID}},
+        },
+        None,
+    )
+
+    assert len(plan["regions"]["us-east-1"]) == 7
+    assert _mutations(target_session) == []
+    assert checkpoints == []
+
+
+class FakeSSM:
+    """SSM parameters held in a dict, raising ParameterNotFound like the API"""
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+
+    def client(self, service_name, **kwargs):
+        assert service_name == "ssm"
+        return self
+
+    def get_parameter(self, Name, WithDecryption=False):
+        if Name not in self.parameters:
+            raise ClientError(
+                {"Error": {"Code": "ParameterNotFound", "Message": Name}},
+                "GetParameter",
+            )
+        return {"Parameter": {"Value": self.parameters[Name]}}
+
+    def put_parameter(self, Name, Value, **kwargs):
+        self.parameters[Name] = Value
+
+
+class FakeCloudTrail:
+    """The org trail as CloudTrail reports it; None when it does not exist"""
+
+    class TrailNotFoundException(Exception):
+        pass
+
+    exceptions = SimpleNamespace(TrailNotFoundException=TrailNotFoundException)
+
+    def __init__(self, selectors=None, is_logging=True, exists=True):
+        self.trail = (
+            {"selectors": selectors, "is_logging": is_logging} if exists else None
+        )
+        self.calls = []
+
+    def client(self, service_name, **kwargs):
+        assert service_name == "cloudtrail"
+        return self
+
+    def get_trail(self, Name):
+        if self.trail is None:
+            raise FakeCloudTrail.TrailNotFoundException(Name)
+        return {"Trail": {"Name": Name}}
+
+    def get_event_selectors(self, TrailName):
+        selectors = self.trail["selectors"]
+        return {} if selectors is None else {"AdvancedEventSelectors": selectors}
+
+    def get_trail_status(self, Name):
+        return {"IsLogging": self.trail["is_logging"]}
+
+    def create_trail(self, Name, **kwargs):
+        self.calls.append("create_trail")
+        self.trail = {"selectors": None, "is_logging": False}
+
+    def put_event_selectors(self, TrailName, AdvancedEventSelectors):
+        self.calls.append("put_event_selectors")
+        self.trail["selectors"] = AdvancedEventSelectors
+
+    def start_logging(self, Name):
+        self.calls.append("start_logging")
+        self.trail["is_logging"] = True
+
+
+LOG_BUCKET_ARNS = ["arn:aws:s3:::aft-logs/*", "arn:aws:s3:::aft-access-logs/*"]
+
+
+@pytest.fixture
+def log_buckets(monkeypatch):
+    log_buckets = list(LOG_BUCKET_ARNS)
+    monkeypatch.setattr(
+        feature_options, "get_log_bucket_arns", lambda session: list(log_buckets)
+    )
+    return log_buckets
+
+
+def _reconcile(cloudtrail):
+    return feature_options.reconcile_org_trail(
+        ct_management_session=cloudtrail,
+        log_archive_session=None,
+        s3_bucket_name="aft-logs",
+        kms_key_arn="arn:aws:kms:us-east-1:222222222222:key/1",
+    )
+
+
+def test_converged_trail_is_left_alone(log_buckets):
+    selectors = feature_options.build_event_selectors(LOG_BUCKET_ARNS[::-1])
+    # Ordering carries no meaning, so reordered selectors are not drift
+    cloudtrail = FakeCloudTrail(selectors=selectors[::-1])
+
+    assert _reconcile(cloudtrail) == []
+    assert cloudtrail.calls == []
+
+
+@pytest.mark.parametrize(
+    "cloudtrail, expected_actions",
+    [
+        (
+            FakeCloudTrail(exists=False),
+            ["create_trail", "put_event_selectors", "start_logging"],
+        ),
+        (
+            FakeCloudTrail(
+                selectors=feature_options.build_event_selectors(LOG_BUCKET_ARNS),
+                is_logging=False,
+            ),
+            ["start_logging"],
+        ),
+        (
+            FakeCloudTrail(
+                selectors=feature_options.build_event_selectors(LOG_BUCKET_ARNS[:1])
+            ),
+            ["put_event_selectors"],
+        ),
+    ],
+    ids=["missing", "stopped", "new_log_bucket"],
+)
+def test_drifted_trail_is_reconciled(log_buckets, cloudtrail, expected_actions):
+    assert _reconcile(cloudtrail) == expected_actions
+    assert cloudtrail.calls == expected_actions
+    # Converged now, so a second pass changes nothing
+    assert _reconcile(cloudtrail) == []
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_700_000_000.0)
+    monkeypatch.setattr(feature_options.time, "time", lambda: clock.now)
+    return clock
+
+
+def test_converged_marker_holds_until_its_ttl(clock):
+    ssm = FakeSSM({})
+    assert not feature_options.cloudtrail_is_converged(ssm, "hash-1")
+
+    feature_options.record_cloudtrail_converged(ssm, "hash-1", ttl_seconds=3600)
+    clock.now += 3599
+    assert feature_options.cloudtrail_is_converged(ssm, "hash-1")
+    # A different bucket or key changes the desired hash
+    assert not feature_options.cloudtrail_is_converged(ssm, "hash-2")
+
+    clock.now += 1
+    assert not feature_options.cloudtrail_is_converged(ssm, "hash-1")
+
+
+def test_malformed_marker_is_not_converged():
+    ssm = FakeSSM({feature_options.SSM_PARAM_CLOUDTRAIL_CONVERGED_MARKER: "{"})
+    assert not feature_options.cloudtrail_is_converged(ssm, "hash-1")
+
+
+def test_cloudtrail_handler_skips_reconcile_within_the_marker_ttl(monkeypatch, clock):
+    ssm = FakeSSM(
+        {
+            aft_enable_cloudtrail.utils.SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED: "true",
+            "/aft/account/log-archive/log_bucket_arn": "arn:aws:s3:::aft-logs",
+            "/aft/account/log-archive/kms_key_arn": "arn:aws:kms:us-east-1:222222222222:key/1",
+        }
+    )
+    reconciled = []
+    monkeypatch.setattr(aft_enable_cloudtrail, "Session", lambda: ssm)
+    monkeypatch.setattr(
+        aft_enable_cloudtrail,
+        "AuthClient",
+        lambda: SimpleNamespace(
+            get_ct_management_session=lambda role_name: None,
+            get_log_archive_session=lambda role_name: None,
+        ),
+    )
+    monkeypatch.setattr(
+        aft_enable_cloudtrail,
+        "reconcile_org_trail",
+        lambda **kwargs: reconciled.append(kwargs["s3_bucket_name"]),
+    )
+    event = {
+        "customization_request_id": REQUEST_ID,
+        "account_info": {"account": {"id": ACCOUNT_ID}},
+    }
+
+    aft_enable_cloudtrail.lambda_handler(event, None)
+    clock.now += feature_options.CLOUDTRAIL_CONVERGED_MARKER_TTL_SECONDS - 1
+    aft_enable_cloudtrail.lambda_handler(event, None)
+    assert reconciled == ["aft-logs"]
+
+    clock.now += 1
+    aft_enable_cloudtrail.lambda_handler(event, None)
+    assert reconciled == ["aft-logs", "aft-logs"]
@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import io
+import json
+import logging
+
+import pytest
+from aft_common import logger as aft_logger
+
+
+@pytest.fixture
+def emitted():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(aft_logger._AFTFormatter("%(message)s"))
+    log = logging.getLogger("aft.test_logger")
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+
+    def lines():
+        return stream.getvalue().splitlines()
+
+    yield log, lines
+    log.removeHandler(handler)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        '{"account_id": "111111111111", "status": "SUCCEEDED"}',
+        '["111111111111", "222222222222"]',
+        ' {"indented": true}',
+    ],
+)
+def test_json_strings_pass_through_unchanged(emitted, message):
+    log, lines = emitted
+    log.info(message)
+    assert lines() == [message]
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Request Validated",
+        "found 3 accounts",
+        '{"truncated": ',
+        "Invalid 'payload'",
+        # Bare JSON scalars are not trial-parsed
+        "123",
+        "true",
+        "null",
+        '"already quoted"',
+    ],
+)
+def test_plain_strings_are_encoded(emitted, message):
+    log, lines = emitted
+    log.info(message)
+    assert json.loads(lines()[0]) == message
+
+
+def test_args_are_substituted_before_encoding(emitted):
+    log, lines = emitted
+    log.info("Schema Loaded:%s", {"key": 'value with "quotes"'})
+    log.info("%s", json.dumps({"id": "111111111111"}))
+    assert json.loads(lines()[0]) == "Schema Loaded:{'key': 'value with \"quotes\"'}"
+    assert json.loads(lines()[1]) == {"id": "111111111111"}
+
+
+def test_dicts_and_lists_are_encoded(emitted):
+    log, lines = emitted
+    log.info({"account_id": "111111111111", "regions": ["us-east-1"]})
+    log.info(["111111111111"])
+    assert [json.loads(line) for line in lines()] == [
+        {"account_id": "111111111111", "regions": ["us-east-1"]},
+        ["111111111111"],
+    ]
+
+
+def test_records_are_encoded_once(emitted):
+    log, lines = emitted
+    handler = log.handlers[0]
+    record = log.makeRecord(log.name, logging.INFO, __file__, 0, "plain", None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert lines() == ['"plain"', '"plain"']
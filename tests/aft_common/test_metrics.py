@@ -0,0 +1,152 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import json
+import threading
+import time
+
+import aft_common.constants
+import pytest
+from aft_common import metrics
+from botocore.credentials import Credentials
+
+SSM_VALUES = {
+    aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING: "true",
+    aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING_UUID: "uuid-1234",
+    aft_common.constants.SSM_PARAM_FEATURE_CLOUDTRAIL_DATA_EVENTS_ENABLED: "false",
+    aft_common.constants.SSM_PARAM_FEATURE_ENTERPRISE_SUPPORT_ENABLED: "false",
+    aft_common.constants.SSM_PARAM_FEATURE_DEFAULT_VPCS_ENABLED: "true",
+    aft_common.constants.SSM_PARAM_ACCOUNT_AFT_VERSION: "1.12.0",
+    aft_common.constants.SSM_PARAM_ACCOUNT_TERRAFORM_VERSION: "1.6.0",
+}
+
+
+class FakeSSMClient:
+    def __init__(self, values):
+        self.values = values
+        self.calls = 0
+
+    def get_parameters(self, Names):
+        self.calls += 1
+        return {
+            "Parameters": [
+                {"Name": name, "Value": self.values[name]}
+                for name in Names
+                if name in self.values
+            ],
+            "InvalidParameters": [name for name in Names if name not in self.values],
+        }
+
+
+class CallerSession:
+    """Stands in for the Lambda's session; must never be used off-thread"""
+
+    region_name = "us-east-1"
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+
+    def get_credentials(self):
+        assert threading.get_ident() == self.owner
+        return Credentials("AKIAEXAMPLE", "secret", "token")
+
+    def client(self, *args, **kwargs):
+        raise AssertionError("caller session used by the publisher thread")
+
+
+class FakeAuth:
+    def __init__(self, session):
+        self.session = session
+
+    def get_aft_management_session(self):
+        return self.session
+
+
+@pytest.fixture
+def publisher_sessions(monkeypatch, http_stub):
+    """
+    Points the publisher at the local stub and records every boto3 session
+    it builds for itself
+    """
+    built = []
+    ssm = FakeSSMClient(dict(SSM_VALUES))
+
+    class PublisherSession:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.region_name = kwargs.get("region_name")
+            self.thread = threading.get_ident()
+            built.append(self)
+
+        def client(self, service_name):
+            assert service_name == "ssm"
+            return ssm
+
+    monkeypatch.setattr(metrics, "METRICS_API_ENDPOINT", http_stub.url + "/generic")
+    monkeypatch.setattr(metrics, "_DEPLOYMENT_CONTEXT", None)
+    monkeypatch.setattr(metrics, "Session", PublisherSession)
+    return built, ssm
+
+
+def test_post_event_publishes_to_endpoint(http_stub, publisher_sessions):
+    built, ssm = publisher_sessions
+    aft_metrics = metrics.AFTMetrics(auth=FakeAuth(CallerSession()))
+
+    aft_metrics.post_event(action="account-request", status="SUCCEEDED")
+    aft_metrics.post_event(action="account-request", status="FAILED")
+
+    assert metrics.AFTMetrics.flush(timeout_seconds=5)
+    assert [r[:2] for r in http_stub.requests] == [("POST", "/generic")] * 2
+    payload = json.loads(http_stub.requests[0][2])
+    assert payload["Solution"] == metrics.AFTMetrics.SOLUTION_ID
+    assert payload["UUID"] == "uuid-1234"
+    assert payload["Version"] == "1.12.0"
+    assert payload["Data"]["event"] == {
+        "action": "account-request",
+        "status": "SUCCEEDED",
+    }
+    assert payload["Data"]["config"]["region"] == "us-east-1"
+    assert payload["Data"]["error"] is None
+
+    # The deployment context is read once, on a session the publisher owns
+    assert ssm.calls == 1
+    assert len(built) == 1
+    assert built[0].thread != threading.get_ident()
+    assert built[0].kwargs == {
+        "aws_access_key_id": "AKIAEXAMPLE",
+        "aws_secret_access_key": "secret",
+        "aws_session_token": "token",
+        "region_name": "us-east-1",
+    }
+
+
+def test_reporting_disabled_sends_nothing(http_stub, publisher_sessions):
+    _, ssm = publisher_sessions
+    ssm.values[aft_common.constants.SSM_PARAM_AFT_METRICS_REPORTING] = "false"
+    aft_metrics = metrics.AFTMetrics(auth=FakeAuth(CallerSession()))
+
+    aft_metrics.post_event(action="account-request", status="SUCCEEDED")
+
+    assert metrics.AFTMetrics.flush(timeout_seconds=5)
+    assert http_stub.requests == []
+
+
+def test_endpoint_failures_do_not_block_the_caller(http_stub, publisher_sessions):
+    release = threading.Event()
+
+    def slow_failure(method, path, body):
+        release.wait(5)
+        return 500, {"message": "unavailable"}, None
+
+    http_stub.route = slow_failure
+    aft_metrics = metrics.AFTMetrics(auth=FakeAuth(CallerSession()))
+
+    start = time.monotonic()
+    aft_metrics.post_event(action="account-request", status="SUCCEEDED")
+    assert time.monotonic() - start < 0.5
+
+    # A stuck endpoint only costs the bounded flush wait
+    assert not metrics.AFTMetrics.flush(timeout_seconds=0.2)
+    release.set()
+    assert metrics.AFTMetrics.flush(timeout_seconds=5)
+    assert len(http_stub.requests) == 1
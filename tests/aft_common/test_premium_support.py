@@ -0,0 +1,170 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+from types import SimpleNamespace
+
+import pytest
+from aft_common import premium_support
+
+from src.aft_lambda.aft_feature_options import aft_enroll_support
+
+
+class FakeSupport:
+    """Support client with a fixed set of existing cases, recording new ones"""
+
+    def __init__(self, existing_cases=()):
+        self.existing_cases = list(existing_cases)
+        self.created = []
+        self.describe_params = []
+
+    def get_paginator(self, operation_name):
+        assert operation_name == "describe_cases"
+        return SimpleNamespace(paginate=self._describe_cases)
+
+    def _describe_cases(self, **params):
+        self.describe_params.append(params)
+        yield {"cases": self.existing_cases}
+
+    def create_case(self, subject, communicationBody, **kwargs):
+        case_id = f"case-{len(self.created) + 1}"
+        self.created.append((case_id, subject, communicationBody))
+        return {"caseId": case_id}
+
+
+@pytest.fixture
+def enrollment(monkeypatch):
+    state = SimpleNamespace(support=FakeSupport(), ledger={}, written=[])
+    monkeypatch.setattr(
+        premium_support, "_get_support_client", lambda session: state.support
+    )
+    monkeypatch.setattr(
+        premium_support,
+        "get_ssm_parameter_value",
+        lambda session, param: "aft-support-enrollment",
+    )
+    monkeypatch.setattr(
+        premium_support,
+        "get_enrollment_ledger_case_ids",
+        lambda session, account_ids: {
+            account_id: state.ledger[account_id]
+            for account_id in account_ids
+            if account_id in state.ledger
+        },
+    )
+    monkeypatch.setattr(
+        premium_support,
+        "batch_put_ddb_items",
+        lambda session, table_name, items: state.written.extend(items),
+    )
+    return state
+
+
+def _account_ids(count, first=100000000000):
+    return [str(first + index) for index in range(count)]
+
+
+def _enroll(account_ids, case_count=1, after_time=None):
+    return premium_support.enroll_accounts_in_batches(
+        ct_management_session=None,
+        aft_management_session=None,
+        account_ids=account_ids,
+        case_count=case_count,
+        after_time=after_time,
+    )
+
+
+@pytest.mark.parametrize(
+    "account_count, case_count, expected_sizes",
+    [
+        (500, 1, [500]),
+        (501, 1, [251, 250]),
+        (1200, 1, [400, 400, 400]),
+        (1200, 4, [300, 300, 300, 300]),
+    ],
+)
+def test_cases_hold_at_most_500_accounts(
+    enrollment, account_count, case_count, expected_sizes
+):
+    account_ids = _account_ids(account_count)
+
+    result = _enroll(account_ids, case_count=case_count)
+
+    assert [len(accounts) for accounts in result["cases"].values()] == expected_sizes
+    assert [a for accounts in result["cases"].values() for a in accounts] == account_ids
+    for case_id, subject, body in enrollment.support.created:
+        assert body.splitlines()[1:] == result["cases"][case_id]
+    assert len(enrollment.written) == account_count
+
+
+def test_already_enrolled_accounts_are_skipped(enrollment):
+    account_ids = _account_ids(5)
+    enrollment.ledger = {account_ids[0]: "case-ledger"}
+    # Raised before the ledger existed; found by subject and backfilled
+    enrollment.support.existing_cases = [
+        {
+            "subject": premium_support.get_enrollment_case_subject(account_ids[1]),
+            "caseId": "case-old",
+        }
+    ]
+
+    result = _enroll(account_ids + [account_ids[2]])
+
+    assert result["already_enrolled"] == account_ids[:2]
+    assert list(result["cases"].values()) == [account_ids[2:]]
+    assert enrollment.written[0]["id"] == account_ids[1]
+    assert enrollment.written[0]["case_id"] == "case-old"
+
+
+def test_fully_enrolled_batch_raises_no_case(enrollment):
+    account_ids = _account_ids(3)
+    enrollment.ledger = {account_id: "case-ledger" for account_id in account_ids}
+
+    result = _enroll(account_ids)
+
+    assert result["already_enrolled"] == account_ids
+    assert result["cases"] == {}
+    # Everything was in the ledger, so support cases are not even scanned
+    assert enrollment.support.describe_params == []
+    assert enrollment.support.created == []
+
+
+def test_case_scan_is_bounded_by_after_time(enrollment):
+    premium_support.get_enrollment_case_index(None, after_time="2024-01-01T00:00:00")
+    premium_support.get_enrollment_case_index(None)
+
+    bounded, unbounded = enrollment.support.describe_params
+    assert bounded["afterTime"] == "2024-01-01T00:00:00"
+    assert "afterTime" not in unbounded
+
+
+@pytest.mark.parametrize(
+    "joined_date, expected",
+    [
+        ("2024-01-01T10:00:00+00:00", "2024-01-01T10:00:00+00:00"),
+        (None, None),
+        ("not a date", None),
+    ],
+)
+def test_case_after_time_comes_from_the_joined_date(joined_date, expected):
+    assert premium_support.get_case_after_time(joined_date) == expected
+
+
+def test_batch_handler_reports_invalid_account_ids(monkeypatch, enrollment):
+    monkeypatch.setattr(aft_enroll_support, "Session", lambda: object())
+    monkeypatch.setattr(
+        aft_enroll_support,
+        "AuthClient",
+        lambda: SimpleNamespace(get_ct_management_session=lambda role_name: None),
+    )
+    monkeypatch.setattr(
+        aft_enroll_support.aft_common.ssm,
+        "get_ssm_parameter_value",
+        lambda session, param: "true",
+    )
+
+    result = aft_enroll_support.lambda_handler(
+        {"account_ids": ["111111111111", "1111", "not-an-id", 222222222222]}, None
+    )
+
+    assert result["invalid_account_ids"] == ["1111", "not-an-id", "222222222222"]
+    assert list(result["cases"].values()) == [["111111111111"]]
@@ -0,0 +1,67 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import pytest
+from aft_common import role_reconciler
+from aft_common.account_provisioning_framework import ProvisionRoles
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+
+class FakeSession:
+    def client(self, *args, **kwargs):
+        return object()
+
+
+@pytest.fixture
+def reconciler(monkeypatch):
+    # Skip __init__: it reads SSM and builds the trust policy through AuthClient
+    reconciler = role_reconciler.AftRoleReconciler.__new__(
+        role_reconciler.AftRoleReconciler
+    )
+    reconciler.max_workers = 4
+    reconciler.dry_run = True
+    reconciler.trust_policy = "{}"
+    reconciler.policy_arn = "arn:aws:iam::aws:policy/AdministratorAccess"
+    reconciler.role_names = [
+        ProvisionRoles.SERVICE_ROLE_NAME,
+        ProvisionRoles.EXECUTION_ROLE_NAME,
+    ]
+    monkeypatch.setattr(
+        ProvisionRoles, "get_role_changes", staticmethod(lambda **kwargs: [])
+    )
+    return reconciler
+
+
+def test_per_account_failures_are_reported(monkeypatch, reconciler):
+    failures = {
+        "111111111111": EndpointConnectionError(
+            endpoint_url="https://sts.amazonaws.com"
+        ),
+        "222222222222": ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "denied"}}, "AssumeRole"
+        ),
+        "333333333333": ValueError("unexpected"),
+    }
+
+    def get_target_account_session(account_id):
+        if account_id in failures:
+            raise failures[account_id]
+        return FakeSession()
+
+    monkeypatch.setattr(
+        reconciler, "_get_target_account_session", get_target_account_session
+    )
+
+    report = reconciler.reconcile(
+        account_ids=[*failures, "444444444444", "555555555555"]
+    )
+
+    assert report["account_count"] == 5
+    assert report["status_counts"] == {
+        role_reconciler.RECONCILE_STATUS_FAILED: 3,
+        role_reconciler.RECONCILE_STATUS_IN_SYNC: 2,
+    }
+    assert {r["account_id"]: r["error"] for r in report["failed"]} == {
+        account_id: str(error) for account_id, error in failures.items()
+    }
+    assert report["skipped_account_ids"] == []
@@ -0,0 +1,243 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""
+Wall-clock benchmark of AFT role deployment against a stubbed IAM API with a
+fixed per-call latency.
+
+Compares deploy_aws_aft_roles, which deploys both roles concurrently over
+one target session, with deploying them one after another and assuming a
+fresh target session per role as the previous implementation did. Readiness
+probing is identical in both and is left out.
+
+    python tests/benchmarks/bench_aft_roles.py --latency-ms 100
+"""
+import argparse
+import collections
+import copy
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "../../sources/aft-lambda-layer"
+    ),
+)
+
+from aft_common.account_provisioning_framework import ProvisionRoles  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+ROLE_NAMES = [ProvisionRoles.SERVICE_ROLE_NAME, ProvisionRoles.EXECUTION_ROLE_NAME]
+POLICY_ARN = "arn:aws:iam::aws:policy/AdministratorAccess"
+# AssumeRole into CT management, GetCallerIdentity, AssumeRole into the target
+STS_CALLS_PER_SESSION = 3
+
+
+class StubIAM:
+    """
+    Thread-safe in-memory IAM covering the calls made by get_role_changes
+    and apply_role_changes. Every call sleeps for latency seconds
+    """
+
+    def __init__(self, latency, roles):
+        self.latency = latency
+        self.roles = copy.deepcopy(roles)
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+
+    def _call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+        time.sleep(self.latency)
+
+    def get_role(self, RoleName):
+        self._call("GetRole")
+        with self.lock:
+            if RoleName not in self.roles:
+                raise ClientError(
+                    {"Error": {"Code": "NoSuchEntity", "Message": RoleName}}, "GetRole"
+                )
+            return {
+                "Role": {
+                    "RoleName": RoleName,
+                    "AssumeRolePolicyDocument": json.loads(
+                        self.roles[RoleName]["trust_policy"]
+                    ),
+                }
+            }
+
+    def get_paginator(self, operation_name):
+        assert operation_name == "list_attached_role_policies"
+        return SimpleNamespace(paginate=self._list_attached_role_policies)
+
+    def _list_attached_role_policies(self, RoleName):
+        self._call("ListAttachedRolePolicies")
+        with self.lock:
+            arns = list(self.roles[RoleName]["policy_arns"])
+        yield {"AttachedPolicies": [{"PolicyArn": arn} for arn in arns]}
+
+    def get_waiter(self, waiter_name):
+        assert waiter_name == "role_exists"
+        return SimpleNamespace(
+            wait=lambda RoleName, WaiterConfig: self.get_role(RoleName=RoleName)
+        )
+
+    def create_role(self, RoleName, AssumeRolePolicyDocument, **kwargs):
+        self._call("CreateRole")
+        with self.lock:
+            self.roles[RoleName] = {
+                "trust_policy": AssumeRolePolicyDocument,
+                "policy_arns": [],
+            }
+
+    def update_assume_role_policy(self, RoleName, PolicyDocument):
+        self._call("UpdateAssumeRolePolicy")
+        with self.lock:
+            self.roles[RoleName]["trust_policy"] = PolicyDocument
+
+    def attach_role_policy(self, RoleName, PolicyArn):
+        self._call("AttachRolePolicy")
+        with self.lock:
+            self.roles[RoleName]["policy_arns"].append(PolicyArn)
+
+
+class StubSTS:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def build_target_session(self, iam):
+        for _ in range(STS_CALLS_PER_SESSION):
+            self.calls += 1
+            time.sleep(self.latency)
+        return SimpleNamespace(client=lambda service_name: iam)
+
+
+def build_provisioning(iam, sts):
+    # Skip __init__: it assumes into CT management to resolve the partition
+    provisioning = ProvisionRoles.__new__(ProvisionRoles)
+    provisioning.auth = SimpleNamespace(aft_management_account_id="000000000000")
+    provisioning.target_account_id = "111111111111"
+    provisioning.partition = "aws"
+    provisioning.ADMINISTRATOR_ACCESS_MANAGED_POLICY_ARN = POLICY_ARN
+    provisioning._get_target_account_session = lambda: sts.build_target_session(iam)
+    provisioning._wait_for_roles_to_be_usable = lambda role_names, timeout_seconds: {
+        role_name: time.monotonic() for role_name in role_names
+    }
+    return provisioning
+
+
+def deploy_sequentially(provisioning, iam, sts):
+    trust_policy = provisioning.generate_aft_trust_policy()
+    for role_name in ROLE_NAMES:
+        client = sts.build_target_session(iam).client("iam")
+        changes = ProvisionRoles.get_role_changes(
+            client=client,
+            role_name=role_name,
+            trust_policy=trust_policy,
+            policy_arn=POLICY_ARN,
+        )
+        ProvisionRoles.apply_role_changes(
+            client=client,
+            role_name=role_name,
+            trust_policy=trust_policy,
+            policy_arn=POLICY_ARN,
+            changes=changes,
+        )
+
+
+def deploy_concurrently(provisioning, iam, sts):
+    provisioning.deploy_aws_aft_roles()
+
+
+def build_scenarios():
+    trust_policy = build_provisioning(None, None).generate_aft_trust_policy()
+    stale_trust_policy = json.dumps(
+        {"Version": "2012-10-17", "Statement": [{"Effect": "Deny"}]}
+    )
+    return {
+        "create": {},
+        "update": {
+            role_name: {"trust_policy": stale_trust_policy, "policy_arns": []}
+            for role_name in ROLE_NAMES
+        },
+        "in_sync": {
+            role_name: {"trust_policy": trust_policy, "policy_arns": [POLICY_ARN]}
+            for role_name in ROLE_NAMES
+        },
+    }
+
+
+def run(latency, repeat):
+    rows = []
+    for scenario, roles in build_scenarios().items():
+        timings = {}
+        for name, deploy in (
+            ("sequential", deploy_sequentially),
+            ("concurrent", deploy_concurrently),
+        ):
+            samples = []
+            for _ in range(repeat):
+                iam = StubIAM(latency=latency, roles=roles)
+                sts = StubSTS(latency=latency)
+                provisioning = build_provisioning(iam, sts)
+                start = time.monotonic()
+                deploy(provisioning, iam, sts)
+                samples.append(time.monotonic() - start)
+                assert all(
+                    POLICY_ARN in iam.roles[role_name]["policy_arns"]
+                    for role_name in ROLE_NAMES
+                )
+            timings[name] = (
+                statistics.median(samples),
+                sum(iam.calls.values()),
+                sts.calls,
+            )
+        rows.append((scenario, timings))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--latency-ms", type=float, default=100, help="Latency of each API call"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per scenario, median reported"
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:<10} {:>14} {:>14} {:>8} {:>12} {:>12}".format(
+            "scenario",
+            "sequential s",
+            "concurrent s",
+            "speedup",
+            "IAM calls",
+            "STS calls",
+        )
+    )
+    for scenario, timings in run(args.latency_ms / 1000, args.repeat):
+        sequential, concurrent = timings["sequential"], timings["concurrent"]
+        print(
+            "{:<10} {:>14.3f} {:>14.3f} {:>7.2f}x {:>5} / {:<5} {:>5} / {:<5}".format(
+                scenario,
+                sequential[0],
+                concurrent[0],
+                sequential[0] / concurrent[0],
+                sequential[1],
+                concurrent[1],
+                sequential[2],
+                concurrent[2],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
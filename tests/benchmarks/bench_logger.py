@@ -0,0 +1,126 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+"""
+Per-record cost of aft_common logging with eager and deferred payload formatting.
+
+Eager formatting renders the payload at the call site, as in
+logger.debug("Response: %s", sanitize_input_for_logging(response)); deferred
+formatting passes LazyLogPayload(response) and only renders it if the record
+is emitted. Each is timed with the record's level disabled and enabled, and
+enabled records are timed with both JSON encoders when orjson is installed.
+
+    python tests/benchmarks/bench_logger.py --accounts 500
+"""
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "../../sources/aft-lambda-layer"
+    ),
+)
+
+from aft_common import logger as aft_logger  # noqa: E402
+from aft_common.aft_utils import sanitize_input_for_logging  # noqa: E402
+
+
+def build_payload(accounts):
+    # Shaped like an organizations:ListAccounts page
+    return {
+        "Accounts": [
+            {
+                "Id": f"{index:012d}",
+                "Arn": f"arn:aws:organizations::000000000000:account/o-example/{index:012d}",
+                "Email": f"account-{index}@example.com",
+                "Name": f"Account {index}",
+                "Status": "ACTIVE",
+            }
+            for index in range(accounts)
+        ]
+    }
+
+
+def build_logger(stream):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(aft_logger._AFTFormatter("%(message)s"))
+    log = logging.getLogger("aft.bench_logger")
+    log.handlers = [handler]
+    log.propagate = False
+    return log
+
+
+def eager(log, level, payload):
+    log.log(level, "Response: %s", sanitize_input_for_logging(payload))
+
+
+def deferred(log, level, payload):
+    log.log(level, "Response: %s", aft_logger.LazyLogPayload(payload))
+
+
+def per_record_us(function, log, level, payload, number, repeat):
+    samples = timeit.repeat(
+        lambda: function(log, level, payload), number=number, repeat=repeat
+    )
+    return min(samples) / number * 1e6
+
+
+def run(accounts, number, repeat):
+    payload = build_payload(accounts)
+    encoders = ["json"] + (["orjson"] if aft_logger.orjson is not None else [])
+    rows = []
+    with open(os.devnull, "w") as stream:
+        log = build_logger(stream)
+        log.setLevel(logging.INFO)
+        for level_name, level in (
+            ("disabled", logging.DEBUG),
+            ("enabled", logging.INFO),
+        ):
+            for encoder in encoders if level_name == "enabled" else ["-"]:
+                if encoder != "-":
+                    os.environ["AFT_LOG_JSON_ENCODER"] = encoder
+                rows.append(
+                    (
+                        level_name,
+                        encoder,
+                        per_record_us(eager, log, level, payload, number, repeat),
+                        per_record_us(deferred, log, level, payload, number, repeat),
+                    )
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--accounts", type=int, default=100, help="Accounts in the logged payload"
+    )
+    parser.add_argument(
+        "--number", type=int, default=200, help="Records per timing sample"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timing samples, fastest reported"
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:<10} {:<8} {:>12} {:>12} {:>8}".format(
+            "level", "encoder", "eager us", "deferred us", "speedup"
+        )
+    )
+    for level_name, encoder, eager_us, deferred_us in run(
+        args.accounts, args.number, args.repeat
+    ):
+        print(
+            "{:<10} {:<8} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+                level_name, encoder, eager_us, deferred_us, eager_us / deferred_us
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
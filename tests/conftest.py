@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# aft_common is installed from the layer in CI; the CodeBuild scripts are not
+# packaged and are imported from their directory. Lambda handlers are
+# imported through the src package
+sys.path.insert(0, REPO_ROOT)
+for path in ("sources/aft-lambda-layer", "sources/scripts"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, path))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that records every request and delegates the response
+    to the test's route function: route(method, path, body) returning
+    (status, json body or None, headers)
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs
+    # add ~40ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.requests.append(
+            (self.command, self.path, body, self.client_address[1])
+        )
+        status, payload, headers = self.server.route(self.command, self.path, body)
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+
+@pytest.fixture
+def http_stub():
+    """
+    Local HTTP server on an ephemeral port. Tests set .route on the returned
+    server and read back .requests
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.route = lambda method, path, body: (200, {}, None)
+    server.url = "http://127.0.0.1:{}".format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
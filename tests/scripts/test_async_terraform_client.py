@@ -0,0 +1,120 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import asyncio
+import collections
+import contextlib
+import io
+import threading
+import time
+
+import async_terraform_client
+import pytest
+import terraform_client as terraform
+
+MAX_CONNECTIONS = 4
+
+
+class FakeRuns:
+    """
+    Fake TFE runs endpoint. Each run reports "planning" until it has been
+    polled applied_after times, then its final status. Tracks how many
+    requests are in flight at once
+    """
+
+    def __init__(self, applied_after=3, final_status=None, stuck=(), latency=0.005):
+        self.applied_after = applied_after
+        self.final_status = final_status or {}
+        self.stuck = set(stuck)
+        self.latency = latency
+        self.polls = collections.Counter()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, method, path, body):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            run_id = path.split("/")[2]
+            with self.lock:
+                self.polls[run_id] += 1
+                polls = self.polls[run_id]
+            if run_id in self.stuck or polls <= self.applied_after:
+                status = "planning"
+            else:
+                status = self.final_status.get(run_id, "applied")
+            return 200, {"data": {"attributes": {"status": status}}}, None
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(terraform, "POLL_BASE_DELAY_SECONDS", 0.02)
+    monkeypatch.setattr(terraform, "POLL_MAX_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(terraform, "METRICS", None)
+
+
+def _wait_for_all(http_stub, run_ids, target_states):
+    async def main():
+        async with async_terraform_client.AsyncTerraformClient(
+            http_stub.url, "token", max_connections=MAX_CONNECTIONS
+        ) as client:
+            # The client-side TFE rate limit would dominate the timing
+            client.client.min_interval = 0
+            results = await client.wait_for_all("runs", run_ids, target_states)
+            return results, len(client.executor._threads)
+
+    # Every status transition is printed; keep test output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(main())
+
+
+def test_many_waits_share_a_small_connection_pool(http_stub):
+    runs = FakeRuns(applied_after=3, latency=0.02)
+    http_stub.route = runs
+    run_ids = ["run-{}".format(i) for i in range(100)]
+
+    start = time.monotonic()
+    results, thread_count = _wait_for_all(http_stub, run_ids, ["applied"])
+    elapsed = time.monotonic() - start
+
+    assert results == {run_id: "applied" for run_id in run_ids}
+    assert all(runs.polls[run_id] == 4 for run_id in run_ids)
+    assert thread_count <= MAX_CONNECTIONS
+    assert runs.max_in_flight <= MAX_CONNECTIONS
+    assert len({port for _, _, _, port in http_stub.requests}) <= MAX_CONNECTIONS
+    # 400 polls at 20ms each take 8s back to back; the pool overlaps them
+    assert elapsed < 4
+
+
+def test_terminal_states_end_only_their_own_wait(http_stub):
+    http_stub.route = FakeRuns(
+        applied_after=1,
+        final_status={"run-errored": "errored", "run-discarded": "discarded"},
+    )
+    run_ids = ["run-errored", "run-1", "run-discarded", "run-2"]
+
+    results, _ = _wait_for_all(http_stub, run_ids, ["applied"])
+
+    assert results["run-1"] == results["run-2"] == "applied"
+    for run_id, status in (("run-errored", "errored"), ("run-discarded", "discarded")):
+        assert isinstance(results[run_id], terraform.TerminalStateError)
+        assert results[run_id].status == status
+
+
+def test_timeouts_end_only_their_own_wait(monkeypatch, http_stub):
+    monkeypatch.setenv("TF_WAIT_TIMEOUT_SECONDS", "0.5")
+    http_stub.route = FakeRuns(applied_after=1, stuck=["run-stuck"])
+
+    start = time.monotonic()
+    results, _ = _wait_for_all(http_stub, ["run-stuck", "run-1"], ["applied"])
+
+    assert results["run-1"] == "applied"
+    assert isinstance(results["run-stuck"], TimeoutError)
+    assert "last status planning" in str(results["run-stuck"])
+    assert time.monotonic() - start < 2
@@ -0,0 +1,149 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import io
+import time
+
+import pytest
+import terraform_client as terraform
+
+HEADERS = {
+    "Authorization": "Bearer token",
+    "Content-type": "application/vnd.api+json",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Without Retry-After, retries fall back to backoff; keep it instant
+    monkeypatch.setattr(terraform, "RETRY_BASE_DELAY_SECONDS", 0)
+    monkeypatch.setattr(terraform, "METRICS", None)
+    client = terraform.TerraformClient(max_retries=3, rate_limit=1000)
+    yield client
+    client.session.close()
+
+
+def _responses(*responses):
+    """Route that replays responses in order, repeating the last one"""
+    remaining = list(responses)
+
+    def route(method, path, body):
+        return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+    return route
+
+
+def test_429_waits_for_retry_after(http_stub, client):
+    http_stub.route = _responses(
+        (429, {"errors": []}, {"Retry-After": "0.5"}),
+        (200, {"data": {"attributes": {"status": "applied"}}}, None),
+    )
+
+    start = time.monotonic()
+    response = client.request("GET", http_stub.url + "/runs/run-1", HEADERS)
+
+    assert time.monotonic() - start >= 0.5
+    assert response["data"]["attributes"]["status"] == "applied"
+    assert len(http_stub.requests) == 2
+    # 429 is retried for every method, since the request was not processed
+    http_stub.requests.clear()
+    http_stub.route = _responses(
+        (429, {"errors": []}, {"Retry-After": "0"}),
+        (201, {"data": {"id": "run-2"}}, None),
+    )
+    response = client.request("POST", http_stub.url + "/runs", HEADERS, payload={})
+    assert response["data"]["id"] == "run-2"
+    assert len(http_stub.requests) == 2
+
+
+def test_5xx_is_retried_on_idempotent_methods(http_stub, client):
+    http_stub.route = _responses(
+        (503, {"errors": []}, None),
+        (502, None, None),
+        (200, {"data": {"attributes": {"status": "planned"}}}, None),
+    )
+
+    response = client.request("GET", http_stub.url + "/runs/run-1", HEADERS)
+
+    assert response["data"]["attributes"]["status"] == "planned"
+    assert len(http_stub.requests) == 3
+    # All attempts share one keep-alive connection
+    assert len({port for _, _, _, port in http_stub.requests}) == 1
+    assert terraform.get_metrics().summary()["total_calls"] == 3
+
+
+def test_5xx_retries_stop_at_max_retries(http_stub, client):
+    http_stub.route = _responses(
+        (503, {"errors": [{"status": "503", "title": "unavailable"}]}, None)
+    )
+
+    response = client.request("GET", http_stub.url + "/runs/run-1", HEADERS)
+
+    assert len(http_stub.requests) == client.max_retries + 1
+    with pytest.raises(terraform.ClientError) as error:
+        terraform.raise_for_errors(response)
+    assert error.value.status == "503"
+
+
+def test_5xx_is_not_retried_on_post(http_stub, client):
+    http_stub.route = _responses(
+        (500, {"errors": [{"status": "500", "title": "boom"}]}, None),
+        (201, {"data": {"id": "run-1"}}, None),
+    )
+
+    response = client.request(
+        "POST", http_stub.url + "/runs", HEADERS, payload={"data": {}}
+    )
+
+    assert len(http_stub.requests) == 1
+    with pytest.raises(terraform.ClientError) as error:
+        terraform.raise_for_errors(response)
+    assert error.value.status == "500"
+
+
+def test_streamed_body_is_rewound_on_retry(http_stub, client):
+    content = b"configuration archive " * 1024
+    http_stub.route = _responses(
+        (503, None, None),
+        (500, None, None),
+        (200, None, None),
+    )
+
+    response = client.request(
+        "PUT",
+        http_stub.url + "/_archivist/upload",
+        {"Content-Type": "application/octet-stream"},
+        data=io.BytesIO(content),
+    )
+
+    assert response is None
+    assert [method for method, _, _, _ in http_stub.requests] == ["PUT"] * 3
+    assert [body for _, _, body, _ in http_stub.requests] == [content] * 3
+
+
+def test_empty_error_response_raises(http_stub, client):
+    http_stub.route = _responses((200, None, None))
+    assert client.request("PUT", http_stub.url + "/_archivist/upload", {}) is None
+
+    # Last retry of a 5xx, and a non-retryable status, both without a body
+    for status in (503, 404):
+        http_stub.route = _responses((status, None, None))
+        with pytest.raises(terraform.ClientError) as error:
+            client.request("PUT", http_stub.url + "/_archivist/upload", {})
+        assert error.value.status == str(status)
+
+
+def test_directory_cache_persists_only_project_ids(tmp_path):
+    cache_path = str(tmp_path / "directory.json")
+    directory = terraform.OrganizationDirectory("https://tfe.example", cache_path)
+    directory.set_project_ids("org", {"default": "prj-1"})
+    directory.set_workspace_ids("org", {"ws-name": "ws-1"})
+    directory.set_workspace_id("org", "other", "ws-2")
+    assert directory.get_workspace_id("org", "ws-name") == "ws-1"
+
+    # A later batch run sees the projects but resolves workspaces itself,
+    # since another process may have deleted or recreated them
+    reloaded = terraform.OrganizationDirectory("https://tfe.example", cache_path)
+    assert reloaded.get_project_ids("org") == {"default": "prj-1"}
+    assert reloaded.get_workspace_id("org", "ws-name") is None
+    assert not reloaded.is_complete("org")
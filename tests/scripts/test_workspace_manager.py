@@ -0,0 +1,192 @@
+# Copyright Amazon.com, Inc. or its affiliates. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+import io
+import tarfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import terraform_client as terraform
+import workspace_manager
+
+BACKEND_TF = b"""## Updated on: {} ##
+terraform {{
+  backend "remote" {{}}
+}}
+"""
+
+
+def _tarball(tmp_path, name, files, mtime):
+    """Packs files (name -> content) into a gzipped tarball, as the buildspecs do"""
+    path = tmp_path / name
+    with tarfile.open(path, "w:gz") as archive:
+        for file_name, content in files.items():
+            info = tarfile.TarInfo(file_name)
+            info.size = len(content)
+            info.mtime = mtime
+            archive.addfile(info, io.BytesIO(content))
+    return path
+
+
+def _hash(path):
+    return workspace_manager.__hash_configuration(str(path))
+
+
+def test_repacked_configuration_hashes_the_same(tmp_path):
+    first = _tarball(
+        tmp_path,
+        "first.tar.gz",
+        {
+            "backend.tf": BACKEND_TF.replace(b"{}", b"2024-01-01 10:00:00", 1),
+            "main.tf": b'resource "null_resource" "a" {}\n',
+        },
+        mtime=1_700_000_000,
+    )
+    repacked = _tarball(
+        tmp_path,
+        "repacked.tar.gz",
+        {
+            "main.tf": b'resource "null_resource" "a" {}\n',
+            "backend.tf": BACKEND_TF.replace(b"{}", b"2024-06-30 23:59:59", 1),
+        },
+        mtime=1_710_000_000,
+    )
+
+    assert first.read_bytes() != repacked.read_bytes()
+    assert _hash(first) == _hash(repacked)
+
+
+def test_content_change_changes_the_hash(tmp_path):
+    files = {"main.tf": b'resource "null_resource" "a" {}\n'}
+    original = _tarball(tmp_path, "original.tar.gz", files, mtime=0)
+    changed = _tarball(
+        tmp_path,
+        "changed.tar.gz",
+        {"main.tf": b'resource "null_resource" "b" {}\n'},
+        mtime=0,
+    )
+    renamed = _tarball(
+        tmp_path, "renamed.tar.gz", {"other.tf": files["main.tf"]}, mtime=0
+    )
+
+    assert len({_hash(original), _hash(changed), _hash(renamed)}) == 3
+
+
+def _env_var(key, value, description=None):
+    return {
+        "attributes": {
+            "key": key,
+            "value": value,
+            "category": "env",
+            "description": description,
+        }
+    }
+
+
+CURRENT_VARS = [
+    _env_var(workspace_manager.CONFIGURATION_HASH_VAR, "abc123"),
+    _env_var(workspace_manager.CONFIGURATION_VERSION_VAR, "cv-1"),
+]
+
+
+@pytest.fixture
+def cv_status(monkeypatch):
+    """Stored configuration version status, and the entities it was read for"""
+    cv_status = SimpleNamespace(status="uploaded", queried=[])
+
+    def get_action_status(entity_type, entity_id, api_token):
+        cv_status.queried.append((entity_type, entity_id))
+        return cv_status.status
+
+    monkeypatch.setattr(terraform, "get_action_status", get_action_status)
+    return cv_status
+
+
+def _reusable(current_vars, content_hash):
+    return workspace_manager.__get_reusable_configuration_version(
+        current_vars, content_hash, "token"
+    )
+
+
+def test_uploaded_configuration_version_is_reused(cv_status):
+    assert _reusable(CURRENT_VARS, "abc123") == "cv-1"
+    assert cv_status.queried == [("configuration-versions", "cv-1")]
+
+
+@pytest.mark.parametrize("status", ["archived", "errored", "pending"])
+def test_configuration_version_not_uploaded_is_not_reused(cv_status, status):
+    cv_status.status = status
+    assert _reusable(CURRENT_VARS, "abc123") is None
+
+
+def test_changed_content_is_not_reused(cv_status):
+    assert _reusable(CURRENT_VARS, "def456") is None
+    assert _reusable(CURRENT_VARS[:1], "abc123") is None
+    assert cv_status.queried == []
+
+
+ROLE_ARN = "arn:aws:iam::111111111111:role/AWSAFTExecution"
+
+
+def _credential_vars(role_arn, expires_in, keys=None):
+    expiration = datetime.now(timezone.utc) + expires_in
+    description = workspace_manager.ACCESS_KEY_DESCRIPTION.format(
+        role_arn, expiration.isoformat()
+    )
+    # Secrets are write-only in the API and come back without a value
+    credential_vars = {
+        "AWS_ACCESS_KEY_ID": _env_var("AWS_ACCESS_KEY_ID", "AKIA", description),
+        "AWS_SECRET_ACCESS_KEY": _env_var("AWS_SECRET_ACCESS_KEY", None),
+        "AWS_SESSION_TOKEN": _env_var("AWS_SESSION_TOKEN", None),
+    }
+    return [credential_vars[key] for key in keys or credential_vars], expiration
+
+
+def _fresh_expiration(current_vars, role_arn=ROLE_ARN):
+    return workspace_manager.__get_fresh_credentials_expiration(current_vars, role_arn)
+
+
+def test_fresh_credentials_for_the_role_are_reused():
+    current_vars, expiration = _credential_vars(ROLE_ARN, timedelta(minutes=55))
+    assert _fresh_expiration(current_vars) == expiration
+
+
+@pytest.mark.parametrize(
+    "expires_in", [timedelta(minutes=-5), timedelta(minutes=39)], ids=str
+)
+def test_expired_or_expiring_credentials_are_refreshed(expires_in):
+    current_vars, _ = _credential_vars(ROLE_ARN, expires_in)
+    assert _fresh_expiration(current_vars) is None
+
+
+def test_minimum_remaining_lifetime_is_overridable(monkeypatch):
+    current_vars, expiration = _credential_vars(ROLE_ARN, timedelta(minutes=20))
+    monkeypatch.setenv("TF_CREDENTIALS_MIN_REMAINING_SECONDS", "600")
+    assert _fresh_expiration(current_vars) == expiration
+
+
+def test_credentials_for_another_role_are_refreshed():
+    current_vars, _ = _credential_vars(
+        "arn:aws:iam::222222222222:role/AWSAFTExecution", timedelta(minutes=55)
+    )
+    assert _fresh_expiration(current_vars) is None
+
+
+@pytest.mark.parametrize(
+    "keys",
+    [
+        ["AWS_ACCESS_KEY_ID", "AWS_SESSION_TOKEN"],
+        ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"],
+        ["AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"],
+    ],
+)
+def test_incomplete_credentials_are_refreshed(keys):
+    current_vars, _ = _credential_vars(ROLE_ARN, timedelta(minutes=55), keys=keys)
+    assert _fresh_expiration(current_vars) is None
+
+
+def test_unrecognized_access_key_description_is_refreshed():
+    current_vars, _ = _credential_vars(ROLE_ARN, timedelta(minutes=55))
+    current_vars[0]["attributes"]["description"] = "AWS access key"
+    assert _fresh_expiration(current_vars) is None